@@ -0,0 +1,230 @@
+"""
+Benchmarks for the dashboard.
+
+    python bench.py partition [--rows 10000 100000 1000000] [--people 5 50 500]
+    python bench.py format [--rows 100000]
+    python bench.py pages [--settlements 10000 100000 1000000 --people 5 500 --yes] [--repeat 3] [--json out.json]
+
+`partition` and `format` are pandas micro-benchmarks (no database needed). `pages` drives every page of
+app.py headlessly with Streamlit's AppTest and reports wall time, query count and peak Python
+memory per page. Without --settlements it measures whatever data is in the database; with it,
+the database is re-seeded (synth.py, destructive) at each scale first. Run it from the repo
+root against a local database, so .streamlit/secrets.toml points somewhere disposable.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from frames import person_stats
+
+
+def _timed(fn, repeat: int = 3) -> float:
+    """Best-of-`repeat` wall time of fn() in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000.0
+
+
+def synthetic_kpis(rows: int, people: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Person {i:03d}" for i in range(people)])
+    return pd.DataFrame({
+        "person_name": names[rng.integers(0, people, rows)],
+        "month": rng.choice([f"2025-{m:02d}" for m in range(1, 13)], rows),
+        "demands_sent": rng.integers(0, 20, rows),
+        "settlements_amount": rng.random(rows) * 500_000,
+        "avg_lien_resolution_days": rng.random(rows) * 60,
+        "files_without_14_day_contact": rng.integers(0, 5, rows),
+        "nps_score": rng.integers(0, 11, rows) / 2,
+    })
+
+
+def bench_partition(rows_list, people_list) -> pd.DataFrame:
+    """
+    Per-person stats the old way (a boolean mask + copy per person) against person_stats
+    (one groupby).
+    """
+    aggs = {
+        "dem": ("demands_sent", "sum"),
+        "kpi_settle_amt": ("settlements_amount", "sum"),
+        "lien": ("avg_lien_resolution_days", "mean"),
+        "no_contact": ("files_without_14_day_contact", "sum"),
+        "nps": ("nps_score", "mean"),
+    }
+
+    def masked_loop(df, people):
+        out = {}
+        for person in people:
+            sub = df[df["person_name"] == person].copy()
+            out[person] = (
+                sub["demands_sent"].sum(), sub["settlements_amount"].sum(),
+                sub["avg_lien_resolution_days"].mean(), sub["files_without_14_day_contact"].sum(),
+                sub["nps_score"].mean(),
+            )
+        return out
+
+    results = []
+    for rows in rows_list:
+        for people in people_list:
+            df = synthetic_kpis(rows, people)
+            names = sorted(df["person_name"].unique())
+            results.append({
+                "rows": rows,
+                "people": people,
+                "masked_loop_ms": _timed(lambda: masked_loop(df, names)),
+                "person_stats_ms": _timed(lambda: person_stats(df, names, **aggs)),
+            })
+    out = pd.DataFrame(results)
+    out["speedup"] = out["masked_loop_ms"] / out["person_stats_ms"]
+    return out
+
+
+def bench_format(rows_list) -> pd.DataFrame:
+    """
+    Preparing a transactions table with two money columns for st.dataframe: row-wise
+    .apply(currency) (the old Pre-Suit table) vs keeping the floats for st.column_config
+    to format in the browser. Both include the Arrow serialisation st.dataframe does, since
+    text columns also cost more to ship.
+    """
+    from streamlit.dataframe_util import convert_pandas_df_to_arrow_bytes
+
+    def currency(x) -> str:  # the per-cell formatter app.py used to apply
+        try:
+            return f"${float(x):,.2f}"
+        except:
+            return "$0.00"
+
+    def applied(df):
+        view = df.copy()
+        for col in ("settlement_amount", "fee_earned"):
+            view[col] = view[col].apply(currency)
+        return convert_pandas_df_to_arrow_bytes(view)
+
+    results = []
+    for rows in rows_list:
+        rng = np.random.default_rng(0)
+        amount = np.round(rng.lognormal(11.5, 0.8, rows), -3)
+        df = pd.DataFrame({
+            "client_name": [f"Client {i:07d}" for i in range(rows)],
+            "settlement_amount": amount,
+            "fee_earned": amount / 3,
+            "settlement_date": np.datetime64("2024-01-01") + rng.integers(0, 1000, rows).astype("timedelta64[D]"),
+        })
+        results.append({
+            "rows": rows,
+            "apply_ms": _timed(lambda: applied(df)),
+            "column_config_ms": _timed(lambda: convert_pandas_df_to_arrow_bytes(df)),
+            "text_kb": len(applied(df)) / 1024,
+            "numeric_kb": len(convert_pandas_df_to_arrow_bytes(df)) / 1024,
+        })
+    return pd.DataFrame(results)
+
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+def _app_pages(at) -> list[str]:
+    return list(at.sidebar.radio[0].options)
+
+
+def bench_pages(repeat: int = 3, pages=None) -> pd.DataFrame:
+    """
+    For each page: `repeat` cold reruns (query cache emptied first) and warm reruns (cache as
+    the previous rerun left it), reporting medians, plus one traced cold rerun for peak memory.
+    Query counts and DB time come from the perf recorder of the rerun.
+    """
+    import db
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    at.run()
+    results = []
+    for page in pages or _app_pages(at):
+        at.sidebar.radio[0].set_value(page)
+
+        def rerun(cold: bool):
+            if cold:
+                db._query_cache().invalidate()
+            started = time.perf_counter()
+            at.run()
+            if at.exception:
+                raise RuntimeError(f"{page}: {at.exception[0].message}")
+            return (time.perf_counter() - started) * 1000.0, at.session_state["_perf_run"].totals()
+
+        cold = [rerun(True) for _ in range(repeat)]
+        warm = [rerun(False) for _ in range(repeat)]
+        tracemalloc.start()
+        rerun(True)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results.append({
+            "page": page,
+            "cold_ms": statistics.median(ms for ms, _ in cold),
+            "warm_ms": statistics.median(ms for ms, _ in warm),
+            "queries": cold[-1][1]["queries"],
+            "db_ms": statistics.median(t["db_ms"] for _, t in cold),
+            "rows": cold[-1][1]["rows"],
+            "peak_mem_mb": peak / 2**20,
+        })
+    return pd.DataFrame(results)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    part = sub.add_parser("partition", help="per-person masking vs single-pass groupby")
+    part.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    part.add_argument("--people", type=int, nargs="+", default=[5, 50, 500])
+
+    fmt = sub.add_parser("format", help="row-wise currency() vs column_config formatting")
+    fmt.add_argument("--rows", type=int, nargs="+", default=[100_000])
+
+    pages = sub.add_parser("pages", help="per-page wall time, query count and peak memory via AppTest")
+    pages.add_argument("--settlements", type=int, nargs="+", help="re-seed at each of these scales first")
+    pages.add_argument("--people", type=int, nargs="+", default=[5])
+    pages.add_argument("--years", type=int, default=3)
+    pages.add_argument("--seed", type=int, default=0)
+    pages.add_argument("--repeat", type=int, default=3)
+    pages.add_argument("--page", action="append", help="only this page (repeatable)")
+    pages.add_argument("--json", help="also write the results to this file")
+    pages.add_argument("--yes", action="store_true", help="confirm re-seeding (it empties the tables)")
+
+    args = parser.parse_args(argv)
+    if args.command == "partition":
+        print(bench_partition(args.rows, args.people).to_string(index=False, float_format="%.1f"))
+    elif args.command == "format":
+        print(bench_format(args.rows).to_string(index=False, float_format="%.1f"))
+    elif args.command == "pages":
+        if args.settlements and not args.yes:
+            parser.error("--settlements re-seeds the database; pass --yes to confirm")
+        scales = [(n, p) for n in args.settlements for p in args.people] if args.settlements else [(None, None)]
+        frames = []
+        for settlements, people in scales:
+            if settlements is not None:
+                import synth
+                synth.seed_database(settlements, people, args.years, args.seed)
+            df = bench_pages(args.repeat, args.page)
+            df.insert(0, "settlements", settlements)
+            df.insert(1, "people", people)
+            print(df.to_string(index=False, float_format="%.1f"), flush=True)
+            frames.append(df)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(pd.concat(frames).to_dict("records"), f, indent=2, default=str)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,131 +1,3028 @@
+import io
+import json
+import os
+import random
+import re
+import select
+import threading
 import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+
 import streamlit as st
 import pandas as pd
-from sqlalchemy import text
-from sqlalchemy.exc import OperationalError
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError, OperationalError, TimeoutError as PoolTimeout
+
+import perf
+from frames import COLUMN_DTYPES, typed
+
+QUERY_CACHE_MAX_ENTRIES = 256
+
+# Replicas tell each other about writes on this Postgres NOTIFY channel (see CacheListener).
+# While a process is not listening its cached results expire after the fallback TTL instead;
+# override it in secrets.toml:
+# [cache]
+# fallback_ttl_seconds = 30
+CACHE_CHANNEL = "kpi_cache_invalidate"
+CACHE_FALLBACK_TTL = 30.0
+LISTENER_POLL_SECONDS = 5.0   # idle time before the listener pings its connection
+LISTENER_RETRY_MAX = 30.0     # reconnect backoff cap, seconds
+
+# Identifies this process in invalidation messages, so it can skip its own.
+_PROCESS_ID = uuid.uuid4().hex
+
+# Key for pg_advisory_lock around schema setup; any constant unique to this app will do.
+SCHEMA_LOCK_KEY = 7_310_452_026
+
+# SQLAlchemy pool settings. Any of them can be overridden per deployment in secrets.toml:
+# [connections.neon.create_engine_kwargs]   (or [connections.local...] for the DuckDB backend)
+# pool_size = 10
+POOL_DEFAULTS = {
+    "pool_size": 5,          # connections kept open per process
+    "max_overflow": 5,       # extra connections allowed under burst load
+    "pool_timeout": 10,      # seconds to wait for a free connection before failing
+    "pool_pre_ping": True,   # test a pooled connection before use (Neon drops idle SSL sessions)
+    "pool_recycle": 300,     # replace connections older than this many seconds
+}
+
+RETRY_ATTEMPTS = 3
+RETRY_BASE_SLEEP = 0.5   # seconds; the backoff cap doubles per attempt
+RETRY_MAX_SLEEP = 4.0
+
+# After this many consecutive failed operations the breaker opens and calls fail fast
+# for BREAKER_COOLDOWN seconds; then one trial call decides whether it closes again.
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_COOLDOWN = 15.0
+
+LATENCY_SAMPLES = 500
+
+# Retry count of the last _run_with_retry call on this thread, read back by the perf hooks.
+_last_call = threading.local()
+
+
+class DatabaseUnavailable(RuntimeError):
+    """
+    Raised instead of touching the database while the circuit breaker is open.
+    """
+
+
+# ------------------ STORAGE BACKEND ------------------
+# Where the data lives is chosen in .streamlit/secrets.toml:
+#
+# [storage]
+# backend = "postgres"          # default; needs [connections.neon] url = "postgresql://..."
+#
+# [storage]
+# backend = "duckdb"            # embedded file: offline use, or a columnar snapshot for analysis
+# duckdb_path = "kpi.duckdb"    # see `python manage.py snapshot`
+# read_only = true              # optional; lets several processes share one snapshot file
+DEFAULT_DUCKDB_PATH = "kpi.duckdb"
+
+
+def _secrets_section(*path) -> dict:
+    section = st.secrets
+    try:
+        for key in path:
+            section = section[key]
+    except (KeyError, FileNotFoundError):
+        return {}
+    return dict(section)
+
+
+class StorageBackend(ABC):
+    """
+    What the rest of this module needs from a database: a connection, its schema and
+    migrations, and the few raw-driver operations (transactions, bulk loads, streaming reads)
+    that SQLAlchemy text() queries don't cover. The class attributes describe what it supports;
+    a backend missing one of the abstract methods fails when it is instantiated.
+    """
+
+    name: str
+    connection_name: str      # the st.connection name, i.e. [connections.<name>] in secrets.toml
+    maintains_rollup: bool    # settlement_monthly_rollup is a table kept current on write
+    maintains_updated_at: bool  # every UPDATE bumps updated_at (a trigger), so delta sync is safe
+    supports_notify: bool     # writes can be announced to other processes
+    partitions_settlements: bool
+    temp_table_suffix: str    # appended to CREATE TEMP TABLE for bulk-load staging tables
+    truncate_statements: list[str]
+
+    def engine_kwargs(self) -> dict:
+        overrides = _secrets_section("connections", self.connection_name).get("create_engine_kwargs", {})
+        return {**POOL_DEFAULTS, **overrides}
+
+    @abstractmethod
+    def connection(self):
+        """
+        The st.connection (SQLAlchemy engine) for this backend.
+        """
+
+    @abstractmethod
+    def schema_lock(self, c):
+        """
+        A context manager held around DDL/migrations on connection `c`, so only one process
+        runs them at a time.
+        """
+
+    @abstractmethod
+    def schema_ddl(self) -> list[str]:
+        """
+        Idempotent CREATE statements for the base schema, run by init_db before the migrations.
+        """
+
+    @abstractmethod
+    def migrations(self) -> list:
+        """
+        (version, description, statements) tuples, applied in version order by init_db.
+        """
+
+    @abstractmethod
+    def begin(self, raw):
+        """
+        Open a transaction on raw DBAPI connection `raw`.
+        """
+
+    @abstractmethod
+    def placeholder(self, name: str) -> str:
+        """
+        Bind placeholder for SQL run on a raw DBAPI cursor (text() queries use :name everywhere).
+        """
+
+    @abstractmethod
+    def load_staging(self, raw, table: str, columns: list[str], df: pd.DataFrame, chunk_size: int, progress):
+        """
+        Fill the (already created) {table}_staging with `df`, chunk by chunk, calling
+        `progress(rows_loaded, rows_total)` after each chunk.
+        """
+
+    @abstractmethod
+    def execute_count(self, raw, sql: str) -> int:
+        """
+        Run a write on `raw` and return the number of rows it affected.
+        """
+
+    @abstractmethod
+    def stream_rows(self, raw, sql: str, params: dict, chunk_size: int):
+        """
+        Yield lists of at most `chunk_size` row tuples without holding the whole result.
+        """
+
+
+class PostgresBackend(StorageBackend):
+    """
+    The production database (Neon). The rollup table is kept current by triggers, bulk loads
+    go through COPY, exports through a server-side cursor and schema setup is serialised
+    across replicas with an advisory lock.
+    """
+
+    name = "postgres"
+    connection_name = "neon"
+    maintains_rollup = True  # settlement_monthly_rollup is a real table fed by triggers
+    maintains_updated_at = True  # touch_updated_at() triggers (migration 6)
+    supports_notify = True   # writes are announced to other replicas with pg_notify
+    partitions_settlements = True  # settlements is split into yearly partitions (migration 5)
+    temp_table_suffix = " ON COMMIT DROP"
+    truncate_statements = ["TRUNCATE settlements, settlement_monthly_rollup, pre_suit_kpis RESTART IDENTITY"]
+
+    def connection(self):
+        # Needs .streamlit/secrets.toml:
+        # [connections.neon]
+        # url="postgresql://..."
+        return st.connection(self.connection_name, type="sql", **self.engine_kwargs())
+
+    @contextmanager
+    def schema_lock(self, c):
+        """
+        Hold a session-level advisory lock on connection `c` so only one process
+        (replica, session) runs DDL/migrations at a time; the others wait, then find nothing to do.
+        """
+        c.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        try:
+            yield
+        finally:
+            c.rollback()
+            c.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
+            c.commit()
+
+    def schema_ddl(self) -> list[str]:
+        return SCHEMA_DDL
+
+    def migrations(self) -> list:
+        return MIGRATIONS
+
+    def begin(self, raw):
+        # psycopg2 opens a transaction implicitly with the first statement.
+        pass
+
+    def placeholder(self, name: str) -> str:
+        return f"%({name})s"
+
+    def load_staging(self, raw, table: str, columns: list[str], df: pd.DataFrame, chunk_size: int, progress):
+        cur = raw.cursor()
+        copy_sql = f"COPY {table}_staging ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        total = len(df)
+        for offset in range(0, total, chunk_size):
+            buf = io.StringIO()
+            df.iloc[offset:offset + chunk_size].to_csv(buf, index=False, header=False)
+            buf.seek(0)
+            cur.copy_expert(copy_sql, buf)
+            if progress:
+                progress(min(offset + chunk_size, total), total)
+
+    def execute_count(self, raw, sql: str) -> int:
+        cur = raw.cursor()
+        cur.execute(sql)
+        return cur.rowcount
+
+    def stream_rows(self, raw, sql: str, params: dict, chunk_size: int):
+        # A named (server-side) cursor lives inside the transaction and is closed before it ends.
+        with raw.cursor(name="settlements_export") as cur:
+            cur.itersize = chunk_size
+            cur.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
+
+class DuckDBBackend(StorageBackend):
+    """
+    An embedded DuckDB file. There are no triggers, so settlement_monthly_rollup is a view
+    (DuckDB's column scans make that cheap), and DataFrames are loaded by registering them
+    with the connection instead of COPY. The file is owned by one process, so schema setup
+    needs no cross-process lock beyond DuckDB's own file lock.
+    """
+
+    name = "duckdb"
+    connection_name = "local"
+    maintains_rollup = False
+    maintains_updated_at = False  # no triggers: an UPDATE that doesn't set it is invisible to a mark
+    supports_notify = False  # one process owns the file, so there is nobody to tell
+    partitions_settlements = False
+    temp_table_suffix = ""
+    truncate_statements = ["DELETE FROM settlements", "DELETE FROM pre_suit_kpis"]
+
+    def config(self) -> dict:
+        storage = _secrets_section("storage")
+        return {
+            "path": storage.get("duckdb_path", DEFAULT_DUCKDB_PATH),
+            "read_only": bool(storage.get("read_only", False)),
+        }
+
+    def connection(self):
+        cfg = self.config()
+        kwargs = self.engine_kwargs()
+        if cfg["read_only"]:
+            kwargs["connect_args"] = {"read_only": True}
+        return st.connection(self.connection_name, type="sql", url=f"duckdb:///{cfg['path']}", **kwargs)
+
+    @contextmanager
+    def schema_lock(self, c):
+        yield
+
+    def schema_ddl(self) -> list[str]:
+        return DUCKDB_SCHEMA_DDL
+
+    def migrations(self) -> list:
+        return DUCKDB_MIGRATIONS
+
+    def begin(self, raw):
+        # The DuckDB driver autocommits unless a transaction is opened explicitly.
+        raw.driver_connection.begin()
+
+    def placeholder(self, name: str) -> str:
+        return f"${name}"
+
+    def load_staging(self, raw, table: str, columns: list[str], df: pd.DataFrame, chunk_size: int, progress):
+        con = raw.driver_connection
+        cols = ", ".join(columns)
+        total = len(df)
+        for offset in range(0, total, chunk_size):
+            con.register("staging_chunk", df.iloc[offset:offset + chunk_size])
+            try:
+                con.execute(f"INSERT INTO {table}_staging ({cols}) SELECT {cols} FROM staging_chunk")
+            finally:
+                con.unregister("staging_chunk")
+            if progress:
+                progress(min(offset + chunk_size, total), total)
+
+    def execute_count(self, raw, sql: str) -> int:
+        # DuckDB reports affected rows as a one-row result rather than cursor.rowcount.
+        return int(raw.driver_connection.execute(sql).fetchone()[0])
+
+    def stream_rows(self, raw, sql: str, params: dict, chunk_size: int):
+        result = raw.driver_connection.execute(sql, params)
+        while True:
+            rows = result.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+
+BACKENDS = {b.name: b for b in (PostgresBackend(), DuckDBBackend())}
+
+
+def storage_backend() -> StorageBackend:
+    """
+    The backend selected by [storage] backend in secrets.toml (Postgres when unset).
+    """
+    name = _secrets_section("storage").get("backend", "postgres")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown [storage] backend {name!r}; expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]
+
+
+def get_conn():
+    return storage_backend().connection()
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `threshold` consecutive failures; open -> half-open once `cooldown`
+    seconds have passed, letting a single trial call through; its outcome closes or re-opens it.
+    Shared by every session in the process, so a dead database costs one timeout, not one per visitor.
+    """
+
+    def __init__(self, threshold: int = BREAKER_FAILURE_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self.last_error = None
+
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return
+            retry_in = max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+        raise DatabaseUnavailable(
+            f"Database unavailable ({self.last_error}); next attempt in {retry_in:.0f}s."
+        )
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self, err: Exception):
+        with self._lock:
+            self.last_error = str(err).strip().splitlines()[0] if str(err).strip() else type(err).__name__
+            self._failures += 1
+            if self._trial_running or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    def reset(self):
+        self.record_success()
+
+
+class DbStats:
+    """
+    Process-wide counters for the connection layer: calls, retries, failures, fast-fails
+    and the latency of recent successful calls.
+    """
+
+    def __init__(self, samples: int = LATENCY_SAMPLES):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=samples)
+        self.calls = self.retries = self.failures = self.rejected = 0
+
+    def record(self, seconds: float | None = None, retries: int = 0, failed: bool = False, rejected: bool = False):
+        with self._lock:
+            self.calls += 1
+            self.retries += retries
+            self.failures += failed
+            self.rejected += rejected
+            if seconds is not None:
+                self._latencies.append(seconds * 1000.0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lat = sorted(self._latencies)
+            out = {"calls": self.calls, "retries": self.retries, "failures": self.failures, "rejected": self.rejected}
+        if lat:
+            out.update({
+                "latency_p50_ms": lat[len(lat) // 2],
+                "latency_p95_ms": lat[min(len(lat) - 1, int(len(lat) * 0.95))],
+                "latency_max_ms": lat[-1],
+            })
+        return out
+
+
+@st.cache_resource
+def _breaker() -> CircuitBreaker:
+    return CircuitBreaker()
+
+
+@st.cache_resource
+def _db_stats() -> DbStats:
+    return DbStats()
+
+
+def db_status() -> dict:
+    """
+    Breaker state, whether the cache listener is connected, the retry/latency counters and
+    the query cache's hit/miss/eviction counters, for the sidebar and health checks.
+    """
+    breaker = _breaker()
+    listener = _query_cache().listener
+    return {
+        "state": breaker.state(),
+        "last_error": breaker.last_error,
+        "cache_sync": listener.state if listener else "off",
+        **_db_stats().snapshot(),
+        "query_cache": query_cache_stats(),
+    }
+
+
+def _is_transient(e: Exception) -> bool:
+    """
+    Whether `e` means the database couldn't be reached (retry, and count it against the breaker)
+    rather than that it answered with an error: OperationalError, any DBAPI error that
+    invalidated its connection ("connection already closed"), or no pooled connection in time.
+    """
+    return (
+        isinstance(e, (OperationalError, PoolTimeout))
+        or (isinstance(e, DBAPIError) and e.connection_invalidated)
+    )
+
+
+def _run_with_retry(fn, idempotent: bool = True, attempts: int = RETRY_ATTEMPTS):
+    """
+    Run fn() through the circuit breaker. Transient DB/network errors (e.g., 'SSL connection has
+    been closed unexpectedly') are retried with full-jitter exponential backoff, but only when
+    `idempotent` -- a write that failed mid-flight may have been applied, so it is raised instead.
+    """
+    breaker, stats = _breaker(), _db_stats()
+    try:
+        breaker.before_call()
+    except DatabaseUnavailable:
+        stats.record(rejected=True)
+        raise
+
+    attempts = attempts if idempotent else 1
+    started = time.perf_counter()
+    for i in range(attempts):
+        _last_call.retries = i
+        try:
+            result = fn()
+        except Exception as e:
+            if not _is_transient(e):
+                # The database answered (constraint violation, bad SQL, ...): it is up.
+                breaker.record_success()
+                stats.record(retries=i, failed=True)
+                raise
+            if i + 1 < attempts:
+                time.sleep(random.uniform(0, min(RETRY_MAX_SLEEP, RETRY_BASE_SLEEP * (2 ** i))))
+                continue
+            breaker.record_failure(e)
+            stats.record(retries=i, failed=True)
+            raise
+        breaker.record_success()
+        stats.record(time.perf_counter() - started, retries=i)
+        return result
+
+
+def _raw_connection():
+    """
+    A DBAPI connection from the pool (for COPY and named cursors), checked out via the breaker.
+    """
+    return _run_with_retry(get_conn().engine.raw_connection)
+
+
+# Tables whose contents are derived (by triggers) from another table's writes.
+_DERIVED_TABLES = {"settlements": {"settlement_monthly_rollup"}}
+
+_TABLE_RE = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE)\s+([A-Za-z_][A-Za-z0-9_]*)", re.IGNORECASE)
+_NOT_TABLES = {"set", "only", "lateral"}
+
+
+def _tables_in(query: str) -> frozenset:
+    """
+    Table names a statement reads or writes (good enough for the plain SQL in this app).
+    """
+    return frozenset(t.lower() for t in _TABLE_RE.findall(query) if t.lower() not in _NOT_TABLES)
+
+
+def _written_tables(query: str) -> frozenset:
+    """
+    Tables a write touches, including the ones triggers maintain from them.
+    """
+    tables = set(_tables_in(query))
+    for t in list(tables):
+        tables |= _DERIVED_TABLES.get(t, set())
+    return frozenset(tables)
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+class QueryCache:
+    """
+    Process-wide LRU of query results keyed by (SQL, params).
+    Each entry remembers the tables it read and its params, so a write only drops the entries
+    it can affect. While `ttl` is set (no cache listener connected, see CacheListener) entries
+    older than ttl seconds are treated as misses, bounding how stale another replica's
+    writes can leave them.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES, ttl: float | None = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.listener = None  # the CacheListener keeping this cache in step with other replicas
+        self._entries = OrderedDict()  # key -> (tables, params, stored_at, DataFrame)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.expirations = 0
+
+    @staticmethod
+    def key(query: str, params: dict | None):
+        return (" ".join(query.split()), _freeze(params or {}))
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[2] > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None, self._generation
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3], self._generation
+
+    def put(self, key, tables: frozenset, df: pd.DataFrame, generation: int, params: dict | None = None):
+        with self._lock:
+            # A write landed while this result was being fetched; it may already be stale.
+            if generation != self._generation:
+                return
+            self._entries[key] = (tables, dict(params or {}), time.monotonic(), df)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tables: frozenset | None = None, keys: dict | None = None):
+        """
+        Drop entries that read any of `tables` (all entries when tables is None). With `keys`
+        (the written key ranges, see _write_keys) entries whose own params put them outside
+        those ranges are kept.
+        """
+        with self._lock:
+            self._generation += 1
+            if tables is None:
+                dropped = list(self._entries)
+            else:
+                dropped = [
+                    k for k, (t, params, _, _) in self._entries.items()
+                    if t & tables and not (keys and _outside_written_keys(params, keys))
+                ]
+            for k in dropped:
+                del self._entries[k]
+            self.invalidations += len(dropped)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "expirations": self.expirations,
+                "ttl": self.ttl,
+                "sync": self.listener.status() if self.listener else None,
+            }
+
+
+def cache_fallback_ttl() -> float:
+    return float(_secrets_section("cache").get("fallback_ttl_seconds", CACHE_FALLBACK_TTL))
+
+
+@st.cache_resource
+def _query_cache() -> QueryCache:
+    # cache_resource makes this one object shared by every session in the process.
+    # Until a CacheListener is connected, other replicas' writes are only bounded by the TTL.
+    return QueryCache(ttl=cache_fallback_ttl() if storage_backend().supports_notify else None)
+
+
+def query_cache_stats() -> dict:
+    return {**_query_cache().stats(), "delta_sync": _delta_store().stats()}
+
+
+# ------------------ CROSS-REPLICA CACHE INVALIDATION ------------------
+# Every write also sends a pg_notify on CACHE_CHANNEL in its own transaction, so the message
+# goes out exactly when the write commits. Each process runs one CacheListener that LISTENs
+# on the channel and drops the matching entries from its QueryCache (and settings snapshot).
+# The message carries the written tables and, where the params say, the settlement_date /
+# month range written ("keys"), so cached windows elsewhere in time survive.
+NOTIFY_SQL = "SELECT pg_notify(:channel, :payload)"
+
+
+def _notify_params(tables: frozenset | None, keys: dict | None) -> dict:
+    payload = {"origin": _PROCESS_ID, "tables": sorted(tables) if tables is not None else None, "keys": keys}
+    return {"channel": CACHE_CHANNEL, "payload": json.dumps(payload)}
+
+
+def _write_keys(params: dict | list[dict] | None) -> dict | None:
+    """
+    The range of dates a write's params cover, as {"lo": "YYYY-MM-DD", "hi": "YYYY-MM-DD"}:
+    settlement_date values, or whole months for "YYYY-MM" month values. None when any row
+    has neither, since the write may then touch any date.
+    """
+    rows = params if isinstance(params, list) else [params or {}]
+    days = []
+    for p in rows:
+        if p.get("settlement_date"):
+            days.append(str(p["settlement_date"])[:10])
+        elif p.get("month"):
+            month = str(p["month"])[:7]
+            days += [month + "-01", month + "-31"]
+        else:
+            return None
+    return {"lo": min(days), "hi": max(days)} if days else None
+
+
+def _frame_keys(df: pd.DataFrame) -> dict | None:
+    """
+    _write_keys for a bulk load: the range spanned by its settlement_date or month column.
+    """
+    for col in ("settlement_date", "month"):
+        if col in df.columns and len(df) and df[col].notna().all():
+            return _write_keys([{col: df[col].min()}, {col: df[col].max()}])
+    return None
+
+
+def _param_window(params: dict):
+    """
+    The (first, last) ISO date a cached query is restricted to by its params, or None.
+    """
+    if params.get("start") and params.get("end"):
+        return str(params["start"])[:10], str(params["end"])[:10]
+    month = params.get("month_start") or params.get("month")
+    if not month:
+        return None
+    month = str(month)[:7]
+    return month + "-01", month + "-31"
+
+
+def _outside_written_keys(params: dict, keys: dict) -> bool:
+    window = _param_window(params)
+    return window is not None and (window[1] < keys["lo"] or window[0] > keys["hi"])
+
+
+class CacheListener:
+    """
+    Background thread that LISTENs for other replicas' writes on its own connection (outside
+    the pool, with autocommit) and applies them to this process's QueryCache and settings
+    snapshot. While it is not connected the cache falls back to a TTL; on every (re)connect
+    the cache is emptied, since messages sent while nobody was listening are lost.
+    """
+
+    def __init__(self, engine, cache: QueryCache, settings, fallback_ttl: float, channel: str = CACHE_CHANNEL):
+        self.engine = engine
+        self.cache = cache
+        self.settings = settings
+        self.fallback_ttl = fallback_ttl
+        self.channel = channel
+        self.state = "starting"
+        self.last_error = None
+        self.backend_pid = None
+        self.connects = 0
+        self.received = 0
+        self.last_message_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="cache-listener", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "last_error": self.last_error,
+                "connects": self.connects,
+                "received": self.received,
+                "last_message_at": self.last_message_at,
+            }
+
+    def _set_ttl(self, ttl: float | None):
+        self.cache.ttl = ttl
+        self.settings.ttl = ttl
+
+    def _connect(self):
+        dialect = self.engine.dialect
+        args, kwargs = dialect.create_connect_args(self.engine.url)
+        with perf.timed("listen", f"LISTEN {self.channel}"):
+            conn = dialect.connect(*args, **kwargs)
+            conn.autocommit = True
+            conn.cursor().execute(f"LISTEN {self.channel}")
+        return conn
+
+    def _run(self):
+        delay = 1.0
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                self.cache.invalidate()
+                self.settings.reset()
+                self._set_ttl(None)
+                with self._lock:
+                    self.state, self.backend_pid = "listening", conn.get_backend_pid()
+                    self.connects += 1
+                delay = 1.0
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], LISTENER_POLL_SECONDS) == ([], [], []):
+                        # Idle: a round trip notices a dead connection (Neon drops idle sessions).
+                        # Not recorded in perf: one every few seconds would crowd out real calls.
+                        conn.cursor().execute("SELECT 1")
+                    conn.poll()
+                    while conn.notifies:
+                        self._apply(conn.notifies.pop(0).payload)
+            except Exception as e:
+                self._set_ttl(self.fallback_ttl)
+                with self._lock:
+                    self.state, self.backend_pid = "down", None
+                    self.last_error = str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+                self._stop.wait(delay)
+                delay = min(LISTENER_RETRY_MAX, delay * 2)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+        with self._lock:
+            self.state = "stopped"
+
+    def _apply(self, payload: str):
+        try:
+            msg = json.loads(payload)
+        except ValueError:
+            msg = {}  # unreadable: treat as "everything changed"
+        with self._lock:
+            self.received += 1
+            self.last_message_at = time.time()
+        if msg.get("origin") == _PROCESS_ID:
+            return  # our own write, already applied when it committed
+        tables = frozenset(msg["tables"]) if msg.get("tables") is not None else None
+        self.cache.invalidate(tables, msg.get("keys"))
+        if tables is None or "settings" in tables:
+            self.settings.reset()
+
+
+@st.cache_resource
+def start_cache_listener() -> CacheListener | None:
+    """
+    Start this process's CacheListener (once; later calls return the same one).
+    None on backends without NOTIFY, where the cache is never shared with another writer.
+    """
+    if not storage_backend().supports_notify:
+        return None
+    cache = _query_cache()
+    cache.listener = CacheListener(get_conn().engine, cache, _settings_snapshot(), cache_fallback_ttl()).start()
+    return cache.listener
+
+
+def check_cache_sync(timeout: float = 5.0, kill_connection: bool = False) -> dict:
+    """
+    End-to-end check of the invalidation channel against the configured Postgres: cache two
+    settlement windows, announce a write in one of them as if from another replica and time
+    how long it takes to be dropped (the other must survive). With kill_connection the
+    listener's connection is then terminated server-side, to see the TTL fallback engage and
+    the listener reconnect.
+    """
+    if not storage_backend().supports_notify:
+        raise RuntimeError(f"The {storage_backend().name} backend has no NOTIFY; there is nothing to check.")
+
+    def wait_for(predicate, limit: float = timeout, started: float | None = None) -> float | None:
+        started = started or time.perf_counter()
+        while time.perf_counter() - started < limit:
+            if predicate():
+                return (time.perf_counter() - started) * 1000.0
+            time.sleep(0.005)
+        return None
+
+    listener = start_cache_listener()
+    cache = _query_cache()
+    out = {"listening": wait_for(lambda: listener.state == "listening") is not None}
+    if not out["listening"]:
+        out["error"] = listener.last_error
+        return out
+
+    sql = "SELECT COUNT(*) AS n FROM settlements WHERE settlement_date BETWEEN :start AND :end"
+    written = {"start": "2026-01-01", "end": "2026-12-31"}
+    untouched = {"start": "1990-01-01", "end": "1990-12-31"}
+    for params in (written, untouched):
+        query_df(sql, params)
+    out["cached"] = all(QueryCache.key(sql, p) in cache for p in (written, untouched))
+
+    foreign = _notify_params(frozenset({"settlements", "settlement_monthly_rollup"}), {"lo": "2026-06-15", "hi": "2026-06-15"})
+    foreign["payload"] = foreign["payload"].replace(_PROCESS_ID, "check-cache-sync")
+    sent = time.perf_counter()
+    with get_conn().session as s:
+        s.execute(text(NOTIFY_SQL), foreign)
+        s.commit()
+    # Timed from just before the commit that delivers the message.
+    out["invalidation_ms"] = wait_for(lambda: QueryCache.key(sql, written) not in cache, started=sent)
+    out["other_window_kept"] = QueryCache.key(sql, untouched) in cache
+
+    if kill_connection:
+        with get_conn().session as s:
+            s.execute(text("SELECT pg_terminate_backend(:pid)"), {"pid": listener.backend_pid})
+            s.commit()
+        out["fallback_ms"] = wait_for(lambda: listener.state == "down" and cache.ttl is not None)
+        out["fallback_ttl"] = cache.ttl
+        out["reconnect_ms"] = wait_for(lambda: listener.state == "listening" and cache.ttl is None,
+                                       timeout + LISTENER_RETRY_MAX)
+    return out
+
+
+def reset_conn():
+    """
+    Throw away the pooled connections and close the circuit breaker; the next query
+    opens fresh ones. Schema setup is not repeated (see ensure_schema).
+    """
+    conn = get_conn()
+    conn.engine.dispose()
+    conn.reset()
+    _breaker().reset()
+
+
+def current_schema_version() -> int:
+    """
+    Highest applied migration version, 0 when the schema has never been initialised.
+    """
+
+    def do():
+        with get_conn().connect() as c:
+            exists = c.execute(text(
+                "SELECT COUNT(*) FROM information_schema.tables "
+                "WHERE table_schema = current_schema() AND table_name = 'schema_version'"
+            )).scalar()
+            if not exists:
+                return 0
+            return int(c.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar())
+
+    return _run_with_retry(do)
+
+
+@st.cache_resource(show_spinner="Preparing database...")
+def ensure_schema() -> int:
+    """
+    Bring the schema up to date once per process; every session shares the cached result.
+    When another replica already did the work this costs one schema_version read, plus a
+    check that this and next year's settlements partitions exist.
+    """
+    if current_schema_version() < SCHEMA_VERSION:
+        init_db()
+    ensure_settlement_partitions()
+    return SCHEMA_VERSION
+
+
+def init_db():
+    """
+    Create tables if they don't exist, seed default settings and apply pending migrations.
+    Run DDL statements separately (more robust than sending one giant multi-statement batch).
+    """
+    backend = storage_backend()
+
+    def do():
+        conn = get_conn()
+        # A plain Connection (not a Session) keeps one DBAPI connection across commits,
+        # which the session-level advisory lock needs.
+        with conn.connect() as c, backend.schema_lock(c):
+            for stmt in backend.schema_ddl():
+                c.execute(text(stmt))
+            c.commit()
+
+            c.execute(text(SEED_SETTINGS))
+            c.commit()
+
+            _apply_migrations(c, backend.migrations())
+            if backend.supports_notify:
+                c.execute(text(NOTIFY_SQL), _notify_params(None, None))
+                c.commit()
+
+    _run_with_retry(do)
+    _query_cache().invalidate()
+    _settings_snapshot().reset()
+
+
+# Base tables (Postgres); later changes go in MIGRATIONS.
+SCHEMA_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS settlements (
+        id BIGSERIAL PRIMARY KEY,
+        person_name TEXT NOT NULL,
+        client_name TEXT NOT NULL,
+        settlement_amount DOUBLE PRECISION NOT NULL DEFAULT 0,
+        policy_limits DOUBLE PRECISION NOT NULL DEFAULT 0,
+        fee_earned DOUBLE PRECISION NOT NULL DEFAULT 0,
+        settlement_date DATE NOT NULL,
+        tod TEXT,
+        track TEXT NOT NULL DEFAULT 'unknown',
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pre_suit_kpis (
+        id BIGSERIAL PRIMARY KEY,
+        person_name TEXT NOT NULL,
+        month TEXT NOT NULL, -- YYYY-MM
+        demands_sent INTEGER NOT NULL DEFAULT 0,
+        settlements_amount DOUBLE PRECISION NOT NULL DEFAULT 0,
+        avg_lien_resolution_days DOUBLE PRECISION NOT NULL DEFAULT 0,
+        files_without_14_day_contact INTEGER NOT NULL DEFAULT 0,
+        nps_score DOUBLE PRECISION NOT NULL DEFAULT 0,
+        active_case_load INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        UNIQUE(person_name, month)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    """,
+]
+
+
+SEED_SETTINGS = """
+INSERT INTO settings(key, value)
+VALUES
+  ('revenue_goal_2026', '0'),
+  ('google_reviews_baseline', '221'),
+  ('google_reviews_current', '221')
+ON CONFLICT (key) DO NOTHING;
+"""
+
+
+# Recomputes settlement_monthly_rollup from the raw fact table (backfill, rebuild and verify).
+ROLLUP_FROM_SETTLEMENTS = """
+    SELECT person_name, settlement_month AS month, track,
+           COUNT(*) AS case_count,
+           SUM(settlement_amount) AS settlement_sum,
+           SUM(fee_earned) AS fee_sum,
+           SUM(policy_limits) AS policy_limits_sum,
+           MAX(settlement_date) AS last_settlement_date
+    FROM settlements
+    GROUP BY person_name, settlement_month, track
+"""
+
+# settlements is range-partitioned by settlement_date, one partition per calendar year
+# (settlements_y2026, ...), so date-bounded dashboard queries scan one year however much
+# history there is, and an old year can be detached and archived as a whole. Rows outside
+# every year partition land in settlements_default until their year's partition is created
+# (ensure_settlement_partitions), which moves them over.
+_SETTLEMENT_COPY_COLUMNS = (
+    "id, person_name, client_name, settlement_amount, policy_limits, fee_earned, settlement_date, tod, track, created_at"
+)
+
+# The partitioned table is built alongside the old one (settlements_partitioned), filled,
+# then swapped in by settlements_partition_swap(). Shared by migration 5 and the online
+# path in partition_settlements(); every statement is idempotent.
+SETTLEMENTS_PARTITION_PREP = [
+    """
+    CREATE TABLE IF NOT EXISTS settlements_partitioned (
+        id BIGINT NOT NULL DEFAULT nextval('settlements_id_seq'),
+        person_name TEXT NOT NULL,
+        client_name TEXT NOT NULL,
+        settlement_amount DOUBLE PRECISION NOT NULL DEFAULT 0,
+        policy_limits DOUBLE PRECISION NOT NULL DEFAULT 0,
+        fee_earned DOUBLE PRECISION NOT NULL DEFAULT 0,
+        settlement_date DATE NOT NULL,
+        tod TEXT,
+        track TEXT NOT NULL DEFAULT 'unknown',
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        settlement_month DATE GENERATED ALWAYS AS ((date_trunc('month', settlement_date::timestamp))::date) STORED,
+        PRIMARY KEY (id, settlement_date)
+    ) PARTITION BY RANGE (settlement_date)
+    """,
+    "CREATE TABLE IF NOT EXISTS settlements_default PARTITION OF settlements_partitioned DEFAULT",
+    # Same indexes as migrations 1 and 3; renamed to the real names by the swap.
+    "CREATE INDEX IF NOT EXISTS ix_settlements_p_date_id ON settlements_partitioned (settlement_date, id)",
+    "CREATE INDEX IF NOT EXISTS ix_settlements_p_track_date ON settlements_partitioned (track, settlement_date, id)",
+    "CREATE INDEX IF NOT EXISTS ix_settlements_p_person_date ON settlements_partitioned (person_name, settlement_date, id)",
+    "CREATE INDEX IF NOT EXISTS ix_settlements_p_track_month ON settlements_partitioned (track, settlement_month, person_name)",
+    # Creates settlements_y<year>, moving any of that year's rows out of settlements_default.
+    # Writes to a partition don't fire the parent's statement triggers, so the rollup is untouched.
+    """
+    CREATE OR REPLACE FUNCTION settlements_create_year_partition(p_year INT, p_parent TEXT DEFAULT 'settlements')
+    RETURNS BOOLEAN LANGUAGE plpgsql AS $$
+    DECLARE
+        part TEXT := format('settlements_y%s', p_year);
+        lo DATE := make_date(p_year, 1, 1);
+        hi DATE := make_date(p_year + 1, 1, 1);
+        cols TEXT;
+    BEGIN
+        IF to_regclass(part) IS NOT NULL THEN
+            RETURN false;
+        END IF;
+        EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING GENERATED)', part, p_parent);
+        -- Lets ATTACH skip its validation scan of the new table.
+        EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I CHECK (settlement_date >= %L AND settlement_date < %L)',
+                       part, part || '_range', lo, hi);
+        SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) INTO cols
+        FROM pg_attribute
+        WHERE attrelid = p_parent::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = '';
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM settlements_default WHERE settlement_date >= %L AND settlement_date < %L RETURNING %s) '
+            'INSERT INTO %I (%s) SELECT %s FROM moved',
+            lo, hi, cols, part, cols, cols);
+        EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', p_parent, part, lo, hi);
+        EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', part, part || '_range');
+        RETURN true;
+    END
+    $$
+    """,
+    """
+    SELECT settlements_create_year_partition(y::int, 'settlements_partitioned')
+    FROM (
+        SELECT DISTINCT EXTRACT(YEAR FROM settlement_date) FROM settlements
+        UNION SELECT EXTRACT(YEAR FROM current_date)
+        UNION SELECT EXTRACT(YEAR FROM current_date) + 1
+    ) t(y)
+    """,
+    # Copies whatever the online backfill hasn't (everything, when there was none) while
+    # writers wait, checks the row counts and swaps the tables. Readers keep using the old
+    # table until the final DROP. The catch-up compares id sets rather than copying above the
+    # backfill's highest id: a transaction that took a lower id but committed after its batch
+    # ran would otherwise be left behind. Settlements are insert-only in this app; an UPDATE
+    # made during an online backfill would not be carried over.
+    f"""
+    CREATE OR REPLACE FUNCTION settlements_partition_swap() RETURNS BIGINT LANGUAGE plpgsql AS $$
+    DECLARE
+        copied BIGINT;
+        old_n BIGINT;
+        new_n BIGINT;
+    BEGIN
+        IF (SELECT relkind FROM pg_class WHERE oid = 'settlements'::regclass) = 'p' THEN
+            RETURN 0;
+        END IF;
+        LOCK TABLE settlements IN EXCLUSIVE MODE;
+        INSERT INTO settlements_partitioned ({_SETTLEMENT_COPY_COLUMNS})
+        SELECT {_SETTLEMENT_COPY_COLUMNS} FROM settlements s
+        WHERE NOT EXISTS (SELECT 1 FROM settlements_partitioned p WHERE p.id = s.id);
+        GET DIAGNOSTICS copied = ROW_COUNT;
+        DELETE FROM settlements_partitioned p
+        WHERE NOT EXISTS (SELECT 1 FROM settlements s WHERE s.id = p.id);
+
+        SELECT COUNT(*) INTO old_n FROM settlements;
+        SELECT COUNT(*) INTO new_n FROM settlements_partitioned;
+        IF old_n <> new_n THEN
+            RAISE EXCEPTION 'settlements has % rows but settlements_partitioned has %', old_n, new_n;
+        END IF;
+
+        ALTER SEQUENCE settlements_id_seq OWNED BY NONE;
+        DROP TABLE settlements;
+        ALTER TABLE settlements_partitioned RENAME TO settlements;
+        ALTER TABLE settlements RENAME CONSTRAINT settlements_partitioned_pkey TO settlements_pkey;
+        ALTER SEQUENCE settlements_id_seq OWNED BY settlements.id;
+        ALTER INDEX ix_settlements_p_date_id RENAME TO ix_settlements_date_id;
+        ALTER INDEX ix_settlements_p_track_date RENAME TO ix_settlements_track_date;
+        ALTER INDEX ix_settlements_p_person_date RENAME TO ix_settlements_person_date;
+        ALTER INDEX ix_settlements_p_track_month RENAME TO ix_settlements_track_month;
+
+        CREATE TRIGGER trg_settlement_rollup_insert AFTER INSERT ON settlements
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION settlement_rollup_after_insert();
+        CREATE TRIGGER trg_settlement_rollup_update AFTER UPDATE ON settlements
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION settlement_rollup_after_update();
+        CREATE TRIGGER trg_settlement_rollup_delete AFTER DELETE ON settlements
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION settlement_rollup_after_delete();
+        RETURN copied;
+    END
+    $$
+    """,
+]
+
+# ------------------ MIGRATIONS ------------------
+# (version, description, statements), applied in version order.
+# Append new entries; never edit one that has shipped. Statements must be idempotent.
+MIGRATIONS = [
+    (
+        1,
+        "settlements indexes for date-range, track and per-person access",
+        [
+            # Firmwide range filters and ORDER BY settlement_date DESC, id DESC (scanned backwards).
+            "CREATE INDEX IF NOT EXISTS ix_settlements_date_id ON settlements (settlement_date, id)",
+            # Pre-Suit dashboard: track = 'pre_suit' plus a date range / ordering.
+            "CREATE INDEX IF NOT EXISTS ix_settlements_track_date ON settlements (track, settlement_date, id)",
+            # Person boxes: person_name = :p plus a date range / ordering.
+            "CREATE INDEX IF NOT EXISTS ix_settlements_person_date ON settlements (person_name, settlement_date, id)",
+        ],
+    ),
+    (
+        2,
+        "pre_suit_kpis index matching ORDER BY month DESC, person_name ASC",
+        [
+            "CREATE INDEX IF NOT EXISTS ix_pre_suit_kpis_month_person ON pre_suit_kpis (month DESC, person_name)",
+        ],
+    ),
+    (
+        3,
+        "settlements.settlement_month generated column for month filters",
+        [
+            """
+            ALTER TABLE settlements ADD COLUMN IF NOT EXISTS settlement_month DATE
+                GENERATED ALWAYS AS ((date_trunc('month', settlement_date::timestamp))::date) STORED
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_settlements_track_month ON settlements (track, settlement_month, person_name)",
+        ],
+    ),
+    (
+        4,
+        "settlement_monthly_rollup maintained by statement-level triggers on settlements",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS settlement_monthly_rollup (
+                person_name TEXT NOT NULL,
+                month DATE NOT NULL,
+                track TEXT NOT NULL,
+                case_count BIGINT NOT NULL DEFAULT 0,
+                settlement_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+                fee_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+                policy_limits_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+                last_settlement_date DATE,
+                PRIMARY KEY (person_name, month, track)
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_settlement_monthly_rollup_month ON settlement_monthly_rollup (month, track)",
+            # Inserts add their totals to the touched groups.
+            """
+            CREATE OR REPLACE FUNCTION settlement_rollup_after_insert() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                INSERT INTO settlement_monthly_rollup AS r
+                    (person_name, month, track, case_count, settlement_sum, fee_sum, policy_limits_sum, last_settlement_date)
+                SELECT person_name, settlement_month, track,
+                       COUNT(*), SUM(settlement_amount), SUM(fee_earned), SUM(policy_limits), MAX(settlement_date)
+                FROM new_rows
+                GROUP BY person_name, settlement_month, track
+                ON CONFLICT (person_name, month, track) DO UPDATE SET
+                    case_count = r.case_count + EXCLUDED.case_count,
+                    settlement_sum = r.settlement_sum + EXCLUDED.settlement_sum,
+                    fee_sum = r.fee_sum + EXCLUDED.fee_sum,
+                    policy_limits_sum = r.policy_limits_sum + EXCLUDED.policy_limits_sum,
+                    last_settlement_date = GREATEST(r.last_settlement_date, EXCLUDED.last_settlement_date);
+                RETURN NULL;
+            END
+            $$;
+            """,
+            # Updates and deletes recompute just the groups they touched (MAX can't be decremented).
+            """
+            CREATE OR REPLACE FUNCTION settlement_rollup_refresh(p_people TEXT[], p_months DATE[], p_tracks TEXT[])
+            RETURNS void LANGUAGE sql AS $$
+                DELETE FROM settlement_monthly_rollup r
+                USING unnest(p_people, p_months, p_tracks) AS t(person_name, month, track)
+                WHERE r.person_name = t.person_name AND r.month = t.month AND r.track = t.track;
+
+                INSERT INTO settlement_monthly_rollup
+                    (person_name, month, track, case_count, settlement_sum, fee_sum, policy_limits_sum, last_settlement_date)
+                SELECT s.person_name, s.settlement_month, s.track,
+                       COUNT(*), SUM(s.settlement_amount), SUM(s.fee_earned), SUM(s.policy_limits), MAX(s.settlement_date)
+                FROM settlements s
+                JOIN unnest(p_people, p_months, p_tracks) AS t(person_name, month, track)
+                  ON s.person_name = t.person_name AND s.settlement_month = t.month AND s.track = t.track
+                GROUP BY s.person_name, s.settlement_month, s.track;
+            $$;
+            """,
+            """
+            CREATE OR REPLACE FUNCTION settlement_rollup_after_update() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                PERFORM settlement_rollup_refresh(array_agg(person_name), array_agg(settlement_month), array_agg(track))
+                FROM (
+                    SELECT person_name, settlement_month, track FROM old_rows
+                    UNION
+                    SELECT person_name, settlement_month, track FROM new_rows
+                ) t;
+                RETURN NULL;
+            END
+            $$;
+            """,
+            """
+            CREATE OR REPLACE FUNCTION settlement_rollup_after_delete() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                PERFORM settlement_rollup_refresh(array_agg(person_name), array_agg(settlement_month), array_agg(track))
+                FROM (SELECT DISTINCT person_name, settlement_month, track FROM old_rows) t;
+                RETURN NULL;
+            END
+            $$;
+            """,
+            "DROP TRIGGER IF EXISTS trg_settlement_rollup_insert ON settlements",
+            """
+            CREATE TRIGGER trg_settlement_rollup_insert AFTER INSERT ON settlements
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION settlement_rollup_after_insert()
+            """,
+            "DROP TRIGGER IF EXISTS trg_settlement_rollup_update ON settlements",
+            """
+            CREATE TRIGGER trg_settlement_rollup_update AFTER UPDATE ON settlements
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION settlement_rollup_after_update()
+            """,
+            "DROP TRIGGER IF EXISTS trg_settlement_rollup_delete ON settlements",
+            """
+            CREATE TRIGGER trg_settlement_rollup_delete AFTER DELETE ON settlements
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION settlement_rollup_after_delete()
+            """,
+            # Backfill; CREATE TRIGGER above already blocks concurrent writers until this commits.
+            "DELETE FROM settlement_monthly_rollup",
+            "INSERT INTO settlement_monthly_rollup " + ROLLUP_FROM_SETTLEMENTS,
+        ],
+    ),
+    (
+        5,
+        "settlements range-partitioned by settlement_date, one partition per year",
+        # On a large table run `manage.py partition-settlements` first: it backfills online,
+        # leaving only the rows written since for this migration's locked copy.
+        SETTLEMENTS_PARTITION_PREP + ["SELECT settlements_partition_swap()", "ANALYZE settlements"],
+    ),
+    (
+        6,
+        "updated_at on settlements and pre_suit_kpis, kept current by a BEFORE UPDATE trigger",
+        [
+            # now() is stable, so existing rows take the default without a table rewrite.
+            "ALTER TABLE settlements ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+            "ALTER TABLE pre_suit_kpis ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+            """
+            CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                NEW.updated_at := now();
+                RETURN NEW;
+            END
+            $$;
+            """,
+            # On the partitioned parent, so every year partition (present and future) gets it.
+            "DROP TRIGGER IF EXISTS trg_settlements_touch ON settlements",
+            """
+            CREATE TRIGGER trg_settlements_touch BEFORE UPDATE ON settlements
+            FOR EACH ROW EXECUTE FUNCTION touch_updated_at()
+            """,
+            "DROP TRIGGER IF EXISTS trg_pre_suit_kpis_touch ON pre_suit_kpis",
+            """
+            CREATE TRIGGER trg_pre_suit_kpis_touch BEFORE UPDATE ON pre_suit_kpis
+            FOR EACH ROW EXECUTE FUNCTION touch_updated_at()
+            """,
+        ],
+    ),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# The embedded (DuckDB) schema. It has no triggers, stored generated columns or BIGSERIAL, so
+# it is written out in its current shape; DUCKDB_MIGRATIONS mirrors MIGRATIONS version for
+# version (a new migration needs a DuckDB entry too, even an empty one) so schema_version
+# means the same thing on both backends.
+DUCKDB_SCHEMA_DDL = [
+    "CREATE SEQUENCE IF NOT EXISTS settlements_id_seq",
+    "CREATE SEQUENCE IF NOT EXISTS pre_suit_kpis_id_seq",
+    """
+    CREATE TABLE IF NOT EXISTS settlements (
+        id BIGINT PRIMARY KEY DEFAULT nextval('settlements_id_seq'),
+        person_name TEXT NOT NULL,
+        client_name TEXT NOT NULL,
+        settlement_amount DOUBLE NOT NULL DEFAULT 0,
+        policy_limits DOUBLE NOT NULL DEFAULT 0,
+        fee_earned DOUBLE NOT NULL DEFAULT 0,
+        settlement_date DATE NOT NULL,
+        tod TEXT,
+        track TEXT NOT NULL DEFAULT 'unknown',
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        settlement_month DATE GENERATED ALWAYS AS (CAST(date_trunc('month', settlement_date) AS DATE)) VIRTUAL,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pre_suit_kpis (
+        id BIGINT PRIMARY KEY DEFAULT nextval('pre_suit_kpis_id_seq'),
+        person_name TEXT NOT NULL,
+        month TEXT NOT NULL, -- YYYY-MM
+        demands_sent INTEGER NOT NULL DEFAULT 0,
+        settlements_amount DOUBLE NOT NULL DEFAULT 0,
+        avg_lien_resolution_days DOUBLE NOT NULL DEFAULT 0,
+        files_without_14_day_contact INTEGER NOT NULL DEFAULT 0,
+        nps_score DOUBLE NOT NULL DEFAULT 0,
+        active_case_load INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        UNIQUE(person_name, month)
+    );
+    """,
+    SCHEMA_DDL[2],  # settings
+]
+
+DUCKDB_MIGRATIONS = [
+    (1, "no-op on DuckDB: range filters use zone maps, not B-tree indexes", []),
+    (2, "no-op on DuckDB: range filters use zone maps, not B-tree indexes", []),
+    (3, "settlements.settlement_month is a virtual column in the DuckDB base table", []),
+    (
+        4,
+        "settlement_monthly_rollup as a view over settlements (no triggers in DuckDB)",
+        ["CREATE OR REPLACE VIEW settlement_monthly_rollup AS " + ROLLUP_FROM_SETTLEMENTS],
+    ),
+    (5, "no-op on DuckDB: row-group zone maps on settlement_date already skip other years", []),
+    (
+        6,
+        "updated_at on settlements and pre_suit_kpis (no triggers, so no delta sync on DuckDB)",
+        [
+            "ALTER TABLE settlements ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now()",
+            "ALTER TABLE pre_suit_kpis ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now()",
+        ],
+    ),
+]
+
+
+def _apply_migrations(c, migrations=MIGRATIONS) -> list[int]:
+    c.execute(text(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        """
+    ))
+    c.commit()
+
+    applied = []
+    done = {row[0] for row in c.execute(text("SELECT version FROM schema_version"))}
+    for version, description, statements in sorted(migrations):
+        if version in done:
+            continue
+        for stmt in statements:
+            c.execute(text(stmt))
+        c.execute(
+            text(
+                "INSERT INTO schema_version(version, description) VALUES (:version, :description) "
+                "ON CONFLICT (version) DO NOTHING"
+            ),
+            {"version": version, "description": description},
+        )
+        c.commit()
+        applied.append(version)
+    return applied
+
+
+def migrate() -> list[int]:
+    """
+    Apply pending MIGRATIONS, one transaction per migration, recording each in schema_version.
+    Returns the versions applied by this call (empty when already up to date).
+    """
+
+    backend = storage_backend()
+
+    def do():
+        with get_conn().connect() as c, backend.schema_lock(c):
+            return _apply_migrations(c, backend.migrations())
+
+    return _run_with_retry(do)
+
+
+# ------------------ SETTLEMENT PARTITIONS ------------------
+PARTITION_BACKFILL_BATCH = 50_000
+
+
+def _settlements_partitioned(c) -> bool:
+    return c.execute(text("SELECT relkind FROM pg_class WHERE oid = 'settlements'::regclass")).scalar() == "p"
+
+
+def ensure_settlement_partitions(years=()) -> list[int]:
+    """
+    Create the settlements partitions for this year, next year, each of `years` and any year
+    with rows waiting in settlements_default. Returns the years created; a no-op (empty) on
+    backends without partitions. Cheap when they all exist, so it runs on every process start.
+    """
+    backend = storage_backend()
+    if not backend.partitions_settlements:
+        return []
+    today = date.today()
+    wanted = {today.year, today.year + 1, *(int(y) for y in years)}
+
+    def do():
+        with get_conn().connect() as c, backend.schema_lock(c):
+            if not _settlements_partitioned(c):
+                return []  # migration 5 not applied yet; it creates the partitions itself
+            parked = c.execute(text(
+                "SELECT DISTINCT EXTRACT(YEAR FROM settlement_date)::int FROM settlements_default"
+            )).scalars().all()
+            created = [
+                y for y in sorted(wanted | set(parked))
+                if c.execute(text("SELECT settlements_create_year_partition(:year)"), {"year": y}).scalar()
+            ]
+            c.commit()
+        return created
+
+    return _run_with_retry(do)
+
+
+def partition_settlements(batch_size: int = PARTITION_BACKFILL_BATCH, progress=None) -> dict:
+    """
+    Apply migration 5 (yearly partitions) without blocking writers for the whole copy: build
+    settlements_partitioned, backfill it in id-ordered batches of `batch_size`, one short
+    transaction each, then apply the migration, which under a brief write lock copies any
+    ids the backfill missed (rows written since, or committed late below its last batch)
+    and swaps the tables. Dashboards keep reading throughout.
+    `progress(rows_copied, rows_total)` is called after each batch.
+    Returns {"rows", "seconds", "swapped"}; swapped is False when it was already partitioned.
+    """
+    backend = storage_backend()
+    if not backend.partitions_settlements:
+        raise RuntimeError(f"The {backend.name} backend does not partition settlements.")
+    started = time.perf_counter()
+    copy_sql = text(
+        f"INSERT INTO settlements_partitioned ({_SETTLEMENT_COPY_COLUMNS}) "
+        f"SELECT {_SETTLEMENT_COPY_COLUMNS} FROM settlements WHERE id > :after AND id <= :upto"
+    )
+
+    if current_schema_version() == 0:
+        init_db()  # a new database: migration 5 partitions the empty table directly
+        return {"rows": 0, "seconds": time.perf_counter() - started, "swapped": True}
+
+    with get_conn().connect() as c:
+        if _settlements_partitioned(c):
+            return {"rows": 0, "seconds": time.perf_counter() - started, "swapped": False}
+        with backend.schema_lock(c):
+            for stmt in SETTLEMENTS_PARTITION_PREP:
+                c.execute(text(stmt))
+            c.commit()
+
+        after = c.execute(text("SELECT COALESCE(MAX(id), 0) FROM settlements_partitioned")).scalar()
+        high, total = c.execute(text("SELECT COALESCE(MAX(id), 0), COUNT(*) FROM settlements")).one()
+        c.commit()
+        copied = 0
+        while after < high:
+            upto = min(after + batch_size, high)
+            copied += c.execute(copy_sql, {"after": after, "upto": upto}).rowcount
+            c.commit()
+            after = upto
+            if progress:
+                progress(copied, total)
+
+        with backend.schema_lock(c):
+            _apply_migrations(c, backend.migrations())
+    _query_cache().invalidate()
+    return {"rows": copied, "seconds": time.perf_counter() - started, "swapped": True}
+
+
+def settlement_partitions() -> pd.DataFrame:
+    """
+    One row per settlements partition: name, bounds, estimated rows (from the planner
+    statistics) and size on disk including indexes.
+    """
+    return query_df(
+        """
+        SELECT c.relname AS partition,
+               pg_get_expr(c.relpartbound, c.oid) AS bounds,
+               GREATEST(c.reltuples, 0)::bigint AS approx_rows,
+               pg_size_pretty(pg_total_relation_size(c.oid)) AS size
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'settlements'::regclass
+        ORDER BY c.relname
+        """,
+        cache=False,
+    )
+
+
+def detach_settlement_year(year: int) -> str:
+    """
+    Archive a year: detach settlements_y<year> from settlements (a catalog change, no row
+    copying) and rename it settlements_archive_y<year>, ready for pg_dump and DROP. Its
+    months are removed from settlement_monthly_rollup in the same transaction so the
+    dashboards stay consistent. Returns the archived table's name.
+    """
+    backend = storage_backend()
+    if not backend.partitions_settlements:
+        raise RuntimeError(f"The {backend.name} backend does not partition settlements.")
+    part, archive = f"settlements_y{int(year)}", f"settlements_archive_y{int(year)}"
+
+    def do():
+        with get_conn().connect() as c, backend.schema_lock(c):
+            if c.execute(text("SELECT to_regclass(:t)"), {"t": part}).scalar() is None:
+                raise ValueError(f"There is no {part} partition.")
+            c.execute(text(f"ALTER TABLE settlements DETACH PARTITION {part}"))
+            c.execute(text(f"ALTER TABLE {part} RENAME TO {archive}"))
+            c.execute(
+                text("DELETE FROM settlement_monthly_rollup WHERE month >= :lo AND month < :hi"),
+                {"lo": date(int(year), 1, 1), "hi": date(int(year) + 1, 1, 1)},
+            )
+            c.execute(text(NOTIFY_SQL), _notify_params(frozenset({"settlements", "settlement_monthly_rollup"}), None))
+            c.commit()
+
+    _run_with_retry(do, idempotent=False)
+    _query_cache().invalidate(frozenset({"settlements", "settlement_monthly_rollup"}))
+    return archive
+
+
+# ------------------ INDEX CHECK ------------------
+# Representative shapes of the dashboard queries and the index (or any of a tuple of indexes)
+# each one should use.
+INDEX_CHECKS = {
+    "firmwide summary (date range)": (
+        "SELECT COUNT(*), SUM(fee_earned) FROM settlements WHERE settlement_date BETWEEN :start AND :end",
+        # One month (the Monthly view). A range covering a whole yearly partition is
+        # rightly read in full, which would say nothing about the date index.
+        {"start": "2026-03-01", "end": "2026-03-31"},
+        "ix_settlements_date_id",
+    ),
+    "person transactions": (
+        """
+        SELECT client_name, settlement_amount FROM settlements
+        WHERE person_name = :person_name AND settlement_date BETWEEN :start AND :end
+        ORDER BY settlement_date DESC, id DESC
+        """,
+        {"person_name": "Emma", "start": "2026-01-01", "end": "2026-12-31"},
+        "ix_settlements_person_date",
+    ),
+    "pre-suit settlements": (
+        "SELECT person_name, fee_earned, settlement_date FROM settlements WHERE track = 'pre_suit'",
+        {},
+        ("ix_settlements_track_date", "ix_settlements_track_month"),
+    ),
+    "pre-suit settlements (one month)": (
+        "SELECT person_name, fee_earned FROM settlements WHERE track = 'pre_suit' AND settlement_month = :month_start",
+        {"month_start": "2026-01-01"},
+        "ix_settlements_track_month",
+    ),
+    "recent settlements": (
+        "SELECT * FROM settlements ORDER BY settlement_date DESC, id DESC LIMIT 200",
+        {},
+        "ix_settlements_date_id",
+    ),
+    "settlements page (seek)": (
+        "SELECT * FROM settlements WHERE (settlement_date, id) < (:key_date, :key_id) "
+        "ORDER BY settlement_date DESC, id DESC LIMIT 51",
+        {"key_date": "2026-01-01", "key_id": 1000},
+        "ix_settlements_date_id",
+    ),
+    "settlements page for one person (seek)": (
+        "SELECT * FROM settlements WHERE person_name = :person_name AND (settlement_date, id) < (:key_date, :key_id) "
+        "ORDER BY settlement_date DESC, id DESC LIMIT 51",
+        {"person_name": "Emma", "key_date": "2026-01-01", "key_id": 1000},
+        "ix_settlements_person_date",
+    ),
+    "KPI rows page (seek)": (
+        "SELECT * FROM pre_suit_kpis WHERE month <= :key_month AND (month < :key_month OR person_name > :key_person) "
+        "ORDER BY month DESC, person_name ASC LIMIT 51",
+        {"key_month": "2026-01", "key_person": "Emma"},
+        "ix_pre_suit_kpis_month_person",
+    ),
+    "recent KPI rows": (
+        "SELECT * FROM pre_suit_kpis ORDER BY month DESC, person_name ASC LIMIT 200",
+        {},
+        "ix_pre_suit_kpis_month_person",
+    ),
+}
+
+
+def _plan_nodes(node: dict, key: str) -> set[str]:
+    found = {node[key]} if key in node else set()
+    for child in node.get("Plans", []):
+        found |= _plan_nodes(child, key)
+    return found
+
+
+def _explain(query: str, params: dict | None, seqscan: bool = True) -> dict:
+    if storage_backend().name != "postgres":
+        raise RuntimeError("These checks read Postgres EXPLAIN plans; switch [storage] backend to postgres.")
+
+    def do():
+        conn = get_conn()
+        with conn.session as s:
+            if not seqscan:
+                s.execute(text("SET LOCAL enable_seqscan = off"))
+            plan = s.execute(text("EXPLAIN (FORMAT JSON) " + query), params or {}).scalar()
+            s.rollback()
+        return plan
+
+    return _run_with_retry(do)[0]["Plan"]
+
+
+def explain_indexes(query: str, params: dict | None = None) -> set[str]:
+    """
+    Index names in the EXPLAIN plan of `query`. Sequential scans are disabled for the
+    check so a small table doesn't hide whether a usable index exists. A partition's
+    index is reported under the name of the partitioned index it belongs to. Postgres only.
+    """
+    used = _plan_nodes(_explain(query, params, seqscan=False), "Index Name")
+    if not used:
+        return used
+    parents = dict(query_df(
+        """
+        SELECT c.relname AS child, p.relname AS parent
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE c.relkind = 'i' AND c.relname = ANY(:names)
+        """,
+        {"names": sorted(used)},
+        cache=False,
+    ).itertuples(index=False))
+    return {parents.get(name, name) for name in used}
+
+
+def explain_relations(query: str, params: dict | None = None) -> set[str]:
+    """
+    Tables (partitions, for a partitioned table) the EXPLAIN plan of `query` scans.
+    Postgres only.
+    """
+    return _plan_nodes(_explain(query, params), "Relation Name")
+
+
+# Date-bounded dashboard query shapes that should be pruned to a single yearly partition.
+PRUNING_CHECKS = {
+    "YTD (firmwide partial month)": (
+        """
+        SELECT person_name, track, fee_earned FROM settlements
+        WHERE (settlement_date >= :start AND settlement_date < :m_start)
+           OR (settlement_date >= :m_end AND settlement_date <= :end)
+        """,
+        {"start": "2026-01-01", "m_start": "2026-01-01", "m_end": "2026-10-01", "end": "2026-10-17"},
+        "settlements_y2026",
+    ),
+    "Monthly (person transactions)": (
+        """
+        SELECT client_name, settlement_amount FROM settlements
+        WHERE person_name = :person_name AND settlement_date BETWEEN :start AND :end
+        ORDER BY settlement_date DESC, id DESC
+        """,
+        {"person_name": "Emma", "start": "2026-03-01", "end": "2026-03-31"},
+        "settlements_y2026",
+    ),
+    "Custom range within a year": (
+        "SELECT COUNT(*), SUM(fee_earned) FROM settlements WHERE settlement_date BETWEEN :start AND :end",
+        {"start": "2026-02-15", "end": "2026-06-30"},
+        "settlements_y2026",
+    ),
+    "pre-suit settlements (one month)": (
+        """
+        SELECT person_name, fee_earned FROM settlements
+        WHERE track = 'pre_suit' AND settlement_month = :month_start
+          AND settlement_date >= :month_start AND settlement_date < :next_month
+        """,
+        {"month_start": "2026-01-01", "next_month": "2026-02-01"},
+        "settlements_y2026",
+    ),
+}
+
+
+def check_partition_pruning() -> pd.DataFrame:
+    """
+    EXPLAIN every PRUNING_CHECKS query and report whether it scans only its expected partition.
+    """
+    rows = []
+    for name, (query, params, expected) in PRUNING_CHECKS.items():
+        scanned = explain_relations(query, params)
+        rows.append({
+            "query": name,
+            "expected_partition": expected,
+            "partitions_scanned": ", ".join(sorted(scanned)) or "(none)",
+            "ok": scanned == {expected},
+        })
+    return pd.DataFrame(rows)
+
+
+def check_indexes() -> pd.DataFrame:
+    """
+    EXPLAIN every INDEX_CHECKS query and report whether it uses its expected index.
+    """
+    rows = []
+    for name, (query, params, expected) in INDEX_CHECKS.items():
+        expected = (expected,) if isinstance(expected, str) else expected
+        used = explain_indexes(query, params)
+        rows.append({
+            "query": name,
+            "expected_index": " | ".join(expected),
+            "indexes_used": ", ".join(sorted(used)) or "(none)",
+            "ok": bool(used & set(expected)),
+        })
+    return pd.DataFrame(rows)
+
+
+def execute(query: str, params: dict | list[dict] | None = None, idempotent: bool = False):
+    """
+    Run a write and commit it. A list of params dicts runs the statement once per dict
+    in the same transaction. Pass idempotent=True for statements that are safe to repeat
+    (upserts, deletes by key) so transient connection errors are retried.
+    Cached results the write may affect are dropped here and, via NOTIFY, in other replicas.
+    """
+    # No recognisable table (TRUNCATE, ...): assume everything changed.
+    tables = _written_tables(query) or None
+    keys = _write_keys(params)
+    notify = storage_backend().supports_notify
+
+    def do():
+        conn = get_conn()
+        with conn.session as s:
+            rowcount = s.execute(text(query), params or {}).rowcount
+            if notify:
+                s.execute(text(NOTIFY_SQL), _notify_params(tables, keys))
+            s.commit()
+        return rowcount
+
+    started = time.perf_counter()
+    _last_call.retries = 0
+    try:
+        rowcount = _run_with_retry(do, idempotent=idempotent)
+    except Exception as e:
+        perf.record_call("execute", query, started, retries=_last_call.retries, error=repr(e))
+        raise
+    perf.record_call("execute", query, started, rows=rowcount, retries=_last_call.retries)
+    _query_cache().invalidate(tables, keys)
+
+
+def query_df(query: str, params: dict | None = None, cache: bool = True, dtypes: dict | None = None) -> pd.DataFrame:
+    """
+    Run a SELECT and return its rows. Results are served from the shared query cache
+    until a write touches one of the tables the query reads (in this process, or in another
+    replica via the CacheListener).
+    With `dtypes` (e.g. frames.COLUMN_DTYPES) the matching columns are cast once, before
+    caching, so cached frames are already compact.
+    """
+    def do():
+        # Read through the pool directly: conn.query() adds its own fixed-interval retries
+        # and a per-call st.cache_data layer on top of ours.
+        with get_conn().connect() as c:
+            df = pd.read_sql(text(query), c, params=params or {})
+        return typed(df, dtypes) if dtypes else df
 
+    started = time.perf_counter()
+    _last_call.retries = 0
+    hit = False
+    try:
+        if not cache:
+            df = _run_with_retry(do)
+        else:
+            qc = _query_cache()
+            key = QueryCache.key(query, params)
+            df, generation = qc.get(key)
+            hit = df is not None
+            if not hit:
+                df = _run_with_retry(do)
+                qc.put(key, _tables_in(query), df, generation, params)
+            # Callers mutate the frames they get back, so never hand out the cached object.
+            df = df.copy()
+    except Exception as e:
+        perf.record_call("query", query, started, retries=_last_call.retries, error=repr(e))
+        raise
+    perf.record_call(
+        "query", query, started, rows=len(df), nbytes=perf.frame_bytes(df),
+        retries=0 if hit else _last_call.retries, cached=hit,
+    )
+    return df
 
-def get_conn():
-    # Needs .streamlit/secrets.toml:
-    # [connections.neon]
-    # url="postgresql://..."
-    return st.connection("neon", type="sql")
 
+@st.cache_resource
+def _fetch_pool() -> ThreadPoolExecutor:
+    # No more workers than pooled connections, so parallel reads never queue for a connection.
+    return ThreadPoolExecutor(max_workers=storage_backend().engine_kwargs()["pool_size"], thread_name_prefix="db-fetch")
 
-def _run_with_retry(fn, retries: int = 3, base_sleep: float = 0.6):
+
+def fetch_many(jobs: dict) -> dict:
     """
-    Retries transient DB/network errors (e.g., 'SSL connection has been closed unexpectedly')
+    Run independent reads concurrently and return {name: result} once all are done, so a page
+    waits for its slowest query instead of the sum of them. Each job is a SQL string, a
+    (sql, params) tuple (both go through query_df and its cache) or a zero-argument callable,
+    e.g. functools.partial(pre_suit_kpis, month). Jobs must not call fetch_many themselves.
     """
-    last_err = None
-    for i in range(retries):
-        try:
-            return fn()
-        except OperationalError as e:
-            last_err = e
-            time.sleep(base_sleep * (2 ** i))
-    raise last_err
+    ctx = get_script_run_ctx()
 
+    def run(job):
+        # Let st.connection / st.cache_resource see the calling session from the worker thread.
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        if callable(job):
+            return job()
+        if isinstance(job, str):
+            return query_df(job)
+        return query_df(*job)
 
-def init_db():
+    if len(jobs) <= 1:
+        return {name: run(job) for name, job in jobs.items()}
+    pool = _fetch_pool()
+    futures = {name: pool.submit(run, job) for name, job in jobs.items()}
+    return {name: f.result() for name, f in futures.items()}
+
+
+# ------------------ DELTA SYNC ------------------
+# Row-level reads (a person's settlements, a month's KPI rows) also keep their last result per
+# (SQL, params) in a DeltaStore, with a high-water mark: row count, max id and max updated_at.
+# When the query cache has dropped the entry (a write, here or in another replica, or the
+# fallback TTL), the next read asks the database for the mark only and, if it moved, for the
+# rows past it (a higher id, or a later updated_at), merging them in by id instead of
+# re-reading the whole range. A count that no longer matches (deletes, rows moved out of the
+# range, an insert that committed after a higher id) falls back to a full read. Only backends
+# whose triggers bump updated_at on every UPDATE delta-sync; elsewhere (DuckDB) an update that
+# doesn't set it would leave the mark unchanged, so every read after a write is a full one.
+DELTA_SYNC_MAX_ENTRIES = 128
+# updated_at is its transaction's start time, so an update that commits after a newer one
+# can sit below the mark; a full read at least this often (seconds) bounds how long it's missed.
+DELTA_SYNC_MAX_AGE = 600.0
+
+
+def _delta_mark(n, max_id, max_updated) -> tuple:
+    return (
+        int(n),
+        int(max_id) if pd.notna(max_id) else None,
+        pd.Timestamp(max_updated) if pd.notna(max_updated) else None,
+    )
+
+
+def _frame_mark(df: pd.DataFrame) -> tuple:
+    return _delta_mark(len(df), df["id"].max(), df["updated_at"].max())
+
+
+def _merge_delta(df: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
     """
-    Create tables if they don't exist.
-    Run DDL statements separately (more robust than sending one giant multi-statement batch).
+    `df` with the rows of `delta` replacing those with the same id, and new ids added.
+    `delta` is cast to the stored dtypes first and empty parts are left out of the concat,
+    since pandas warns about empty and all-NA entries. Categorical columns come back as
+    plain values (the delta may hold new ones); the caller re-applies dtypes.
+    """
+    kept = df[~df["id"].isin(delta["id"])]
+    kept = kept.astype({c: object for c, t in kept.dtypes.items() if isinstance(t, pd.CategoricalDtype)})
+    delta = delta.astype(kept.dtypes.to_dict())
+    parts = [part for part in (kept, delta) if not part.empty]
+    if len(parts) < 2:
+        return (parts[0] if parts else kept).reset_index(drop=True)
+    return pd.concat(parts, ignore_index=True)
+
+
+class DeltaStore:
+    """
+    Process-wide LRU of row sets and their high-water marks (see synced_df).
+    """
+
+    def __init__(self, max_entries: int = DELTA_SYNC_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (mark, read_at, DataFrame); read_at = last full read
+        self._lock = threading.Lock()
+        self.full_reads = 0
+        self.unchanged = 0
+        self.merges = 0
+        self.merged_rows = 0
+        self.resyncs = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, mark: tuple, read_at: float, df: pd.DataFrame):
+        with self._lock:
+            self._entries[key] = (mark, read_at, df)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def count(self, **counters):
+        with self._lock:
+            for name, n in counters.items():
+                setattr(self, name, getattr(self, name) + n)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "full_reads": self.full_reads,
+                "unchanged": self.unchanged,
+                "merges": self.merges,
+                "merged_rows": self.merged_rows,
+                "resyncs": self.resyncs,
+            }
+
+
+@st.cache_resource
+def _delta_store() -> DeltaStore:
+    return DeltaStore()
+
+
+def _delta_sync(key, table: str, select: str, where: str, params: dict):
+    """
+    The rows of `select` now and when they were last read in full: a full read the first time
+    (or once DELTA_SYNC_MAX_AGE has passed), otherwise the stored rows brought up to date with
+    one mark query, plus one delta read when the mark moved. The caller stores the result back.
     """
+    store = _delta_store()
+    entry = store.get(key)
+    now = time.monotonic()
+    # An empty result has no mark to sync from; re-reading it is just as cheap.
+    if (not storage_backend().maintains_updated_at or entry is None or entry[0][1] is None
+            or now - entry[1] > DELTA_SYNC_MAX_AGE):
+        store.count(full_reads=1)
+        return query_df(select, params, cache=False), now
+    mark, read_at, df = entry
+    probe = query_df(
+        f"SELECT COUNT(*) AS n, MAX(id) AS max_id, MAX(updated_at) AS max_updated FROM {table} WHERE {where}",
+        params,
+        cache=False,
+    ).iloc[0]
+    current = _delta_mark(probe["n"], probe["max_id"], probe["max_updated"])
+    if current == mark:
+        store.count(unchanged=1)
+        return df, read_at
+    delta = query_df(
+        select + " AND (id > :delta_id OR updated_at > CAST(:delta_updated AS TIMESTAMPTZ))",
+        {**params, "delta_id": mark[1], "delta_updated": mark[2].isoformat()},
+        cache=False,
+    )
+    df = _merge_delta(df, delta)
+    if len(df) == current[0]:
+        store.count(merges=1, merged_rows=len(delta))
+        return df, read_at
+    store.count(resyncs=1)
+    return query_df(select, params, cache=False), now
+
+
+def synced_df(table: str, columns: list[str], where: str, params: dict, sort_by: list[str] | None = None,
+              ascending: bool | list[bool] = True, dtypes: dict | None = COLUMN_DTYPES) -> pd.DataFrame:
+    """
+    SELECT `columns` FROM `table` WHERE `where`, sorted by `sort_by` (columns of the result
+    or id; id when not given, so merged rows keep their place), for tables with id and
+    updated_at columns. Like query_df it is served from the
+    query cache until a write may have changed it; after that the next call delta-syncs the
+    previous result (see DeltaStore) rather than re-reading every row.
+    """
+    select = f"SELECT id, updated_at, {', '.join(columns)} FROM {table} WHERE {where}"
+    started = time.perf_counter()
+    qc = _query_cache()
+    key = QueryCache.key(select, params)
+    df, generation = qc.get(key)
+    if df is None:
+        df, read_at = _delta_sync(key, table, select, where, params)
+        df = typed(df, dtypes) if dtypes else df
+        df = df.sort_values(sort_by or ["id"], ascending=ascending, ignore_index=True)
+        qc.put(key, _tables_in(select), df, generation, params)
+        _delta_store().put(key, _frame_mark(df), read_at, df)
+    else:
+        perf.record_call("query", select, started, rows=len(df), nbytes=perf.frame_bytes(df), cached=True)
+    # A new frame, so callers can't mutate the cached one.
+    return df.drop(columns=["id", "updated_at"])
+
+
+class SettingsSnapshot:
+    """
+    In-process copy of the settings table (a handful of rows), shared by all sessions.
+    It is loaded with one query on first use and kept current by set_setting(s) and, for
+    other replicas' writes, the CacheListener; like the query cache it is reloaded after
+    `ttl` seconds while no listener is connected.
+    """
+
+    def __init__(self, ttl: float | None = None):
+        self.ttl = ttl
+        self._values = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, keys) -> dict:
+        with self._lock:
+            if self._values is None or (self.ttl is not None and time.monotonic() - self._loaded_at > self.ttl):
+                df = query_df("SELECT key, value FROM settings", cache=False)
+                self._values = {str(k): str(v) for k, v in zip(df["key"], df["value"])}
+                self._loaded_at = time.monotonic()
+            return {k: self._values[k] for k in keys if k in self._values}
+
+    def update(self, values: dict):
+        with self._lock:
+            if self._values is not None:
+                self._values.update(values)
+
+    def reset(self):
+        with self._lock:
+            self._values = None
+
+
+@st.cache_resource
+def _settings_snapshot() -> SettingsSnapshot:
+    return SettingsSnapshot(ttl=cache_fallback_ttl() if storage_backend().supports_notify else None)
+
 
-    ddl_statements = [
+def get_settings(keys) -> dict:
+    """
+    Values for every key in `keys` that exists in the settings table.
+    Missing keys are left out so callers can apply their own defaults/fallbacks.
+    """
+    return _settings_snapshot().get(keys)
+
+
+def get_setting(key: str, default="0") -> str:
+    return get_settings([key]).get(key, default)
+
+
+def set_settings(values: dict):
+    """
+    Upsert several settings in one transaction.
+    """
+    values = {k: str(v) for k, v in values.items()}
+    execute(
         """
-        CREATE TABLE IF NOT EXISTS settlements (
-            id BIGSERIAL PRIMARY KEY,
-            person_name TEXT NOT NULL,
-            client_name TEXT NOT NULL,
-            settlement_amount DOUBLE PRECISION NOT NULL DEFAULT 0,
-            policy_limits DOUBLE PRECISION NOT NULL DEFAULT 0,
-            fee_earned DOUBLE PRECISION NOT NULL DEFAULT 0,
-            settlement_date DATE NOT NULL,
-            tod TEXT,
-            track TEXT NOT NULL DEFAULT 'unknown',
-            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
-        );
+        INSERT INTO settings(key, value, updated_at)
+        VALUES (:key, :value, now())
+        ON CONFLICT (key) DO UPDATE SET
+            value = EXCLUDED.value,
+            updated_at = now()
         """,
+        [{"key": k, "value": v} for k, v in values.items()],
+        idempotent=True,
+    )
+    _settings_snapshot().update(values)
+
+
+def set_setting(key: str, value: str):
+    set_settings({key: value})
+
+
+def _next_month(d: date) -> date:
+    return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+def _whole_months(start: date, end: date):
+    """
+    [m_start, m_end) spanning the whole calendar months inside [start, end];
+    (start, start) when no whole month fits.
+    """
+    m_start = start if start.day == 1 else _next_month(start)
+    m_end = _next_month(end) if _next_month(end) - timedelta(days=1) == end else end.replace(day=1)
+    if m_start >= m_end:
+        return start, start
+    return m_start, m_end
+
+
+def firmwide_summary(start, end) -> dict:
+    """
+    Firmwide KPI numbers for settlements dated in [start, end], aggregated in SQL.
+    Whole months are read from settlement_monthly_rollup and only the partial months at
+    either edge (e.g. the current month in a YTD view) from settlements. A single
+    GROUP BY ROLLUP(person_name, track) over both then returns the (person, track) cells,
+    the per-person subtotals and the grand total, so no settlement rows leave the DB.
+    """
+    m_start, m_end = _whole_months(start, end)
+    df = query_df(
         """
-        CREATE TABLE IF NOT EXISTS pre_suit_kpis (
-            id BIGSERIAL PRIMARY KEY,
-            person_name TEXT NOT NULL,
-            month TEXT NOT NULL, -- YYYY-MM
-            demands_sent INTEGER NOT NULL DEFAULT 0,
-            settlements_amount DOUBLE PRECISION NOT NULL DEFAULT 0,
-            avg_lien_resolution_days DOUBLE PRECISION NOT NULL DEFAULT 0,
-            files_without_14_day_contact INTEGER NOT NULL DEFAULT 0,
-            nps_score DOUBLE PRECISION NOT NULL DEFAULT 0,
-            active_case_load INTEGER NOT NULL DEFAULT 0,
-            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-            UNIQUE(person_name, month)
-        );
+        WITH base AS (
+            SELECT person_name, track, case_count AS cases,
+                   settlement_sum, fee_sum, last_settlement_date AS last_date
+            FROM settlement_monthly_rollup
+            WHERE month >= :m_start AND month < :m_end
+            UNION ALL
+            SELECT person_name, track, 1, settlement_amount, fee_earned, settlement_date
+            FROM settlements
+            WHERE (settlement_date >= :start AND settlement_date < :m_start)
+               OR (settlement_date >= :m_end AND settlement_date <= :end)
+        )
+        SELECT person_name,
+               track,
+               GROUPING(person_name) AS g_person,
+               GROUPING(track) AS g_track,
+               COALESCE(SUM(cases), 0) AS cases,
+               COALESCE(SUM(settlement_sum), 0) AS settlement_total,
+               COALESCE(SUM(fee_sum), 0) AS fee_total,
+               MAX(last_date) AS last_date
+        FROM base
+        GROUP BY ROLLUP (person_name, track)
         """,
+        {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "m_start": m_start.isoformat(),
+            "m_end": m_end.isoformat(),
+        },
+        dtypes=COLUMN_DTYPES,
+    )
+
+    total = df[(df["g_person"] == 1) & (df["g_track"] == 1)]
+    num_cases = int(total["cases"].sum())
+    total_settlement = float(total["settlement_total"].sum())
+    total_fees = float(total["fee_total"].sum())
+
+    cells = df[(df["g_person"] == 0) & (df["g_track"] == 0)]
+    fees_by_track = cells.groupby("track", observed=True)["fee_total"].sum().astype(float).to_dict()
+
+    people = (
+        df[(df["g_person"] == 0) & (df["g_track"] == 1)]
+        .set_index("person_name")[["cases", "settlement_total", "fee_total", "last_date"]]
+    )
+
+    return {
+        "num_cases": num_cases,
+        "total_settlement": total_settlement,
+        "total_fees": total_fees,
+        "avg_settlement": total_settlement / num_cases if num_cases else 0.0,
+        "avg_fee": total_fees / num_cases if num_cases else 0.0,
+        "fees_by_track": fees_by_track,
+        "people": people,
+    }
+
+
+def person_settlements(person: str, start, end) -> pd.DataFrame:
+    """
+    One person's settlement rows in [start, end], newest first.
+    """
+    return synced_df(
+        "settlements",
+        ["client_name", "settlement_amount", "policy_limits", "fee_earned", "settlement_date", "tod", "track"],
+        "person_name = :person_name AND settlement_date BETWEEN :start AND :end",
+        {"person_name": person, "start": start.isoformat(), "end": end.isoformat()},
+        sort_by=["settlement_date", "id"],
+        ascending=False,
+    )
+
+
+def settlement_trend(first_year: int, last_year: int) -> pd.DataFrame:
+    """
+    Monthly cases, settlement and fee totals for first_year..last_year (up to the current
+    month), per person and for the whole firm (person_name NULL), with the running fee total
+    since January (ytd_fee_total) and the same month a year earlier (prev_*). Months without
+    settlements are zero rows, so every month has its year-earlier counterpart. One windowed
+    aggregate over settlement_monthly_rollup: at most 12 rows per person per year come back
+    however many settlements there are.
+    """
+    last = min(date(last_year, 12, 31), date.today())
+    return query_df(
         """
-        CREATE TABLE IF NOT EXISTS settings (
-            key TEXT PRIMARY KEY,
-            value TEXT NOT NULL,
-            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
-        );
+        WITH by_person AS (
+            SELECT person_name, month,
+                   SUM(case_count) AS cases, SUM(settlement_sum) AS settlement_total, SUM(fee_sum) AS fee_total
+            FROM settlement_monthly_rollup
+            WHERE month >= :start AND month <= :end
+            GROUP BY person_name, month
+        ),
+        months AS (
+            SELECT CAST(m AS DATE) AS month
+            FROM generate_series(CAST(:start AS TIMESTAMP), CAST(:last_month AS TIMESTAMP), INTERVAL '1 month') AS g(m)
+        ),
+        monthly AS (
+            SELECT p.person_name, m.month,
+                   -- Postgres sums BIGINT into NUMERIC, which arrives as Python Decimals.
+                   CAST(COALESCE(SUM(b.cases), 0) AS BIGINT) AS cases,
+                   COALESCE(SUM(b.settlement_total), 0) AS settlement_total,
+                   COALESCE(SUM(b.fee_total), 0) AS fee_total
+            FROM months m
+            CROSS JOIN (SELECT DISTINCT person_name FROM by_person) p
+            LEFT JOIN by_person b ON b.month = m.month AND b.person_name = p.person_name
+            GROUP BY GROUPING SETS ((p.person_name, m.month), (m.month))
+        ),
+        windowed AS (
+            SELECT person_name, month AS month_start, cases, settlement_total, fee_total,
+                   SUM(fee_total) OVER (
+                       PARTITION BY person_name, EXTRACT(YEAR FROM month) ORDER BY month
+                   ) AS ytd_fee_total,
+                   CAST(SUM(cases) OVER last_year AS BIGINT) AS prev_cases,
+                   SUM(settlement_total) OVER last_year AS prev_settlement_total,
+                   SUM(fee_total) OVER last_year AS prev_fee_total
+            FROM monthly
+            WINDOW last_year AS (
+                PARTITION BY person_name ORDER BY month
+                RANGE BETWEEN INTERVAL '1 year' PRECEDING AND INTERVAL '1 year' PRECEDING
+            )
+        )
+        SELECT * FROM windowed
+        WHERE month_start >= :first_month
+        ORDER BY person_name NULLS FIRST, month_start
         """,
-    ]
+        {
+            # Read from a year earlier so the first year has its prev_* values.
+            "start": date(first_year - 1, 1, 1).isoformat(),
+            "end": last.isoformat(),
+            "last_month": last.replace(day=1).isoformat(),
+            "first_month": date(first_year, 1, 1).isoformat(),
+        },
+        dtypes=COLUMN_DTYPES,
+    )
+
+
+# Per-settlement measures the distribution queries can describe (name -> SQL expression).
+DISTRIBUTION_MEASURES = {
+    "settlement_amount": "settlement_amount",
+    "fee_earned": "fee_earned",
+    # Settlement as a share of the policy limits; rows without limits are left out.
+    "limits_ratio": "settlement_amount / NULLIF(policy_limits, 0)",
+}
+PERCENTILES = {"p25": 0.25, "median": 0.5, "p75": 0.75, "p90": 0.9}
+
+
+def settlement_distribution(start, end) -> pd.DataFrame:
+    """
+    Percentiles (PERCENTILES) of every DISTRIBUTION_MEASURES measure for settlements dated in
+    [start, end], one row per person, per track and for the whole firm (`level` says which;
+    person_name/track are NULL where they don't apply), plus the case count. One ordered-set
+    aggregate (percentile_cont) over grouping sets, so only the summary rows leave the DB.
+    Columns are named <measure>_<percentile>, e.g. fee_earned_median.
+    """
+    aggregates = ",\n".join(
+        f"percentile_cont({q}) WITHIN GROUP (ORDER BY {expr}) AS {name}_{label}"
+        for name, expr in DISTRIBUTION_MEASURES.items()
+        for label, q in PERCENTILES.items()
+    )
+    return query_df(
+        f"""
+        SELECT CASE WHEN GROUPING(person_name) = 0 THEN 'person'
+                    WHEN GROUPING(track) = 0 THEN 'track'
+                    ELSE 'firm' END AS level,
+               person_name,
+               track,
+               COUNT(*) AS cases,
+               {aggregates}
+        FROM settlements
+        WHERE settlement_date BETWEEN :start AND :end
+        GROUP BY GROUPING SETS ((person_name), (track), ())
+        ORDER BY level, person_name, track
+        """,
+        {"start": start.isoformat(), "end": end.isoformat()},
+        dtypes=COLUMN_DTYPES,
+    )
+
+
+def settlement_histogram(start, end, measure: str = "settlement_amount", bins: int = 20,
+                         person: str | None = None, track: str | None = None) -> pd.DataFrame:
+    """
+    Approximate histogram of one DISTRIBUTION_MEASURES measure for settlements dated in
+    [start, end] (optionally one person / track): `bins` equal-width buckets from the minimum to
+    the 99th percentile, plus one open-ended bucket for the tail above it, so a few huge cases
+    don't squash every other bar into the first one. Returns bucket_lo, bucket_hi (NULL for the
+    tail bucket) and settlements per non-empty bucket, from one aggregate query.
+    """
+    if measure not in DISTRIBUTION_MEASURES:
+        raise ValueError(f"Unknown measure {measure!r}; expected one of: {', '.join(DISTRIBUTION_MEASURES)}")
+    where = "settlement_date BETWEEN :start AND :end"
+    params = {"start": start.isoformat(), "end": end.isoformat(), "bins": int(bins)}
+    if person is not None:
+        where += " AND person_name = :person_name"
+        params["person_name"] = person
+    if track is not None:
+        where += " AND track = :track"
+        params["track"] = track
+    return query_df(
+        f"""
+        WITH v AS (
+            SELECT {DISTRIBUTION_MEASURES[measure]} AS x FROM settlements WHERE {where}
+        ),
+        bounds AS (
+            SELECT MIN(x) AS lo,
+                   GREATEST(percentile_cont(0.99) WITHIN GROUP (ORDER BY x) - MIN(x), 1e-9) / :bins AS width
+            FROM v
+        ),
+        bucketed AS (
+            SELECT CAST(LEAST(FLOOR((v.x - b.lo) / b.width), :bins) AS INTEGER) AS bucket, b.lo, b.width
+            FROM v CROSS JOIN bounds b
+            WHERE v.x IS NOT NULL
+        )
+        SELECT bucket,
+               MIN(lo) + bucket * MIN(width) AS bucket_lo,
+               CASE WHEN bucket < :bins THEN MIN(lo) + (bucket + 1) * MIN(width) END AS bucket_hi,
+               COUNT(*) AS settlements
+        FROM bucketed
+        GROUP BY bucket
+        ORDER BY bucket
+        """,
+        params,
+    )
+
+
+def _month_start(month: str):
+    """
+    First day of a 'YYYY-MM' month, or None when the string isn't a valid month.
+    """
+    try:
+        return date.fromisoformat(f"{month.strip()}-01")
+    except (AttributeError, ValueError):
+        return None
 
-    def do():
-        conn = get_conn()
-        with conn.session as s:
-            for stmt in ddl_statements:
-                s.execute(text(stmt))
-            s.commit()
 
-        seed = """
-        INSERT INTO settings(key, value)
-        VALUES
-          ('revenue_goal_2026', '0'),
-          ('google_reviews_baseline', '221'),
-          ('google_reviews_current', '221')
-        ON CONFLICT (key) DO NOTHING;
+def pre_suit_months() -> list[str]:
+    """
+    'YYYY-MM' months that have pre-suit KPI rows or pre-suit settlements, newest first.
+    """
+    df = query_df(
         """
-        with conn.session as s:
-            s.execute(text(seed))
-            s.commit()
+        SELECT month FROM pre_suit_kpis
+        UNION
+        SELECT left(CAST(month AS TEXT), 7) FROM settlement_monthly_rollup WHERE track = 'pre_suit'
+        ORDER BY 1 DESC
+        """
+    )
+    return df["month"].dropna().tolist()
 
-    _run_with_retry(do)
 
+def pre_suit_kpis(month: str | None = None) -> pd.DataFrame:
+    """
+    pre_suit_kpis rows for one 'YYYY-MM' month, or every month when month is None.
+    """
+    if month is None:
+        return synced_df("pre_suit_kpis", PRE_SUIT_KPI_COLUMNS, "true", {})
+    return synced_df("pre_suit_kpis", PRE_SUIT_KPI_COLUMNS, "month = :month", {"month": month})
+
+
+def pre_suit_summary(month: str | None = None) -> pd.DataFrame:
+    """
+    Per-person pre-suit case count, settlement/fee totals and latest date for one 'YYYY-MM'
+    month (or all months), read from settlement_monthly_rollup. Indexed by person_name.
+    """
+    sql = """
+        SELECT person_name,
+               SUM(case_count) AS cases,
+               SUM(settlement_sum) AS settlement_total,
+               SUM(fee_sum) AS fee_total,
+               MAX(last_settlement_date) AS last_date
+        FROM settlement_monthly_rollup
+        WHERE track = 'pre_suit'
+    """
+    params = {}
+    if month is not None:
+        month_start = _month_start(month)
+        sql += " AND month = :month_start"
+        params["month_start"] = month_start.isoformat() if month_start else None
+    df = query_df(sql + " GROUP BY person_name", params, dtypes=COLUMN_DTYPES)
+    return df.set_index("person_name")
+
+
+def pre_suit_settlements(month: str | None = None, person: str | None = None) -> pd.DataFrame:
+    """
+    Pre-suit settlement rows for one 'YYYY-MM' month (or every month when month is None),
+    optionally for one person, newest first. The month filter runs on the stored
+    settlement_month column, so it is an index range scan.
+    """
+    where = "track = 'pre_suit'"
+    params = {}
+    if person is not None:
+        where += " AND person_name = :person_name"
+        params["person_name"] = person
+    if month is not None:
+        month_start = _month_start(month)
+        if month_start is None:
+            # Free-text KPI months can't match any settlement date.
+            where += " AND false"
+        else:
+            # The settlement_date bounds repeat the month filter so the planner can prune
+            # to the month's yearly partition.
+            where += (
+                " AND settlement_month = :month_start"
+                " AND settlement_date >= :month_start AND settlement_date < :next_month"
+            )
+            params["month_start"] = month_start.isoformat()
+            params["next_month"] = _next_month(month_start).isoformat()
+    return synced_df(
+        "settlements",
+        ["person_name", "client_name", "settlement_amount", "fee_earned", "settlement_date", "tod"],
+        where,
+        params,
+        sort_by=["settlement_date", "id"],
+        ascending=False,
+    )
+
+
+def verify_settlement_rollup() -> pd.DataFrame:
+    """
+    (person, month, track) groups where settlement_monthly_rollup disagrees with the raw
+    settlements table. Empty when the rollup is consistent.
+    """
+    return query_df(
+        f"""
+        WITH raw AS ({ROLLUP_FROM_SETTLEMENTS})
+        SELECT COALESCE(w.person_name, r.person_name) AS person_name,
+               COALESCE(w.month, r.month) AS month,
+               COALESCE(w.track, r.track) AS track,
+               w.case_count AS raw_cases, r.case_count AS rollup_cases,
+               w.fee_sum AS raw_fees, r.fee_sum AS rollup_fees
+        FROM raw w
+        FULL OUTER JOIN settlement_monthly_rollup r
+          ON r.person_name = w.person_name AND r.month = w.month AND r.track = w.track
+        WHERE w.person_name IS NULL
+           OR r.person_name IS NULL
+           OR r.case_count <> w.case_count
+           OR abs(r.settlement_sum - w.settlement_sum) > 0.005
+           OR abs(r.fee_sum - w.fee_sum) > 0.005
+           OR abs(r.policy_limits_sum - w.policy_limits_sum) > 0.005
+           OR r.last_settlement_date IS DISTINCT FROM w.last_settlement_date
+        ORDER BY 2, 1, 3
+        """,
+        cache=False,
+    )
+
+
+def rebuild_settlement_rollup() -> int:
+    """
+    Recompute settlement_monthly_rollup from settlements in one transaction.
+    Writers are blocked for the duration so no insert can slip between the delete and the refill.
+    Returns the number of rollup rows written.
+    """
+    if not storage_backend().maintains_rollup:
+        # A view on this backend: always current, nothing to rebuild.
+        return int(query_df("SELECT COUNT(*) AS n FROM settlement_monthly_rollup", cache=False)["n"].iloc[0])
 
-def execute(query: str, params: dict | None = None):
     def do():
         conn = get_conn()
         with conn.session as s:
-            s.execute(text(query), params or {})
+            s.execute(text("LOCK TABLE settlements IN SHARE MODE"))
+            s.execute(text("DELETE FROM settlement_monthly_rollup"))
+            n = s.execute(text("INSERT INTO settlement_monthly_rollup " + ROLLUP_FROM_SETTLEMENTS)).rowcount
+            s.execute(text(NOTIFY_SQL), _notify_params(frozenset({"settlement_monthly_rollup"}), None))
             s.commit()
+        return n
 
-    _run_with_retry(do)
+    n = _run_with_retry(do)
+    _query_cache().invalidate(frozenset({"settlement_monthly_rollup"}))
+    return n
 
 
-def query_df(query: str, params: dict | None = None) -> pd.DataFrame:
-    def do():
-        conn = get_conn()
-        return conn.query(query, params=params or {}, ttl=0)
+def truncate_data():
+    """
+    Empty settlements, settlement_monthly_rollup and pre_suit_kpis (settings are kept).
+    On Postgres TRUNCATE skips the rollup triggers, so the rollup is truncated alongside.
+    """
+    for stmt in storage_backend().truncate_statements:
+        execute(stmt, idempotent=True)
 
-    return _run_with_retry(do)
 
+# ------------------ BULK IMPORT ------------------
+TRACKS = ["unknown", "pre_suit", "litigation"]
 
-def get_setting(key: str, default="0") -> str:
-    df = query_df("SELECT value FROM settings WHERE key = :key", {"key": key})
+SETTLEMENT_COLUMNS = [
+    "person_name", "client_name", "settlement_amount", "policy_limits",
+    "fee_earned", "settlement_date", "tod", "track",
+]
+PRE_SUIT_KPI_COLUMNS = [
+    "person_name", "month", "demands_sent", "settlements_amount",
+    "avg_lien_resolution_days", "files_without_14_day_contact", "nps_score",
+]
+
+# Headers as they appear on the app's own tables/forms, so exports can be re-imported as-is.
+_IMPORT_HEADER_ALIASES = {
+    "cm/para": "person_name",
+    "person": "person_name",
+    "client": "client_name",
+    "settlement amount": "settlement_amount",
+    "policy limits": "policy_limits",
+    "fee earned": "fee_earned",
+    "date of settlement": "settlement_date",
+    "tod": "tod",
+    "track": "track",
+    "month": "month",
+    "# demands sent": "demands_sent",
+    "settlements $": "settlements_amount",
+    "avg lien (days)": "avg_lien_resolution_days",
+    "average lien resolution (days)": "avg_lien_resolution_days",
+    "files w/out 14d contact": "files_without_14_day_contact",
+    "no. of files w/out 14 day contact": "files_without_14_day_contact",
+    "nps": "nps_score",
+    "nps score": "nps_score",
+}
+
+_MONTH_RE = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
+def _normalize_headers(df: pd.DataFrame) -> pd.DataFrame:
+    renamed = {}
+    for col in df.columns:
+        key = str(col).strip().lower()
+        renamed[col] = _IMPORT_HEADER_ALIASES.get(key, key)
+    return df.rename(columns=renamed)
+
+
+def _to_number(series: pd.Series) -> pd.Series:
+    # Accept currency-formatted text such as "$12,500.00".
+    if series.dtype == object:
+        series = series.astype(str).str.replace(r"[$,\s]", "", regex=True).replace({"": None, "nan": None})
+    return pd.to_numeric(series, errors="coerce")
+
+
+def _text(series: pd.Series) -> pd.Series:
+    return series.where(series.notna(), None).map(lambda v: None if v is None else str(v).strip() or None)
+
+
+def prepare_settlements(df: pd.DataFrame):
+    """
+    Normalise an uploaded settlements sheet to SETTLEMENT_COLUMNS.
+    Returns (clean_df, errors_df); errors_df lists row number (1-based, as in the file) and problem.
+    """
+    df = _normalize_headers(df)
+    missing = [c for c in ("person_name", "client_name", "settlement_date") if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    out = pd.DataFrame(index=df.index)
+    out["person_name"] = _text(df["person_name"])
+    out["client_name"] = _text(df["client_name"])
+    for col in ("settlement_amount", "policy_limits", "fee_earned"):
+        out[col] = _to_number(df[col]) if col in df.columns else 0.0
+    out["settlement_date"] = pd.to_datetime(df["settlement_date"], errors="coerce").dt.date
+    out["tod"] = _text(df["tod"]) if "tod" in df.columns else None
+    out["track"] = _text(df["track"]).fillna("unknown") if "track" in df.columns else "unknown"
+
+    problems = [
+        (out["person_name"].isna(), "CM/PARA is required"),
+        (out["client_name"].isna(), "CLIENT is required"),
+        (out["settlement_date"].isna(), "DATE OF SETTLEMENT is missing or not a date"),
+        (~out["track"].isin(TRACKS), f"TRACK must be one of {', '.join(TRACKS)}"),
+    ]
+    for col in ("settlement_amount", "policy_limits", "fee_earned"):
+        problems.append((out[col].isna() | (out[col] < 0), f"{col} must be a non-negative number"))
+
+    return _split_errors(out[SETTLEMENT_COLUMNS], problems)
+
+
+def prepare_pre_suit_kpis(df: pd.DataFrame):
+    """
+    Normalise an uploaded pre-suit KPI sheet to PRE_SUIT_KPI_COLUMNS.
+    Returns (clean_df, errors_df). Repeated (person, month) rows keep the last one, like re-saving the form.
+    """
+    df = _normalize_headers(df)
+    missing = [c for c in ("person_name", "month") if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    out = pd.DataFrame(index=df.index)
+    out["person_name"] = _text(df["person_name"])
+    if pd.api.types.is_datetime64_any_dtype(df["month"]):
+        out["month"] = df["month"].dt.strftime("%Y-%m")
+    else:
+        out["month"] = _text(df["month"])
+    for col in PRE_SUIT_KPI_COLUMNS[2:]:
+        out[col] = _to_number(df[col]) if col in df.columns else 0
+
+    problems = [
+        (out["person_name"].isna(), "Person is required"),
+        (~out["month"].fillna("").str.match(_MONTH_RE), "Month must be YYYY-MM"),
+        (out["nps_score"].isna() | ~out["nps_score"].between(0, 5), "NPS must be between 0 and 5"),
+    ]
+    for col in ("demands_sent", "settlements_amount", "avg_lien_resolution_days", "files_without_14_day_contact"):
+        problems.append((out[col].isna() | (out[col] < 0), f"{col} must be a non-negative number"))
+
+    clean, errors = _split_errors(out[PRE_SUIT_KPI_COLUMNS], problems)
+    clean = clean.drop_duplicates(subset=["person_name", "month"], keep="last")
+    for col in ("demands_sent", "files_without_14_day_contact"):
+        clean[col] = clean[col].astype(int)
+    return clean, errors
+
+
+def _split_errors(df: pd.DataFrame, problems):
+    bad = pd.Series(False, index=df.index)
+    messages = []
+    for mask, message in problems:
+        mask = mask.fillna(True)
+        bad |= mask
+        for idx in df.index[mask]:
+            messages.append({"row": int(df.index.get_loc(idx)) + 1, "problem": message})
+    errors = pd.DataFrame(messages, columns=["row", "problem"]).sort_values("row", kind="stable")
+    return df[~bad].reset_index(drop=True), errors.reset_index(drop=True)
+
+
+def _copy_and_merge(staging_columns: str, table: str, columns: list[str], df: pd.DataFrame,
+                    merge_sql: str, chunk_size: int, progress, setup=None) -> dict:
+    """
+    Load `df` into a temp {table}_staging table (declared by `staging_columns`) in chunks, then
+    run `merge_sql` (staging -> target) and commit, all in one transaction on one connection.
+    `setup(raw)`, when given, runs first in the same transaction.
+    """
+    backend = storage_backend()
+    tables, keys = _written_tables(f"INSERT INTO {table}"), _frame_keys(df)
+    started = time.perf_counter()
+    raw = _raw_connection()
+    try:
+        with perf.timed("copy", merge_sql) as call:
+            backend.begin(raw)
+            if setup is not None:
+                setup(raw)
+            raw.cursor().execute(
+                f"CREATE TEMP TABLE {table}_staging ({staging_columns}){backend.temp_table_suffix}"
+            )
+            backend.load_staging(raw, table, columns, df, chunk_size, progress)
+            merged = call["rows"] = backend.execute_count(raw, merge_sql)
+            raw.cursor().execute(f"DROP TABLE {table}_staging")
+            if backend.supports_notify:
+                raw.cursor().execute("SELECT pg_notify(%(channel)s, %(payload)s)", _notify_params(tables, keys))
+            raw.commit()
+    except Exception as e:
+        raw.rollback()
+        dbapi_error = get_conn().engine.dialect.loaded_dbapi.Error
+        if isinstance(e, dbapi_error):
+            # Raise the same SQLAlchemy types (IntegrityError, OperationalError, ...) as the
+            # engine paths, so callers needn't know this one went through the raw driver.
+            raise DBAPIError.instance(None, None, e, dbapi_error) from e
+        raise
+    finally:
+        raw.close()
+
+    seconds = time.perf_counter() - started
+    _query_cache().invalidate(tables, keys)
+    return {
+        "rows": merged,
+        "seconds": seconds,
+        "rows_per_sec": merged / seconds if seconds else 0.0,
+    }
+
+
+def _create_year_partitions(raw, years: list[int]):
+    """
+    Create the settlements partitions missing for `years` inside the open transaction on raw
+    connection `raw`, so an import that rolls back leaves no empty partitions behind. The schema
+    lock is taken (until commit, as a transaction-level advisory lock) only when one is missing.
+    """
+    backend = storage_backend()
+    if not backend.partitions_settlements or not years:
+        return
+    cur = raw.cursor()
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = 'settlements'::regclass")
+    if cur.fetchone()[0] != "p":
+        return  # migration 5 not applied yet; it creates the partitions itself
+    missing = []
+    for year in years:
+        cur.execute(f"SELECT to_regclass({backend.placeholder('part')})", {"part": f"settlements_y{year}"})
+        if cur.fetchone()[0] is None:
+            missing.append(year)
+    if missing:
+        cur.execute(f"SELECT pg_advisory_xact_lock({backend.placeholder('key')})", {"key": SCHEMA_LOCK_KEY})
+        for year in missing:
+            cur.execute(f"SELECT settlements_create_year_partition({backend.placeholder('year')})", {"year": year})
+
+
+def bulk_load_settlements(df: pd.DataFrame, chunk_size: int = 10_000, progress=None) -> dict:
+    """
+    Append settlement rows in one transaction: COPY into a staging table chunk by chunk, then one
+    INSERT ... SELECT into settlements (so the rollup trigger fires once for the whole file).
+    `progress(rows_copied, rows_total)` is called after each chunk.
+    Raises ValueError when any row fails validation; nothing is written in that case.
+    Returns {"rows", "seconds", "rows_per_sec"}.
+    """
+    clean, errors = prepare_settlements(df)
+    if not errors.empty:
+        raise ValueError(f"{len(errors)} row problem(s), first: row {errors.loc[0, 'row']}: {errors.loc[0, 'problem']}")
+    years = sorted(int(y) for y in pd.to_datetime(clean["settlement_date"]).dt.year.unique())
+
+    cols = ", ".join(SETTLEMENT_COLUMNS)
+    return _copy_and_merge(
+        """
+        person_name TEXT NOT NULL,
+        client_name TEXT NOT NULL,
+        settlement_amount DOUBLE PRECISION NOT NULL,
+        policy_limits DOUBLE PRECISION NOT NULL,
+        fee_earned DOUBLE PRECISION NOT NULL,
+        settlement_date DATE NOT NULL,
+        tod TEXT,
+        track TEXT NOT NULL
+        """,
+        "settlements",
+        SETTLEMENT_COLUMNS,
+        clean,
+        f"INSERT INTO settlements ({cols}) SELECT {cols} FROM settlements_staging",
+        chunk_size,
+        progress,
+        # Historical imports get their own year partitions rather than piling into the default one.
+        setup=lambda raw: _create_year_partitions(raw, years),
+    )
+
+
+def bulk_load_pre_suit_kpis(df: pd.DataFrame, chunk_size: int = 10_000, progress=None) -> dict:
+    """
+    Upsert pre-suit KPI rows on (person_name, month) in one transaction via a COPY-loaded staging table.
+    Same contract as bulk_load_settlements.
+    """
+    clean, errors = prepare_pre_suit_kpis(df)
+    if not errors.empty:
+        raise ValueError(f"{len(errors)} row problem(s), first: row {errors.loc[0, 'row']}: {errors.loc[0, 'problem']}")
+
+    cols = ", ".join(PRE_SUIT_KPI_COLUMNS)
+    updates = ",\n".join([f"{c} = EXCLUDED.{c}" for c in PRE_SUIT_KPI_COLUMNS[2:]] + ["updated_at = now()"])
+    return _copy_and_merge(
+        """
+        person_name TEXT NOT NULL,
+        month TEXT NOT NULL,
+        demands_sent INTEGER NOT NULL,
+        settlements_amount DOUBLE PRECISION NOT NULL,
+        avg_lien_resolution_days DOUBLE PRECISION NOT NULL,
+        files_without_14_day_contact INTEGER NOT NULL,
+        nps_score DOUBLE PRECISION NOT NULL
+        """,
+        "pre_suit_kpis",
+        PRE_SUIT_KPI_COLUMNS,
+        clean,
+        f"""
+        INSERT INTO pre_suit_kpis ({cols})
+        SELECT {cols} FROM pre_suit_kpis_staging
+        ON CONFLICT (person_name, month) DO UPDATE SET
+        {updates}
+        """,
+        chunk_size,
+        progress,
+    )
+
+
+def upsert_pre_suit_month(month: str, df: pd.DataFrame) -> int:
+    """
+    Save edited pre-suit KPI rows for one 'YYYY-MM' month as a single multi-row
+    INSERT ... ON CONFLICT (person_name, month) DO UPDATE, i.e. one round trip and one
+    transaction however many people changed. `df` has person_name plus the KPI columns
+    (missing values count as 0, like the form's defaults). Returns the number of rows written.
+    """
     if df.empty:
-        return default
-    return str(df.loc[0, "value"])
+        return 0
+    kpis = PRE_SUIT_KPI_COLUMNS[2:]
+    clean, errors = prepare_pre_suit_kpis(df.assign(month=month).fillna({c: 0 for c in kpis}))
+    if not errors.empty:
+        raise ValueError(f"{len(errors)} row problem(s), first: row {errors.loc[0, 'row']}: {errors.loc[0, 'problem']}")
 
+    # Every row shares :month, which also tells the cache which month was written.
+    params = {"month": month}
+    values = []
+    for i, row in enumerate(clean.drop(columns="month").to_dict("records")):
+        values.append(f"(:person_name_{i}, :month, " + ", ".join(f":{c}_{i}" for c in kpis) + ")")
+        params.update({f"{c}_{i}": v for c, v in row.items()})
 
-def set_setting(key: str, value: str):
+    updates = ",\n".join([f"{c} = EXCLUDED.{c}" for c in kpis] + ["updated_at = now()"])
     execute(
-        """
-        INSERT INTO settings(key, value, updated_at)
-        VALUES (:key, :value, now())
-        ON CONFLICT (key) DO UPDATE SET
-            value = EXCLUDED.value,
-            updated_at = now()
+        f"""
+        INSERT INTO pre_suit_kpis ({", ".join(PRE_SUIT_KPI_COLUMNS)})
+        VALUES {", ".join(values)}
+        ON CONFLICT (person_name, month) DO UPDATE SET
+        {updates}
+        """,
+        params,
+        idempotent=True,
+    )
+    return len(clean)
+
+
+# ------------------ EXPORT ------------------
+EXPORT_CHUNK_SIZE = 5_000
+EXPORT_COLUMNS = ["id"] + SETTLEMENT_COLUMNS
+# A snapshot also keeps the row timestamps, so created_at survives and delta sync marks match.
+SNAPSHOT_COLUMNS = EXPORT_COLUMNS + ["created_at", "updated_at"]
+
+
+def iter_settlements(start=None, end=None, track: str | None = None, chunk_size: int = EXPORT_CHUNK_SIZE,
+                     columns: list[str] = EXPORT_COLUMNS):
+    """
+    Yield settlement rows (`columns`, ordered by date then id) as DataFrames of at most
+    `chunk_size` rows, streamed from the database (a named server-side cursor on Postgres), so
+    only one chunk is ever held in memory. start/end/track are optional filters.
+    """
+    backend = storage_backend()
+    where, params = [], {}
+    if start is not None:
+        where.append(f"settlement_date >= {backend.placeholder('start')}")
+        params["start"] = start
+    if end is not None:
+        where.append(f"settlement_date <= {backend.placeholder('end')}")
+        params["end"] = end
+    if track is not None:
+        where.append(f"track = {backend.placeholder('track')}")
+        params["track"] = track
+    sql = f"SELECT {', '.join(columns)} FROM settlements"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY settlement_date, id"
+
+    raw = _raw_connection()
+    try:
+        # One perf call for the whole stream; its time includes the caller's work between chunks.
+        with perf.timed("stream", sql) as call:
+            call["rows"] = 0
+            backend.begin(raw)
+            for rows in backend.stream_rows(raw, sql, params, chunk_size):
+                call["rows"] += len(rows)
+                yield pd.DataFrame(rows, columns=columns)
+    finally:
+        raw.rollback()
+        raw.close()
+
+
+def write_settlements_export(out, fmt: str = "csv", start=None, end=None, track: str | None = None,
+                             chunk_size: int = EXPORT_CHUNK_SIZE) -> int:
+    """
+    Stream a settlements export into the binary file object `out` as "csv" or "parquet".
+    Returns the number of rows written. The CSV headers match the importer's, so files round-trip.
+    """
+    chunks = iter_settlements(start, end, track, chunk_size)
+    rows = 0
+
+    if fmt == "csv":
+        out.write((",".join(EXPORT_COLUMNS) + "\n").encode())
+        for chunk in chunks:
+            out.write(chunk.to_csv(index=False, header=False).encode())
+            rows += len(chunk)
+        return rows
+
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("id", pa.int64()),
+            ("person_name", pa.string()),
+            ("client_name", pa.string()),
+            ("settlement_amount", pa.float64()),
+            ("policy_limits", pa.float64()),
+            ("fee_earned", pa.float64()),
+            ("settlement_date", pa.date32()),
+            ("tod", pa.string()),
+            ("track", pa.string()),
+        ])
+        with pq.ParquetWriter(out, schema) as writer:
+            for chunk in chunks:
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                rows += len(chunk)
+            if rows == 0:
+                writer.write_table(schema.empty_table())
+        return rows
+
+    raise ValueError(f"Unknown export format: {fmt!r} (expected 'csv' or 'parquet')")
+
+
+# ------------------ DUCKDB SNAPSHOT ------------------
+def snapshot_to_duckdb(path: str, chunk_size: int = 50_000, progress=None) -> dict:
+    """
+    Copy settlements, pre_suit_kpis and settings (ids kept) from the configured Postgres
+    database into a new DuckDB file at `path`, ready for [storage] backend = "duckdb".
+    `progress(table, rows_so_far)` is called after each chunk. Returns {table: rows copied}.
+    """
+    if storage_backend().name == "duckdb":
+        raise RuntimeError("Snapshots are taken from Postgres; [storage] backend is already duckdb.")
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+
+    next_ids = query_df(
+        "SELECT (SELECT COALESCE(MAX(id), 0) + 1 FROM settlements) AS settlements, "
+        "(SELECT COALESCE(MAX(id), 0) + 1 FROM pre_suit_kpis) AS pre_suit_kpis",
+        cache=False,
+    ).iloc[0]
+    engine = create_engine(f"duckdb:///{path}")
+    copied = {}
+    try:
+        with engine.connect() as c:
+            # Sequences first, so new rows in the snapshot continue after the copied ids.
+            for table in ("settlements", "pre_suit_kpis"):
+                c.execute(text(f"CREATE SEQUENCE {table}_id_seq START {int(next_ids[table])}"))
+            for stmt in DUCKDB_SCHEMA_DDL:
+                c.execute(text(stmt))
+            c.commit()
+
+            con = c.connection.driver_connection
+            sources = {
+                "settlements": iter_settlements(chunk_size=chunk_size, columns=SNAPSHOT_COLUMNS),
+                "pre_suit_kpis": [query_df("SELECT * FROM pre_suit_kpis ORDER BY id", cache=False)],
+                "settings": [query_df("SELECT * FROM settings", cache=False)],
+            }
+            for table, chunks in sources.items():
+                copied[table] = 0
+                for chunk in chunks:
+                    cols = ", ".join(chunk.columns)
+                    con.register("snapshot_chunk", chunk)
+                    try:
+                        con.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM snapshot_chunk")
+                    finally:
+                        con.unregister("snapshot_chunk")
+                    copied[table] += len(chunk)
+                    if progress:
+                        progress(table, copied[table])
+            _apply_migrations(c, DUCKDB_MIGRATIONS)
+    finally:
+        engine.dispose()
+    return copied
+
+
+# ------------------ KEYSET PAGINATION ------------------
+def settlements_page(page_size: int = 50, after=None, before=None,
+                     person: str | None = None, track: str | None = None):
+    """
+    One page of settlements in (settlement_date DESC, id DESC) order, by seek rather than OFFSET.
+    after=(settlement_date, id) returns the rows that follow that key (next page); before=... the
+    rows that precede it (previous page). Returns (df, has_more) where has_more says whether more
+    rows exist beyond this page in the direction of travel.
+    """
+    where, params = [], {"limit": page_size + 1}
+    if person is not None:
+        where.append("person_name = :person_name")
+        params["person_name"] = person
+    if track is not None:
+        where.append("track = :track")
+        params["track"] = track
+
+    if before is not None:
+        where.append("(settlement_date, id) > (CAST(:key_date AS DATE), CAST(:key_id AS BIGINT))")
+        params["key_date"], params["key_id"] = before
+        order = "settlement_date ASC, id ASC"
+    else:
+        if after is not None:
+            where.append("(settlement_date, id) < (CAST(:key_date AS DATE), CAST(:key_id AS BIGINT))")
+            params["key_date"], params["key_id"] = after
+        order = "settlement_date DESC, id DESC"
+
+    df = query_df(
+        f"""
+        SELECT id, {', '.join(SETTLEMENT_COLUMNS)}
+        FROM settlements
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY {order}
+        LIMIT :limit
+        """,
+        params,
+        dtypes=COLUMN_DTYPES,
+    )
+    has_more = len(df) > page_size
+    df = df.head(page_size)
+    if before is not None:
+        df = df.iloc[::-1].reset_index(drop=True)
+    return df, has_more
+
+
+def pre_suit_kpis_page(page_size: int = 50, after=None, before=None, person: str | None = None):
+    """
+    One page of pre_suit_kpis in (month DESC, person_name ASC) order, by seek rather than OFFSET.
+    after/before are (month, person_name) keys; same contract as settlements_page.
+    """
+    where, params = [], {"limit": page_size + 1}
+    if person is not None:
+        where.append("person_name = :person_name")
+        params["person_name"] = person
+
+    # The sort directions are mixed, so spell the seek out; the leading "month <=/>=" bound
+    # is what lets the (month DESC, person_name) index start at the key.
+    if before is not None:
+        where.append("month >= :key_month AND (month > :key_month OR person_name < :key_person)")
+        params["key_month"], params["key_person"] = before
+        order = "month ASC, person_name DESC"
+    else:
+        if after is not None:
+            where.append("month <= :key_month AND (month < :key_month OR person_name > :key_person)")
+            params["key_month"], params["key_person"] = after
+        order = "month DESC, person_name ASC"
+
+    df = query_df(
+        f"""
+        SELECT {', '.join(PRE_SUIT_KPI_COLUMNS)}
+        FROM pre_suit_kpis
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY {order}
+        LIMIT :limit
         """,
-        {"key": key, "value": value},
+        params,
+        dtypes=COLUMN_DTYPES,
     )
+    has_more = len(df) > page_size
+    df = df.head(page_size)
+    if before is not None:
+        df = df.iloc[::-1].reset_index(drop=True)
+    return df, has_more
@@ -0,0 +1,76 @@
+"""
+DataFrame helpers shared by the dashboard pages.
+"""
+import pandas as pd
+
+# dtypes for the columns the dashboard reads, applied once when a frame is loaded (see
+# db.query_df(dtypes=...)). Dates stay datetime64 and names categorical all the way to the
+# page; turning them into strings is left to display time (st.column_config / strftime).
+COLUMN_DTYPES = {
+    "id": "int64",
+    "person_name": "category",
+    "track": "category",
+    "tod": "category",
+    "month": "category",
+    "settlement_date": "datetime64[ns]",
+    "last_date": "datetime64[ns]",
+    "month_start": "datetime64[ns]",
+    "settlement_amount": "float64",
+    "policy_limits": "float64",
+    "fee_earned": "float64",
+    "settlement_total": "float64",
+    "fee_total": "float64",
+    "ytd_fee_total": "float64",
+    "prev_settlement_total": "float64",
+    "prev_fee_total": "float64",
+    "settlements_amount": "float64",
+    "avg_lien_resolution_days": "float64",
+    "nps_score": "float64",
+    "cases": "int64",
+    "prev_cases": "int64",
+    "demands_sent": "int32",
+    "files_without_14_day_contact": "int32",
+}
+
+
+def typed(df: pd.DataFrame, dtypes: dict = COLUMN_DTYPES) -> pd.DataFrame:
+    """
+    `df` with each column named in `dtypes` cast to its dtype (other columns untouched).
+    Integer columns that contain NULLs become the matching nullable type (Int64, Int32).
+    """
+    casts = {}
+    for col, dtype in dtypes.items():
+        if col not in df.columns:
+            continue
+        if dtype.startswith("int") and df[col].isna().any():
+            dtype = dtype.capitalize()
+        if df[col].dtype != dtype:
+            casts[col] = dtype
+    return df.astype(casts) if casts else df
+
+
+def person_stats(df: pd.DataFrame, people, key: str = "person_name", **aggs) -> pd.DataFrame:
+    """
+    Named aggregations per person in one groupby pass, e.g.
+    person_stats(df, PEOPLE, fees=("fee_earned", "sum")).
+    Returns one row per entry of `people` (in that order) plus an `n_rows` column;
+    people without rows get n_rows 0 and NaN stats.
+    """
+    if df.empty:
+        stats = pd.DataFrame({"n_rows": pd.Series(dtype="int64"), **{k: pd.Series(dtype="float64") for k in aggs}})
+    else:
+        stats = df.groupby(key, sort=False, observed=True).agg(n_rows=(key, "size"), **aggs)
+    stats = stats.reindex(people)
+    stats["n_rows"] = stats["n_rows"].fillna(0).astype(int)
+    return stats
+
+
+def changed_rows(original: pd.DataFrame, edited: pd.DataFrame, key: str) -> pd.DataFrame:
+    """
+    Rows of `edited` that differ from the row with the same `key` in `original` (or have no
+    such row), e.g. what st.data_editor changed. Two missing values count as equal.
+    """
+    edited = edited.set_index(key)
+    before = original.set_index(key).reindex(index=edited.index, columns=edited.columns)
+    same = (edited == before) | (edited.isna() & before.isna())
+    return edited[~same.all(axis=1)].reset_index()
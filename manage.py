@@ -0,0 +1,220 @@
+"""
+Maintenance commands for the dashboard database.
+
+    python manage.py migrate
+    python manage.py check-indexes
+    python manage.py rebuild-rollup [--verify-only]
+    python manage.py export --format parquet --start 2025-01-01 --end 2025-12-31 --out settlements.parquet
+    python manage.py seed --settlements 100000 --people 50 --years 3 --seed 0
+    python manage.py snapshot --out kpi.duckdb
+    python manage.py check-cache-sync [--kill-connection]
+    python manage.py partition-settlements [--batch-size 50000]
+    python manage.py partitions [--ensure] [--archive-year 2019]
+
+Run from the repo root so .streamlit/secrets.toml is picked up.
+"""
+import argparse
+import sys
+from datetime import date
+
+import db
+import synth
+
+
+def cmd_migrate(args) -> int:
+    db.init_db()
+    print(f"Schema is at version {db.SCHEMA_VERSION}.")
+    return 0
+
+
+def cmd_check_indexes(args) -> int:
+    try:
+        report = db.check_indexes()
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(report.to_string(index=False))
+    ok = report["ok"].all()
+    if db.storage_backend().partitions_settlements and db.current_schema_version() >= 5:
+        pruning = db.check_partition_pruning()
+        print()
+        print(pruning.to_string(index=False))
+        ok = ok and pruning["ok"].all()
+    return 0 if ok else 1
+
+
+def cmd_partition_settlements(args) -> int:
+    def progress(done, total):
+        print(f"\r{done:,}/{total:,} rows copied", end="", file=sys.stderr, flush=True)
+
+    try:
+        stats = db.partition_settlements(args.batch_size, progress)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if not stats["swapped"]:
+        print("settlements is already partitioned.")
+    else:
+        print(f"\nsettlements partitioned by year ({stats['rows']:,} rows backfilled online, {stats['seconds']:.1f}s).")
+    print(db.settlement_partitions().to_string(index=False))
+    return 0
+
+
+def cmd_partitions(args) -> int:
+    try:
+        if args.ensure:
+            created = db.ensure_settlement_partitions()
+            print(f"Created partitions for: {', '.join(map(str, created))}." if created else "All partitions exist.")
+        if args.archive_year:
+            print(f"Detached {db.detach_settlement_year(args.archive_year)}; dump it, then DROP it.")
+    except (RuntimeError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(db.settlement_partitions().to_string(index=False))
+    return 0
+
+
+def cmd_check_cache_sync(args) -> int:
+    try:
+        result = db.check_cache_sync(args.timeout, args.kill_connection)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if not result["listening"]:
+        print(f"Listener could not connect: {result['error']}", file=sys.stderr)
+        return 1
+
+    ok = result["cached"] and result["invalidation_ms"] is not None and result["other_window_kept"]
+    if not result["cached"]:
+        print("The probe queries were not cached.", file=sys.stderr)
+    if result["invalidation_ms"] is None:
+        print(f"Cached window was NOT invalidated within {args.timeout:.0f}s.")
+    else:
+        print(f"Cached window invalidated {result['invalidation_ms']:.1f} ms after the NOTIFY.")
+    print(f"Window outside the written range {'kept' if result['other_window_kept'] else 'DROPPED'}.")
+    if args.kill_connection:
+        ok = ok and result["fallback_ms"] is not None and result["reconnect_ms"] is not None
+        if result["fallback_ms"] is None:
+            print("TTL fallback did NOT engage after the listener connection was killed.")
+        else:
+            print(f"TTL fallback ({result['fallback_ttl']:.0f}s) engaged {result['fallback_ms']:.1f} ms after the kill.")
+        if result["reconnect_ms"] is None:
+            print("Listener did NOT reconnect.")
+        else:
+            print(f"Listener reconnected after {result['reconnect_ms']:.0f} ms.")
+    return 0 if ok else 1
+
+
+def cmd_rebuild_rollup(args) -> int:
+    mismatches = db.verify_settlement_rollup()
+    if mismatches.empty:
+        print("settlement_monthly_rollup matches settlements.")
+    else:
+        print(f"{len(mismatches)} rollup group(s) differ from settlements:")
+        print(mismatches.to_string(index=False))
+
+    if args.verify_only:
+        return 0 if mismatches.empty else 1
+
+    n = db.rebuild_settlement_rollup()
+    remaining = db.verify_settlement_rollup()
+    print(f"Rebuilt settlement_monthly_rollup ({n} rows); {len(remaining)} mismatch(es) remain.")
+    return 0 if remaining.empty else 1
+
+
+def cmd_export(args) -> int:
+    if args.out == "-":
+        n = db.write_settlements_export(sys.stdout.buffer, args.format, args.start, args.end, args.track, args.chunk_size)
+    else:
+        with open(args.out, "wb") as f:
+            n = db.write_settlements_export(f, args.format, args.start, args.end, args.track, args.chunk_size)
+    print(f"Exported {n} settlement rows.", file=sys.stderr)
+    return 0
+
+
+def cmd_seed(args) -> int:
+    if args.truncate and not args.yes:
+        answer = input("This deletes every settlement and pre-suit KPI row. Continue? [y/N] ")
+        if answer.strip().lower() != "y":
+            return 1
+    db.ensure_schema()
+    stats = synth.seed_database(args.settlements, args.people, args.years, args.seed, args.end_year, args.truncate)
+    for table in ("settlements", "pre_suit_kpis"):
+        s = stats[table]
+        print(f"{table}: {s['rows']:,} rows in {s['seconds']:.1f}s ({s['rows_per_sec']:,.0f} rows/s)")
+    print(f"settings: {stats['settings']} keys")
+    return 0
+
+
+def cmd_snapshot(args) -> int:
+    try:
+        copied = db.snapshot_to_duckdb(args.out, args.chunk_size)
+    except (RuntimeError, FileExistsError) as e:
+        print(f"snapshot: {e}", file=sys.stderr)
+        return 1
+    for table, n in copied.items():
+        print(f"{table}: {n:,} rows")
+    print(f'Wrote {args.out}; use it with [storage] backend = "duckdb", duckdb_path = "{args.out}".')
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("migrate", help="create tables and apply pending migrations").set_defaults(func=cmd_migrate)
+    sub.add_parser(
+        "check-indexes", help="EXPLAIN the dashboard queries and verify they use their indexes"
+    ).set_defaults(func=cmd_check_indexes)
+
+    sync = sub.add_parser("check-cache-sync", help="test cross-replica cache invalidation (LISTEN/NOTIFY)")
+    sync.add_argument("--timeout", type=float, default=5.0, help="seconds to wait for each step")
+    sync.add_argument("--kill-connection", action="store_true",
+                      help="also kill the listener's connection to test the TTL fallback and reconnect")
+    sync.set_defaults(func=cmd_check_cache_sync)
+
+    part = sub.add_parser("partition-settlements", help="convert settlements to yearly partitions online")
+    part.add_argument("--batch-size", type=int, default=db.PARTITION_BACKFILL_BATCH)
+    part.set_defaults(func=cmd_partition_settlements)
+
+    parts = sub.add_parser("partitions", help="list the yearly settlements partitions")
+    parts.add_argument("--ensure", action="store_true", help="create this and next year's partitions if missing")
+    parts.add_argument("--archive-year", type=int, help="detach this year's partition for archiving")
+    parts.set_defaults(func=cmd_partitions)
+
+    rebuild = sub.add_parser(
+        "rebuild-rollup", help="verify settlement_monthly_rollup against settlements and rebuild it"
+    )
+    rebuild.add_argument("--verify-only", action="store_true", help="report mismatches without rebuilding")
+    rebuild.set_defaults(func=cmd_rebuild_rollup)
+
+    export = sub.add_parser("export", help="stream settlements to CSV or Parquet")
+    export.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    export.add_argument("--start", type=date.fromisoformat, help="first settlement date (YYYY-MM-DD)")
+    export.add_argument("--end", type=date.fromisoformat, help="last settlement date (YYYY-MM-DD)")
+    export.add_argument("--track", choices=db.TRACKS)
+    export.add_argument("--chunk-size", type=int, default=db.EXPORT_CHUNK_SIZE)
+    export.add_argument("--out", default="-", help="output path, '-' for stdout (default)")
+    export.set_defaults(func=cmd_export)
+
+    seed = sub.add_parser("seed", help="fill the database with seeded synthetic data")
+    seed.add_argument("--settlements", type=int, default=10_000)
+    seed.add_argument("--people", type=int, default=5)
+    seed.add_argument("--years", type=int, default=3)
+    seed.add_argument("--seed", type=int, default=0)
+    seed.add_argument("--end-year", type=int, help="last year of data (default: this year)")
+    seed.add_argument("--append", dest="truncate", action="store_false", help="keep existing rows")
+    seed.add_argument("--yes", action="store_true", help="don't ask before truncating")
+    seed.set_defaults(func=cmd_seed)
+
+    snapshot = sub.add_parser("snapshot", help="copy the Postgres data into a new DuckDB file")
+    snapshot.add_argument("--out", default=db.DEFAULT_DUCKDB_PATH, help="DuckDB file to create (must not exist)")
+    snapshot.add_argument("--chunk-size", type=int, default=50_000)
+    snapshot.set_defaults(func=cmd_snapshot)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""
+Per-rerun performance instrumentation.
+
+Every DB call made through db.query_df / db.execute (and, via timed(sql=...), the raw-driver
+ones: COPY loads, streamed exports, the cache listener) is recorded with its duration, rows,
+bytes, retries and the page that issued it; calls slower than the slow-query threshold are
+also logged. Append ?perf=1 to the app URL to show the developer panel in the sidebar.
+
+Threshold override in .streamlit/secrets.toml:
+[perf]
+slow_query_ms = 250
+"""
+import functools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import streamlit as st
+import pandas as pd
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+SLOW_QUERY_MS = 500.0
+RECENT_CALLS = 1000  # process-wide history kept for the JSON export
+PANEL_REFRESH_SECONDS = 3.0  # the panel redraws itself, since fragment reruns can't update it
+
+_RUN_KEY = "_perf_run"
+_PANEL_KEY = "_perf_panel"
+
+slow_log = logging.getLogger("law_kpi_dashboard.slow_query")
+
+
+def slow_query_ms() -> float:
+    try:
+        return float(st.secrets.get("perf", {}).get("slow_query_ms", SLOW_QUERY_MS))
+    except FileNotFoundError:
+        return SLOW_QUERY_MS
+
+
+class RunStats:
+    """
+    DB calls and timers for one script rerun of one session: a full run, or a rerun of just
+    one fragment (`fragment` is then its function's name).
+    """
+
+    def __init__(self, page: str | None = None, fragment: str | None = None):
+        self.page = page
+        self.fragment = fragment
+        self.started = time.perf_counter()
+        self.ended = None
+        self.calls = []
+        self.timers = {"pandas": 0.0}
+        self._lock = threading.Lock()
+
+    def add(self, call: dict):
+        with self._lock:
+            self.calls.append(call)
+
+    def finish(self):
+        self.ended = time.perf_counter()
+
+    def add_time(self, bucket: str, seconds: float):
+        with self._lock:
+            self.timers[bucket] = self.timers.get(bucket, 0.0) + seconds
+
+    def totals(self) -> dict:
+        """
+        db_ms is wall time spent waiting on the database (overlapping fetch_many calls count
+        once); render_ms is whatever is left of the rerun after DB and timed pandas work.
+        """
+        with self._lock:
+            calls = list(self.calls)
+            timers = dict(self.timers)
+        wall_ms = ((self.ended or time.perf_counter()) - self.started) * 1000.0
+
+        db_ms, busy_until = 0.0, None
+        for start, end in sorted((c["_start"], c["_start"] + c["ms"]) for c in calls if not c["cached"]):
+            if busy_until is None or start > busy_until:
+                db_ms += end - start
+                busy_until = end
+            elif end > busy_until:
+                db_ms += end - busy_until
+                busy_until = end
+
+        pandas_ms = timers.get("pandas", 0.0) * 1000.0
+        return {
+            "page": self.page,
+            "fragment": self.fragment,
+            "queries": len(calls),
+            "cache_hits": sum(c["cached"] for c in calls),
+            "retries": sum(c["retries"] for c in calls),
+            "rows": sum(c["rows"] or 0 for c in calls),
+            "bytes": sum(c["bytes"] or 0 for c in calls),
+            "db_ms": db_ms,
+            "pandas_ms": pandas_ms,
+            "render_ms": max(0.0, wall_ms - db_ms - pandas_ms),
+            "wall_ms": wall_ms,
+        }
+
+
+@st.cache_resource
+def _recent_calls() -> deque:
+    return deque(maxlen=RECENT_CALLS)
+
+
+def start_run(fragment: str | None = None) -> RunStats:
+    """
+    Begin recording a rerun; call once at the top of the script (fragment reruns start their
+    own, see fragment()).
+    """
+    previous = current_run()
+    run = RunStats(page=previous.page if previous and fragment else None, fragment=fragment)
+    st.session_state[_RUN_KEY] = run
+    return run
+
+
+def finish_run():
+    run = current_run()
+    if run is not None:
+        run.finish()
+
+
+def fragment(func):
+    """
+    st.fragment, plus perf attribution: when Streamlit reruns just this fragment (a widget
+    inside it changed), its DB calls and timers are recorded as a rerun of their own instead
+    of piling into the last full run's totals. Nested inside a fragment that is itself being
+    rerun, it counts toward that one.
+    """
+    @functools.wraps(func)
+    def run_fragment(*args, **kwargs):
+        ctx = get_script_run_ctx(suppress_warning=True)
+        if ctx is None or ctx.current_fragment_id not in (ctx.fragment_ids_this_run or ()):
+            return func(*args, **kwargs)
+        run = start_run(fragment=func.__name__)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            run.finish()
+
+    return st.fragment(run_fragment)
+
+
+def set_page(page: str):
+    run = current_run()
+    if run is not None:
+        run.page = page
+
+
+def current_run() -> RunStats | None:
+    # Outside a Streamlit script run (manage.py, bench.py) there is no session to attribute to.
+    if get_script_run_ctx() is None:
+        return None
+    return st.session_state.get(_RUN_KEY)
+
+
+def record_call(kind: str, sql: str, started: float, rows: int | None = None, nbytes: int | None = None,
+                retries: int = 0, cached: bool = False, error: str | None = None):
+    """
+    Record one DB call that began at time.perf_counter() value `started` and just finished.
+    """
+    ms = (time.perf_counter() - started) * 1000.0
+    run = current_run()
+    call = {
+        "at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "page": run.page if run else None,
+        "kind": kind,
+        "sql": " ".join(sql.split()),
+        "ms": ms,
+        "rows": rows,
+        "bytes": nbytes,
+        "retries": retries,
+        "cached": cached,
+        "error": error,
+    }
+    _recent_calls().append(call)
+    if run is not None:
+        run.add({**call, "_start": (started - run.started) * 1000.0})
+
+    if not cached and ms >= slow_query_ms():
+        slow_log.warning("slow %s (%.0f ms, %s rows, page=%s): %s", kind, ms, rows, call["page"], call["sql"][:500])
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """
+    Size of a result for the call log. Counting string/object payloads (deep) can cost more
+    than the cache hit being recorded, so it is only done while the panel is on for this
+    session; otherwise the size is the column buffers alone.
+    """
+    deep = get_script_run_ctx(suppress_warning=True) is not None and st.session_state.get(_PANEL_KEY, False)
+    return int(df.memory_usage(deep=deep).sum())
+
+
+@contextmanager
+def timed(bucket: str = "pandas", sql: str | None = None):
+    """
+    Add the wall time of the with-block to the current rerun's `bucket` timer. With `sql`, the
+    block is a DB call made on a raw driver connection instead, recorded like query_df's with
+    kind `bucket`; set "rows" on the yielded dict once known.
+    """
+    started = time.perf_counter()
+    call, error = {"rows": None}, None
+    try:
+        yield call
+    except Exception as e:
+        error = repr(e)
+        raise
+    finally:
+        if sql is not None:
+            record_call(bucket, sql, started, rows=call["rows"], error=error)
+        else:
+            run = current_run()
+            if run is not None:
+                run.add_time(bucket, time.perf_counter() - started)
+
+
+def export_json(run: RunStats | None = None) -> str:
+    """
+    This rerun's totals and calls plus the process-wide recent-call history, as JSON.
+    """
+    run = run or current_run()
+    calls = [{k: v for k, v in c.items() if not k.startswith("_")} for c in run.calls] if run else []
+    return json.dumps({
+        "totals": run.totals() if run else None,
+        "calls": calls,
+        "recent_calls": list(_recent_calls()),
+        "slow_query_ms": slow_query_ms(),
+    }, indent=2, default=str)
+
+
+def panel_enabled() -> bool:
+    """
+    The panel is hidden unless the session was opened with ?perf=1 (remembered for the session).
+    """
+    if st.query_params.get("perf") == "1":
+        st.session_state[_PANEL_KEY] = True
+    return st.session_state.get(_PANEL_KEY, False)
+
+
+def render_panel(container):
+    """
+    Close this rerun and draw the panel into `container` (a placeholder made at the top of
+    the script, filled at the end once the totals are known). The panel is a fragment that
+    redraws itself every PANEL_REFRESH_SECONDS, so it also picks up fragment reruns, which
+    never reach the end of the script.
+    """
+    finish_run()
+    with container.container():
+        _panel()
+
+
+@st.fragment(run_every=PANEL_REFRESH_SECONDS)
+def _panel():
+    run = current_run()
+    if run is None:
+        return
+    totals = run.totals()
+    st.markdown("**Performance (last rerun)**")
+    st.caption(f"Fragment rerun: {run.fragment}" if run.fragment else "Full page run")
+    c1, c2 = st.columns(2)
+    c1.metric("Queries", f"{totals['queries']}", help=f"{totals['cache_hits']} served from the query cache")
+    c2.metric("DB ms", f"{totals['db_ms']:.0f}")
+    c1.metric("pandas ms", f"{totals['pandas_ms']:.0f}")
+    c2.metric("Render ms", f"{totals['render_ms']:.0f}")
+    if run.calls:
+        calls = pd.DataFrame(run.calls)[["kind", "ms", "rows", "bytes", "retries", "cached", "sql"]]
+        st.dataframe(calls, hide_index=True, column_config={"ms": st.column_config.NumberColumn(format="%.1f")})
+    st.download_button(
+        "Download perf JSON",
+        data=export_json(run),
+        file_name=f"perf_{datetime.now():%Y%m%d_%H%M%S}.json",
+        mime="application/json",
+        use_container_width=True,
+    )
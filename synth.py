@@ -0,0 +1,107 @@
+"""
+Seeded synthetic data for benchmarks and local development.
+
+    python manage.py seed --settlements 100000 --people 50 --years 3 --seed 0
+
+The same arguments always produce the same rows, so benchmark runs are comparable.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import db
+from views.common import PEOPLE
+
+TODS = ["MVA", "Premises", "Dog bite", "Slip and fall", "Trucking", None]
+
+
+def people_names(n: int) -> list[str]:
+    """
+    The people the dashboards draw boxes for (views.common.PEOPLE) come first, so every
+    dashboard has data to show; larger rosters are padded with generated names.
+    """
+    return PEOPLE[:n] + [f"Person {i:03d}" for i in range(len(PEOPLE) + 1, n + 1)]
+
+
+def synthetic_settlements(rows: int, people: int = 5, years: int = 3, seed: int = 0,
+                          end_year: int | None = None) -> pd.DataFrame:
+    """
+    `rows` settlements (SETTLEMENT_COLUMNS) spread over `years` calendar years ending with
+    `end_year` (default: this year), never after today. Amounts are log-normal, rounded to
+    $1,000; the fee is a third.
+    """
+    rng = np.random.default_rng(seed)
+    end_year = end_year or date.today().year
+    first = np.datetime64(f"{end_year - years + 1}-01-01")
+    last = min(np.datetime64(f"{end_year}-12-31"), np.datetime64(date.today()))
+    days = int((last - first).astype(int)) + 1
+    if days < 1:
+        raise ValueError(f"{end_year - years + 1}-{end_year} has no days up to today")
+
+    amount = np.round(rng.lognormal(mean=11.5, sigma=0.8, size=rows), -3).clip(1000, 5_000_000)
+    names = np.array(people_names(people), dtype=object)
+    tods = np.array(TODS, dtype=object)
+    return pd.DataFrame({
+        "person_name": names[rng.integers(0, people, rows)],
+        "client_name": [f"Client {i:07d}" for i in range(rows)],
+        "settlement_amount": amount,
+        "policy_limits": amount * rng.choice([1.0, 1.5, 2.0, 3.0], rows),
+        "fee_earned": np.round(amount / 3, 2),
+        "settlement_date": first + rng.integers(0, days, rows).astype("timedelta64[D]"),
+        "tod": tods[rng.integers(0, len(tods), rows)],
+        "track": rng.choice(db.TRACKS, rows, p=[0.2, 0.45, 0.35]),
+    })
+
+
+def synthetic_pre_suit_kpis(people: int = 5, years: int = 3, seed: int = 0,
+                            end_year: int | None = None) -> pd.DataFrame:
+    """
+    One pre_suit_kpis row (PRE_SUIT_KPI_COLUMNS) per person per month of `years` years, up to
+    the current month.
+    """
+    rng = np.random.default_rng(seed + 1)
+    end_year = end_year or date.today().year
+    this_month = date.today().strftime("%Y-%m")
+    months = [
+        month for month in (f"{y}-{m:02d}" for y in range(end_year - years + 1, end_year + 1) for m in range(1, 13))
+        if month <= this_month
+    ]
+    grid = pd.MultiIndex.from_product([people_names(people), months], names=["person_name", "month"])
+    n = len(grid)
+    return grid.to_frame(index=False).assign(
+        demands_sent=rng.integers(0, 25, n),
+        settlements_amount=np.round(rng.gamma(2.0, 150_000, n), -3),
+        avg_lien_resolution_days=np.round(rng.uniform(5, 75, n), 1),
+        files_without_14_day_contact=rng.integers(0, 8, n),
+        nps_score=rng.integers(0, 11, n) / 2,
+    )
+
+
+def synthetic_settings(years: int = 3, seed: int = 0, end_year: int | None = None) -> dict:
+    rng = np.random.default_rng(seed + 2)
+    end_year = end_year or date.today().year
+    out = {f"revenue_goal_{y}": str(int(rng.integers(20, 80)) * 1_000_000) for y in range(end_year - years + 1, end_year + 1)}
+    baseline = int(rng.integers(100, 400))
+    out.update({"google_reviews_baseline": str(baseline), "google_reviews_current": str(baseline + int(rng.integers(0, 60)))})
+    return out
+
+
+def seed_database(settlements: int = 10_000, people: int = 5, years: int = 3, seed: int = 0,
+                  end_year: int | None = None, truncate: bool = True, progress=None) -> dict:
+    """
+    Fill settlements, pre_suit_kpis and settings through the bulk-load (COPY) path.
+    With truncate=True existing settlement/KPI rows are removed first.
+    Returns {"settlements": load stats, "pre_suit_kpis": load stats, "settings": n}.
+    """
+    if truncate:
+        db.truncate_data()
+    settings = synthetic_settings(years, seed, end_year)
+    db.set_settings(settings)
+    return {
+        "settlements": db.bulk_load_settlements(
+            synthetic_settlements(settlements, people, years, seed, end_year), chunk_size=50_000, progress=progress
+        ),
+        "pre_suit_kpis": db.bulk_load_pre_suit_kpis(synthetic_pre_suit_kpis(people, years, seed, end_year)),
+        "settings": len(settings),
+    }
@@ -0,0 +1,32 @@
+import logging
+import os
+import sys
+
+import pytest
+import streamlit as st
+
+# The app is a set of flat modules at the repo root, not an installed package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def quiet_bare_mode():
+    # Streamlit warns on every cached call made outside `streamlit run`; that is expected here.
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+
+
+@pytest.fixture
+def duckdb_db(tmp_path, monkeypatch):
+    """
+    A fresh, migrated DuckDB database as the configured backend ([storage] backend = "duckdb"),
+    with every process-wide cache (connection, query cache, settings) rebuilt around it.
+    """
+    storage = {"backend": "duckdb", "duckdb_path": str(tmp_path / "kpi.duckdb")}
+    monkeypatch.setattr(db, "_secrets_section", lambda *path: storage if path == ("storage",) else {})
+    st.cache_resource.clear()
+    db.init_db()
+    yield db
+    db.get_conn().engine.dispose()
+    st.cache_resource.clear()
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, ProgrammingError, TimeoutError as PoolTimeout
+
+import db
+from db import CircuitBreaker
+
+
+def half_open_breaker(monkeypatch) -> CircuitBreaker:
+    breaker = CircuitBreaker(threshold=1, cooldown=60.0)
+    breaker.record_failure(RuntimeError("down"))
+    breaker._opened_at = time.monotonic() - 61.0
+    assert breaker.state() == "half-open"
+    monkeypatch.setattr(db, "_breaker", lambda: breaker)
+    return breaker
+
+
+def failing(error):
+    def fn():
+        raise error
+    return fn
+
+
+@pytest.mark.parametrize("error", [
+    OperationalError("SELECT 1", {}, Exception("server closed the connection unexpectedly")),
+    InterfaceError("SELECT 1", {}, Exception("connection already closed"), connection_invalidated=True),
+    DBAPIError("SELECT 1", {}, Exception("SSL SYSCALL error: EOF detected"), connection_invalidated=True),
+    PoolTimeout("QueuePool limit of size 5 overflow 5 reached, connection timed out, timeout 10.00"),
+], ids=["operational", "interface-invalidated", "dbapi-invalidated", "pool-timeout"])
+def test_failed_trial_call_reopens_breaker(monkeypatch, error):
+    breaker = half_open_breaker(monkeypatch)
+    with pytest.raises(type(error)):
+        db._run_with_retry(failing(error), attempts=1)
+    assert breaker.state() == "open"
+
+
+def test_answered_error_on_trial_call_closes_breaker(monkeypatch):
+    breaker = half_open_breaker(monkeypatch)
+    error = ProgrammingError("SELEC 1", {}, Exception("syntax error"))
+    with pytest.raises(ProgrammingError):
+        db._run_with_retry(failing(error), attempts=1)
+    assert breaker.state() == "closed"
+
+
+def test_invalidated_connection_is_retried(monkeypatch):
+    monkeypatch.setattr(db, "_breaker", lambda: CircuitBreaker())
+    monkeypatch.setattr(db.time, "sleep", lambda seconds: None)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise InterfaceError("SELECT 1", {}, Exception("connection already closed"), connection_invalidated=True)
+        return "ok"
+
+    assert db._run_with_retry(flaky) == "ok"
+    assert len(calls) == 2
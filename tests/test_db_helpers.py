@@ -0,0 +1,104 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from db import (
+    BACKENDS, TRACKS, StorageBackend, _outside_written_keys, _whole_months, _write_keys, prepare_pre_suit_kpis,
+    prepare_settlements,
+)
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    # Whole months only: a partial month at either end is left to the raw table.
+    (date(2026, 1, 1), date(2026, 3, 31), (date(2026, 1, 1), date(2026, 4, 1))),
+    (date(2026, 1, 15), date(2026, 3, 31), (date(2026, 2, 1), date(2026, 4, 1))),
+    (date(2026, 1, 1), date(2026, 3, 10), (date(2026, 1, 1), date(2026, 3, 1))),
+    (date(2026, 1, 15), date(2026, 3, 10), (date(2026, 2, 1), date(2026, 3, 1))),
+    (date(2025, 12, 1), date(2025, 12, 31), (date(2025, 12, 1), date(2026, 1, 1))),
+    (date(2024, 2, 1), date(2024, 2, 29), (date(2024, 2, 1), date(2024, 3, 1))),
+    # No whole month inside the range.
+    (date(2026, 1, 5), date(2026, 1, 20), (date(2026, 1, 5), date(2026, 1, 5))),
+    (date(2026, 1, 15), date(2026, 2, 10), (date(2026, 1, 15), date(2026, 1, 15))),
+])
+def test_whole_months(start, end, expected):
+    assert _whole_months(start, end) == expected
+
+
+def test_write_keys_from_dates_and_months():
+    assert _write_keys({"settlement_date": "2026-03-04"}) == {"lo": "2026-03-04", "hi": "2026-03-04"}
+    assert _write_keys([{"settlement_date": date(2026, 5, 1)}, {"settlement_date": "2026-02-10"}]) == {
+        "lo": "2026-02-10", "hi": "2026-05-01",
+    }
+    assert _write_keys({"month": "2026-02"}) == {"lo": "2026-02-01", "hi": "2026-02-31"}
+
+
+def test_write_keys_unknown_range():
+    assert _write_keys(None) is None
+    assert _write_keys({"key": "revenue_goal_2026"}) is None
+    # One row without a date makes the whole write unbounded.
+    assert _write_keys([{"settlement_date": "2026-03-04"}, {"client_name": "x"}]) is None
+
+
+def test_outside_written_keys():
+    keys = {"lo": "2026-02-01", "hi": "2026-02-31"}
+    assert _outside_written_keys({"start": "2026-01-01", "end": "2026-01-31"}, keys)
+    assert _outside_written_keys({"month": "2026-03"}, keys)
+    assert not _outside_written_keys({"start": "2026-01-01", "end": "2026-02-01"}, keys)
+    assert not _outside_written_keys({"month_start": "2026-02-01"}, keys)
+    # Without a window in its params a cached query may cover any date.
+    assert not _outside_written_keys({"person_name": "Emma"}, keys)
+
+
+def test_prepare_settlements_splits_bad_rows():
+    sheet = pd.DataFrame({
+        "CM/PARA": ["Emma", None, "David", "Caroline"],
+        "Client": ["A", "B", "C", "D"],
+        "Settlement Amount": ["$1,000.00", "2000", "-5", "3000"],
+        "Date of Settlement": ["2026-01-05", "2026-01-06", "2026-01-07", "not a date"],
+        "Track": ["pre_suit", "litigation", "unknown", "bogus"],
+    })
+    clean, errors = prepare_settlements(sheet)
+    assert clean["client_name"].tolist() == ["A"]
+    assert clean.loc[0, "settlement_amount"] == 1000.0
+    assert clean.loc[0, "settlement_date"] == date(2026, 1, 5)
+    assert errors["row"].tolist() == [2, 3, 4, 4]
+    assert errors["problem"].tolist() == [
+        "CM/PARA is required",
+        "settlement_amount must be a non-negative number",
+        "DATE OF SETTLEMENT is missing or not a date",
+        f"TRACK must be one of {', '.join(TRACKS)}",
+    ]
+
+
+def test_prepare_settlements_missing_columns():
+    with pytest.raises(ValueError, match="client_name, settlement_date"):
+        prepare_settlements(pd.DataFrame({"CM/PARA": ["Emma"]}))
+
+
+def test_prepare_pre_suit_kpis_splits_bad_rows_and_keeps_last_duplicate():
+    sheet = pd.DataFrame({
+        "Person": ["Emma", "Emma", "David", "Caroline"],
+        "Month": ["2026-01", "2026-01", "2026-13", "2026-02"],
+        "# Demands Sent": [1, 4, 2, 3],
+        "NPS": [4.5, 5, 3, 7],
+    })
+    clean, errors = prepare_pre_suit_kpis(sheet)
+    assert clean[["person_name", "month", "demands_sent"]].values.tolist() == [["Emma", "2026-01", 4]]
+    assert clean["demands_sent"].dtype == int
+    assert errors.to_dict("records") == [
+        {"row": 3, "problem": "Month must be YYYY-MM"},
+        {"row": 4, "problem": "NPS must be between 0 and 5"},
+    ]
+
+
+def test_backend_missing_a_method_fails_when_created():
+    class Partial(StorageBackend):
+        name = "partial"
+
+        def connection(self):
+            return None
+
+    with pytest.raises(TypeError, match="stream_rows"):
+        Partial()
+    assert {type(b).__name__ for b in BACKENDS.values()} == {"PostgresBackend", "DuckDBBackend"}
@@ -0,0 +1,62 @@
+import warnings
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from db import _frame_mark, _merge_delta
+
+
+def rows(ids, stamp="2026-01-01", tod="MVA", track="pre_suit"):
+    return pd.DataFrame({
+        "id": pd.Series(ids, dtype="int64"),
+        "updated_at": pd.to_datetime([stamp] * len(ids), utc=True),
+        "settlement_date": pd.to_datetime(["2026-01-15"] * len(ids)),
+        "tod": pd.Categorical([tod] * len(ids)),
+        "track": pd.Categorical([track] * len(ids)),
+    })
+
+
+@pytest.fixture(autouse=True)
+def no_future_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        yield
+
+
+def test_merge_replaces_changed_rows_and_adds_new_ones():
+    delta = rows([2, 3], stamp="2026-02-01", tod="Premises")
+    merged = _merge_delta(rows([1, 2]), delta)
+    assert sorted(merged["id"]) == [1, 2, 3]
+    assert merged.set_index("id").loc[2, "tod"] == "Premises"
+
+
+def test_merge_with_empty_delta_keeps_rows():
+    stored = rows([1, 2])
+    merged = _merge_delta(stored, rows([]))
+    assert merged["id"].tolist() == [1, 2]
+
+
+def test_merge_into_empty_frame():
+    merged = _merge_delta(rows([]), rows([5]))
+    assert merged["id"].tolist() == [5]
+
+
+def test_merge_raw_delta_with_nulls_and_new_categories():
+    # A delta straight from read_sql: object columns, python dates, all-NULL values.
+    delta = pd.DataFrame({
+        "id": [3],
+        "updated_at": pd.to_datetime(["2026-02-01"], utc=True),
+        "settlement_date": [date(2026, 2, 3)],
+        "tod": [None],
+        "track": ["litigation"],
+    })
+    merged = _merge_delta(rows([1]), delta)
+    assert merged["track"].tolist() == ["pre_suit", "litigation"]
+    assert merged["tod"].isna().tolist() == [False, True]
+    assert merged["settlement_date"].dtype == "datetime64[ns]"
+
+
+def test_frame_mark():
+    assert _frame_mark(rows([])) == (0, None, None)
+    assert _frame_mark(rows([4, 9], stamp="2026-03-01")) == (2, 9, pd.Timestamp("2026-03-01", tz="UTC"))
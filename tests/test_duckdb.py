@@ -0,0 +1,164 @@
+"""
+Database-level cases against a throwaway DuckDB file (the duckdb_db fixture), so they run
+without a Postgres server.
+"""
+from datetime import date
+
+import pandas as pd
+import pytest
+from sqlalchemy.exc import DBAPIError, IntegrityError
+
+import perf
+from db import (
+    PRE_SUIT_KPI_COLUMNS, SETTLEMENT_COLUMNS, DuckDBBackend, bulk_load_pre_suit_kpis, bulk_load_settlements, execute,
+    iter_settlements, person_settlements, pre_suit_kpis, pre_suit_kpis_page, settlements_page, upsert_pre_suit_month,
+    _copy_and_merge, _delta_store, _query_cache,
+)
+
+
+def settlements(n, person="Emma"):
+    # Three rows per date, so the seek has to break ties on id.
+    return pd.DataFrame({
+        "person_name": [person] * n,
+        "client_name": [f"Client {i:03d}" for i in range(n)],
+        "settlement_amount": [1000.0 * (i + 1) for i in range(n)],
+        "policy_limits": [5000.0] * n,
+        "fee_earned": [300.0] * n,
+        "settlement_date": [date(2026, 1, 1 + i // 3) for i in range(n)],
+        "tod": ["MVA"] * n,
+        "track": ["pre_suit"] * n,
+    })[SETTLEMENT_COLUMNS]
+
+
+def key_at(df, key_cols, i):
+    # As views.common.keyset_pager builds its cursors: plain Python values.
+    return tuple(df[c].iloc[[i]].tolist()[0] for c in key_cols)
+
+
+def walk(fetch, key_cols, page_size):
+    """Every page forward, then every page back again; returns both lists of pages."""
+    forward, cursor = [], {}
+    while True:
+        df, has_more = fetch(page_size, **cursor)
+        forward.append(df)
+        if not has_more:
+            break
+        cursor = {"after": key_at(df, key_cols, -1)}
+    backward = [forward[-1]]
+    while len(backward) < len(forward):
+        df, _ = fetch(page_size, before=key_at(backward[-1], key_cols, 0))
+        backward.append(df)
+    return forward, backward[::-1]
+
+
+def test_settlements_page_seek_visits_every_row_once(duckdb_db):
+    bulk_load_settlements(settlements(23))
+    forward, backward = walk(settlements_page, ["settlement_date", "id"], 5)
+    ids = [i for page in forward for i in page["id"]]
+    expected = settlements_page(100)[0]["id"].tolist()
+    assert ids == expected and len(ids) == 23
+    assert [page["id"].tolist() for page in backward] == [page["id"].tolist() for page in forward]
+
+
+def test_pre_suit_kpis_page_seek_mixed_directions(duckdb_db):
+    for month in ("2026-01", "2026-02", "2026-03"):
+        upsert_pre_suit_month(month, pd.DataFrame({"person_name": ["Ann", "Bob", "Cy", "Dee"], "demands_sent": [1, 2, 3, 4]}))
+    forward, backward = walk(pre_suit_kpis_page, ["month", "person_name"], 5)
+    keys = [tuple(r) for page in forward for r in page[["month", "person_name"]].values.tolist()]
+    assert keys == sorted(keys, key=lambda k: (-int(k[0].replace("-", "")), k[1]))
+    assert len(keys) == 12
+    assert [page["person_name"].tolist() for page in backward] == [page["person_name"].tolist() for page in forward]
+
+
+def test_upsert_pre_suit_month_inserts_then_updates(duckdb_db):
+    assert upsert_pre_suit_month("2026-04", pd.DataFrame({"person_name": ["Ann", "Bob"], "demands_sent": [3, None]})) == 2
+    upsert_pre_suit_month("2026-04", pd.DataFrame({"person_name": ["Bob"], "nps_score": [4.5]}))
+    rows = pre_suit_kpis("2026-04").set_index("person_name")
+    assert list(rows.columns) == PRE_SUIT_KPI_COLUMNS[1:]
+    assert rows.loc["Ann", "demands_sent"] == 3
+    assert rows.loc["Bob", "nps_score"] == 4.5
+    with pytest.raises(ValueError, match="NPS"):
+        upsert_pre_suit_month("2026-04", pd.DataFrame({"person_name": ["Ann"], "nps_score": [9]}))
+
+
+def test_raw_connection_paths_are_recorded_in_perf(duckdb_db):
+    bulk_load_settlements(settlements(7))
+    assert sum(len(chunk) for chunk in iter_settlements(chunk_size=3)) == 7
+    calls = {c["kind"]: c for c in perf._recent_calls()}
+    assert calls["copy"]["rows"] == 7 and "INSERT INTO settlements" in calls["copy"]["sql"]
+    assert calls["stream"]["rows"] == 7 and calls["stream"]["error"] is None
+
+
+def test_copy_and_merge_raises_sqlalchemy_errors(duckdb_db):
+    upsert_pre_suit_month("2026-04", pd.DataFrame({"person_name": ["Ann"], "demands_sent": [3]}))
+    row = pd.DataFrame([["Ann", "2026-04", 1, 0.0, 0.0, 0, 0.0]], columns=PRE_SUIT_KPI_COLUMNS)
+    cols = ", ".join(PRE_SUIT_KPI_COLUMNS)
+    # A plain INSERT (no ON CONFLICT) of an existing key, through the raw-connection path.
+    with pytest.raises(IntegrityError):
+        _copy_and_merge(
+            "person_name TEXT, month TEXT, demands_sent INTEGER, settlements_amount DOUBLE PRECISION, "
+            "avg_lien_resolution_days DOUBLE PRECISION, files_without_14_day_contact INTEGER, nps_score DOUBLE PRECISION",
+            "pre_suit_kpis", PRE_SUIT_KPI_COLUMNS, row,
+            f"INSERT INTO pre_suit_kpis ({cols}) SELECT {cols} FROM pre_suit_kpis_staging", 100, None,
+        )
+    assert pre_suit_kpis("2026-04")["demands_sent"].tolist() == [3]
+
+
+def test_bulk_load_out_of_range_value_is_a_dbapi_error(duckdb_db):
+    # Passes prepare_pre_suit_kpis, but doesn't fit the INTEGER column.
+    row = pd.DataFrame({"person_name": ["Ann"], "month": ["2026-05"], "demands_sent": [2**40]})
+    with pytest.raises(DBAPIError):
+        bulk_load_pre_suit_kpis(row)
+    assert pre_suit_kpis("2026-05").empty
+
+def test_plain_update_is_seen_without_delta_sync(duckdb_db):
+    # DuckDB has no trigger to bump updated_at, so every read after a write is a full one.
+    bulk_load_settlements(settlements(6))
+    start, end = date(2026, 1, 1), date(2026, 12, 31)
+    assert person_settlements("Emma", start, end)["fee_earned"].eq(300.0).all()
+    execute("UPDATE settlements SET fee_earned = 999 WHERE client_name = :client", {"client": "Client 002"})
+    after = person_settlements("Emma", start, end).set_index("client_name")["fee_earned"]
+    assert after["Client 002"] == 999
+    assert _delta_store().stats()["full_reads"] == 2
+
+
+def test_delta_sync_merges_inserts_updates_and_resyncs_on_delete(duckdb_db, monkeypatch):
+    # As on Postgres, where a trigger keeps updated_at current; the UPDATE below sets it by hand.
+    monkeypatch.setattr(DuckDBBackend, "maintains_updated_at", True)
+    bulk_load_settlements(settlements(6))
+    start, end = date(2026, 1, 1), date(2026, 12, 31)
+
+    def fresh():
+        # What a full re-read returns, bypassing both caches.
+        _query_cache().invalidate()
+        store = _delta_store()
+        store._entries.clear()
+        return person_settlements("Emma", start, end)
+
+    assert len(person_settlements("Emma", start, end)) == 6
+    stats = _delta_store().stats
+    assert stats()["full_reads"] == 1
+
+    # A write drops the cached frame; nothing changed in this range, so one mark query answers.
+    execute("DELETE FROM settlements WHERE person_name = 'Nobody'")
+    person_settlements("Emma", start, end)
+    assert stats()["unchanged"] == 1
+
+    bulk_load_settlements(settlements(1).assign(client_name="New", settlement_date=date(2026, 6, 1)))
+    merged = person_settlements("Emma", start, end)
+    assert stats()["merges"] == 1 and stats()["merged_rows"] == 1
+    assert merged["client_name"].iloc[0] == "New"  # still newest first
+
+    execute(
+        "UPDATE settlements SET fee_earned = 999, updated_at = now() + INTERVAL 1 SECOND WHERE client_name = :client",
+        {"client": "Client 002"},
+    )
+    merged = person_settlements("Emma", start, end)
+    assert stats()["merges"] == 2
+    pd.testing.assert_frame_equal(merged, fresh())
+
+    execute("DELETE FROM settlements WHERE client_name = 'Client 000'")
+    synced = person_settlements("Emma", start, end)
+    assert stats()["resyncs"] == 1
+    assert len(synced) == 6
+    pd.testing.assert_frame_equal(synced, fresh())
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from frames import changed_rows, person_stats
+
+
+def kpis(names):
+    return pd.DataFrame({"person_name": names, "demands_sent": np.arange(len(names), dtype="int64") + 1})
+
+
+def test_person_stats_one_row_per_person_in_order():
+    stats = person_stats(kpis(["B", "A", "B"]), ["A", "B"], dem=("demands_sent", "sum"))
+    assert list(stats.index) == ["A", "B"]
+    assert stats["n_rows"].tolist() == [1, 2]
+    assert stats["dem"].tolist() == [2, 4]
+
+
+def test_person_stats_people_without_rows():
+    stats = person_stats(kpis(["A"]), ["A", "Z"], dem=("demands_sent", "sum"))
+    assert stats.loc["Z", "n_rows"] == 0
+    assert np.isnan(stats.loc["Z", "dem"])
+
+
+def test_person_stats_ignores_nan_keys():
+    stats = person_stats(kpis(["A", None, np.nan, "A"]), ["A"], dem=("demands_sent", "sum"))
+    assert stats.loc["A", "n_rows"] == 2
+    assert stats.loc["A", "dem"] == 1 + 4
+
+
+def test_person_stats_categorical_keys():
+    df = kpis(["B", "A", "B"]).astype({"person_name": pd.CategoricalDtype(["A", "B", "Unused"])})
+    stats = person_stats(df, ["A", "B", "Unused", "Z"], dem=("demands_sent", "sum"))
+    assert stats["n_rows"].tolist() == [1, 2, 0, 0]
+    assert stats["dem"].iloc[:2].tolist() == [2, 4]
+
+
+def test_person_stats_empty_frame():
+    stats = person_stats(kpis([]), ["A", "B"], dem=("demands_sent", "sum"))
+    assert list(stats.index) == ["A", "B"]
+    assert stats["n_rows"].dtype == "int64"
+    assert stats["n_rows"].tolist() == [0, 0]
+    assert stats["dem"].isna().all()
+
+
+def test_changed_rows_returns_only_edited_rows():
+    original = pd.DataFrame({"person_name": ["A", "B", "C"], "demands_sent": [1.0, np.nan, np.nan], "nps": [4.0, np.nan, 3.0]})
+    edited = original.copy()
+    edited.loc[1, "demands_sent"] = 2.0  # filled in a person with no row yet
+    edited.loc[2, "nps"] = 3.5
+    changes = changed_rows(original, edited, "person_name")
+    assert changes["person_name"].tolist() == ["B", "C"]
+    assert changes.loc[1, "nps"] == 3.5
+
+
+def test_changed_rows_treats_missing_values_as_equal():
+    original = pd.DataFrame({"person_name": ["A", "B"], "demands_sent": [np.nan, 1.0]})
+    assert changed_rows(original, original.copy(), "person_name").empty
+
+
+def test_changed_rows_includes_rows_not_in_original():
+    original = pd.DataFrame({"person_name": ["A"], "demands_sent": [1.0]})
+    edited = pd.DataFrame({"person_name": ["A", "New"], "demands_sent": [1.0, 1.0]})
+    assert changed_rows(original, edited, "person_name")["person_name"].tolist() == ["New"]
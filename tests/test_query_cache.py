@@ -0,0 +1,78 @@
+import pandas as pd
+
+from db import QueryCache
+
+
+def frame(n=1):
+    return pd.DataFrame({"x": range(n)})
+
+
+def put(cache, sql, tables, params=None):
+    key = QueryCache.key(sql, params)
+    _, generation = cache.get(key)
+    cache.put(key, frozenset(tables), frame(), generation, params)
+    return key
+
+
+def test_key_ignores_whitespace_and_param_order():
+    assert QueryCache.key("SELECT  1\n FROM t", {"a": 1, "b": 2}) == QueryCache.key("SELECT 1 FROM t", {"b": 2, "a": 1})
+
+
+def test_lru_evicts_least_recently_used():
+    cache = QueryCache(max_entries=2)
+    a = put(cache, "SELECT a FROM t", {"t"})
+    b = put(cache, "SELECT b FROM t", {"t"})
+    cache.get(a)  # a is now the most recently used
+    c = put(cache, "SELECT c FROM t", {"t"})
+    assert a in cache and c in cache and b not in cache
+    assert cache.stats()["evictions"] == 1
+
+
+def test_hits_and_misses_are_counted():
+    cache = QueryCache()
+    key = put(cache, "SELECT 1 FROM t", {"t"})  # one miss
+    df, _ = cache.get(key)
+    assert df is not None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_invalidation_bumps_generation_and_drops_stale_puts():
+    cache = QueryCache()
+    key = QueryCache.key("SELECT 1 FROM t", None)
+    _, generation = cache.get(key)
+    cache.invalidate({"other"})  # a write lands while the result is being fetched
+    _, after = cache.get(key)
+    assert after == generation + 1
+    cache.put(key, frozenset({"t"}), frame(), generation)
+    assert key not in cache
+
+
+def test_invalidate_by_table():
+    cache = QueryCache()
+    settlements = put(cache, "SELECT * FROM settlements", {"settlements"})
+    kpis = put(cache, "SELECT * FROM pre_suit_kpis", {"pre_suit_kpis"})
+    cache.invalidate(frozenset({"settlements"}))
+    assert settlements not in cache and kpis in cache
+    cache.invalidate()
+    assert kpis not in cache
+
+
+def test_invalidate_keeps_windows_outside_written_keys():
+    cache = QueryCache()
+    sql = "SELECT * FROM settlements WHERE settlement_date BETWEEN :start AND :end"
+    jan = put(cache, sql, {"settlements"}, {"start": "2026-01-01", "end": "2026-01-31"})
+    feb = put(cache, sql, {"settlements"}, {"start": "2026-02-01", "end": "2026-02-28"})
+    month = put(cache, "SELECT * FROM pre_suit_kpis WHERE month = :month", {"settlements"}, {"month": "2026-03"})
+    unbounded = put(cache, "SELECT * FROM settlements", {"settlements"})
+    cache.invalidate(frozenset({"settlements"}), {"lo": "2026-02-10", "hi": "2026-02-10"})
+    assert jan in cache and month in cache
+    assert feb not in cache and unbounded not in cache
+
+
+def test_ttl_expires_entries():
+    cache = QueryCache(ttl=-1.0)  # every entry is already too old
+    key = put(cache, "SELECT 1 FROM t", {"t"})
+    df, _ = cache.get(key)
+    assert df is None
+    assert cache.stats()["expirations"] == 1
@@ -0,0 +1,23 @@
+"""
+One module per dashboard page, each exposing render(). app.py imports a page's module the
+first time it is opened, so a session only loads (and pays for) the pages it visits.
+
+The package is deliberately not called `pages/`: Streamlit would turn that directory into
+its own multipage navigation.
+
+Sections inside a page are fragments (perf.fragment: st.fragment that also records the
+rerun for the perf panel), so a widget only reruns the fragment that owns it (a person
+box's toggle reruns that box, not the whole page or the sidebar).
+"""
+
+# Sidebar label -> module in this package, in navigation order.
+PAGES = {
+    "Data Entry — Settlements": "settlements_entry",
+    "Data Entry — Pre-Suit KPIs": "kpi_entry",
+    "Goals / Settings": "goals",
+    "Dashboard — Firmwide": "firmwide",
+    "Dashboard — Trends": "trends",
+    "Dashboard — Pre-Suit": "pre_suit",
+    "Import — CSV/Excel": "importer",
+    "Export": "export",
+}
@@ -0,0 +1,97 @@
+"""
+Constants and helpers shared by the page modules.
+"""
+import calendar
+import math
+from datetime import date
+
+import streamlit as st
+import pandas as pd
+
+PEOPLE = ["Jackelin", "Emma", "Alejandra", "David", "Caroline"]
+
+PAGE_SIZES = [25, 50, 100, 200]
+
+MONTHS = [
+    (1, "Jan"), (2, "Feb"), (3, "Mar"), (4, "Apr"),
+    (5, "May"), (6, "Jun"), (7, "Jul"), (8, "Aug"),
+    (9, "Sep"), (10, "Oct"), (11, "Nov"), (12, "Dec"),
+]
+
+# Column formats for st.dataframe: values stay numeric/datetime (so columns sort by value)
+# and are formatted in the browser, with no per-cell Python work.
+DATE_COLUMN = st.column_config.DateColumn(format="YYYY-MM-DD")
+MONEY_COLUMN = st.column_config.NumberColumn(format="$%.2f")
+
+
+# ------------------ HELPERS ------------------
+def currency(x) -> str:
+    """
+    "$1,234.50" for one number, for metrics and captions (missing values show as "$0.00").
+    Table columns keep their numbers and use MONEY_COLUMN instead.
+    """
+    value = safe_float(x)
+    return f"${value:,.2f}" if math.isfinite(value) else "$0.00"
+
+def safe_float(x, default=0.0):
+    try:
+        return float(x)
+    except:
+        return default
+
+def yyyymm_from_year_month(year: int, month: int) -> str:
+    return f"{year}-{month:02d}"
+
+def start_end_for_month(year: int, month: int):
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, 1), date(year, month, last_day)
+
+def start_end_for_ytd(year: int):
+    start = date(year, 1, 1)
+    today = date.today()
+    end = today if year == today.year else date(year, 12, 31)
+    return start, end
+
+def date_label(d):
+    # Frames keep dates as datetime64; they only become text here, for captions.
+    return None if pd.isna(d) else f"{d:%Y-%m-%d}"
+
+def keyset_pager(state_key: str, fetch, key_cols, filters, page_size: int) -> pd.DataFrame:
+    """
+    Fetch and return one page via fetch(page_size, after=key | before=key) -> (df, has_more),
+    rendering First / Previous / Next controls. The cursor lives in st.session_state[state_key]
+    and resets whenever the filters or page size change. Inside an st.fragment the buttons
+    rerun only that fragment.
+    """
+    state = st.session_state.setdefault(state_key, {"filters": None, "cursor": None, "page": 1})
+    if state["filters"] != (filters, page_size):
+        state.update(filters=(filters, page_size), cursor=None, page=1)
+
+    direction, key = state["cursor"] or (None, None)
+    df, has_more = fetch(page_size, **({direction: key} if direction else {}))
+
+    if direction == "before":
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = direction == "after", has_more
+    if df.empty:
+        has_next = False
+
+    def key_at(i):
+        # Column-wise tolist() yields plain Python values the DB driver can bind.
+        return tuple(df[c].iloc[[i]].tolist()[0] for c in key_cols)
+
+    def go(cursor, page):
+        state.update(cursor=cursor, page=page)
+
+    # Callbacks move the cursor before the next run renders, so a click costs one fetch and
+    # no extra st.rerun(); inside a fragment that run is just the fragment.
+    back = (("before", key_at(0)), max(1, state["page"] - 1)) if not df.empty else (None, 1)
+    forward = (("after", key_at(-1)), state["page"] + 1) if not df.empty else (None, 1)
+    p1, p2, p3, p4 = st.columns([1, 1, 1, 3])
+    p1.button("« First", key=f"{state_key}_first", disabled=state["page"] == 1, on_click=go, args=(None, 1))
+    p2.button("‹ Previous", key=f"{state_key}_prev", disabled=not has_prev, on_click=go, args=back)
+    p3.button("Next ›", key=f"{state_key}_next", disabled=not has_next, on_click=go, args=forward)
+    p4.caption(f"Page {state['page']} · {len(df)} rows")
+
+    return df
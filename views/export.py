@@ -0,0 +1,54 @@
+"""
+PAGE 7: EXPORT
+"""
+import tempfile
+from datetime import date
+
+import streamlit as st
+
+import perf
+from db import write_settlements_export, TRACKS
+
+
+def render():
+    st.title("Export — Settlements")
+    st.caption("Rows are streamed from the database in chunks into a temporary file, then offered for download.")
+    exporter()
+
+
+@perf.fragment
+def exporter():
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        exp_start = st.date_input("From", value=date(date.today().year, 1, 1))
+    with c2:
+        exp_end = st.date_input("To", value=date.today())
+    with c3:
+        exp_track = st.selectbox("Track", ["All"] + TRACKS)
+    with c4:
+        exp_fmt = st.radio("Format", ["csv", "parquet"], horizontal=True)
+
+    if not st.button("Prepare export", use_container_width=True):
+        return
+
+    file_name = f"settlements_{exp_start.isoformat()}_{exp_end.isoformat()}.{exp_fmt}"
+    # An anonymous temp file, deleted when closed at the end of this block: the download
+    # button keeps its own copy of the bytes, so nothing is left on disk whatever the session
+    # does next. Download again by preparing again.
+    with tempfile.TemporaryFile(suffix=f".{exp_fmt}") as tmp:
+        with st.spinner("Exporting..."):
+            n_rows = write_settlements_export(
+                tmp,
+                exp_fmt,
+                start=exp_start,
+                end=exp_end,
+                track=None if exp_track == "All" else exp_track,
+            )
+        tmp.seek(0)
+        st.write(f"{n_rows:,} rows ready.")
+        st.download_button(
+            f"Download {file_name}",
+            data=tmp.read(),
+            file_name=file_name,
+            use_container_width=True,
+        )
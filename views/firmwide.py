@@ -0,0 +1,247 @@
+"""
+PAGE 4: DASHBOARD — FIRMWIDE
+"""
+from datetime import date
+from functools import partial
+
+import streamlit as st
+import pandas as pd
+
+import perf
+from db import (
+    fetch_many, firmwide_summary, get_settings, person_settlements,
+    settlement_distribution, settlement_histogram, TRACKS,
+)
+from views.common import (
+    PEOPLE, MONTHS, DATE_COLUMN, MONEY_COLUMN,
+    currency, safe_float, date_label, start_end_for_month, start_end_for_ytd,
+)
+
+
+def render():
+    dashboard()
+
+
+@perf.fragment
+def dashboard():
+    # Filters, header and boxes all depend on the period, so they rerun together; the rest of
+    # the app (sidebar, schema check) doesn't.
+    start, end, year_sel = filters()
+    summary = kpi_header(start, end, year_sel)
+    if summary["num_cases"]:
+        distribution(start, end)
+
+    st.markdown("## CM/PARA Performance Boxes")
+    st.caption("Totals + that person’s transactions in the selected period.")
+
+    if summary["num_cases"] == 0:
+        st.info("No settlement rows found in this selected period.")
+    else:
+        people_totals = summary["people"]
+        for person in PEOPLE:
+            person_box(person, people_totals.loc[person] if person in people_totals.index else None, start, end)
+
+
+def filters():
+    """
+    View/year/month selectors (and the custom range inputs). Returns (start, end, year).
+    """
+    today = date.today()
+    year_options = list(range(2024, 2031))
+    default_year_idx = year_options.index(2026) if 2026 in year_options else year_options.index(today.year)
+
+    c1, c2, c3 = st.columns([1.2, 1.5, 2.3])
+    with c1:
+        view_mode = st.selectbox("View", ["YTD", "Monthly", "Custom"])
+    with c2:
+        year_sel = st.selectbox("Year", year_options, index=default_year_idx)
+    with c3:
+        month_sel = st.selectbox("Month", [m[1] for m in MONTHS], index=0)
+
+    st.title(f'{year_sel} FIRMWIDE DASHBOARD — DENMON "D2" LAW')
+
+    if view_mode == "YTD":
+        start, end = start_end_for_ytd(int(year_sel))
+        header_range = f"YTD {year_sel} ({start.isoformat()} → {end.isoformat()})"
+    elif view_mode == "Monthly":
+        month_num = [m[0] for m in MONTHS if m[1] == month_sel][0]
+        start, end = start_end_for_month(int(year_sel), int(month_num))
+        header_range = f"{month_sel}-{str(year_sel)[-2:]} ({start.isoformat()} → {end.isoformat()})"
+    else:
+        c4, c5 = st.columns(2)
+        with c4:
+            start = st.date_input("Custom start", value=date(int(year_sel), 1, 1))
+        with c5:
+            end = st.date_input("Custom end", value=date.today())
+        header_range = f"Custom ({start.isoformat()} → {end.isoformat()})"
+
+    st.subheader(header_range)
+    return start, end, year_sel
+
+
+def kpi_header(start, end, year_sel) -> dict:
+    """
+    Firmwide totals, goal progress and revenue split for [start, end]. Returns the summary.
+    """
+    fetched = fetch_many({
+        "summary": partial(firmwide_summary, start, end),
+        "settings": partial(get_settings, [f"revenue_goal_{year_sel}", "revenue_goal_2026", "google_reviews_current"]),
+    })
+    summary, settings = fetched["summary"], fetched["settings"]
+
+    total_settlement = summary["total_settlement"]
+    total_fees = summary["total_fees"]
+    num_cases = summary["num_cases"]
+    avg_settlement = summary["avg_settlement"]
+    avg_fee = summary["avg_fee"]
+
+    pre_fee = summary["fees_by_track"].get("pre_suit", 0.0)
+    lit_fee = summary["fees_by_track"].get("litigation", 0.0)
+    pre_pct = (pre_fee / total_fees * 100.0) if total_fees else 0.0
+    lit_pct = (lit_fee / total_fees * 100.0) if total_fees else 0.0
+
+    revenue_goal = safe_float(settings.get(f"revenue_goal_{year_sel}", settings.get("revenue_goal_2026", "0")), 0.0)
+    progress = (total_fees / revenue_goal * 100.0) if revenue_goal else 0.0
+    google_current = int(safe_float(settings.get("google_reviews_current", "221"), 221))
+
+    m1, m2, m3, m4, m5, m6 = st.columns(6)
+    m1.metric("Total Settlements", currency(total_settlement))
+    m2.metric("Total Fees Earned", currency(total_fees))
+    m3.metric("No. of Cases Settled", f"{num_cases}")
+    m4.metric("Avg Settlement", currency(avg_settlement))
+    m5.metric("Avg Fee Earned", currency(avg_fee))
+    m6.metric("No. of Google Reviews", f"{google_current}")
+
+    st.divider()
+
+    g1, g2, g3 = st.columns([1.2, 1.2, 2.6])
+    g1.metric(f"{year_sel} Revenue Goal", currency(revenue_goal))
+    g2.metric("Goal Progress", f"{progress:,.1f}%")
+    with g3:
+        st.progress(min(max(progress / 100.0, 0.0), 1.0))
+
+    st.markdown("### Revenue Split (Fees Earned)")
+    s1, s2, s3 = st.columns(3)
+    s1.metric("Pre-Suit", f"{pre_pct:,.1f}%")
+    s2.metric("Litigation", f"{lit_pct:,.1f}%")
+    s3.metric("Unknown", f"{max(0.0, 100.0 - pre_pct - lit_pct):,.1f}%")
+
+    st.divider()
+    return summary
+
+
+# Label -> (db.DISTRIBUTION_MEASURES name, column format).
+DISTRIBUTION_MEASURES = {
+    "Settlement Amount": ("settlement_amount", MONEY_COLUMN),
+    "Fee Earned": ("fee_earned", MONEY_COLUMN),
+    "Settlement ÷ Policy Limits": ("limits_ratio", st.column_config.NumberColumn(format="%.2f")),
+}
+
+
+@perf.fragment
+def distribution(start, end):
+    """
+    Median and percentiles per person and per track (averages hide how skewed settlements
+    are), plus a histogram. Computed in the database and only fetched once opened.
+    """
+    if not st.toggle("Distribution — median, percentiles, histogram", key="firmwide_distribution"):
+        st.divider()
+        return
+
+    label = st.radio("Measure", list(DISTRIBUTION_MEASURES), horizontal=True, key="firmwide_dist_measure")
+    measure, fmt = DISTRIBUTION_MEASURES[label]
+    stats = settlement_distribution(start, end)
+
+    percentiles = {
+        f"{measure}_p25": "P25",
+        f"{measure}_median": "MEDIAN",
+        f"{measure}_p75": "P75",
+        f"{measure}_p90": "P90",
+    }
+    formats = {col: fmt for col in percentiles.values()}
+
+    firm = stats[stats["level"] == "firm"]
+    if not firm.empty:
+        row = firm.iloc[0]
+        cols = st.columns(len(percentiles))
+        for c, (col, name) in zip(cols, percentiles.items()):
+            value = row[col]
+            if pd.isna(value):
+                shown = "—"
+            else:
+                shown = currency(value) if fmt is MONEY_COLUMN else f"{value:.2f}"
+            c.metric(f"Firmwide {name.title()}", shown)
+
+    by_person, by_track = st.columns(2)
+    for container, level, key, title in (
+        (by_person, "person", "person_name", "PERSON"),
+        (by_track, "track", "track", "TRACK"),
+    ):
+        view = stats[stats["level"] == level][[key, "cases", *percentiles]].rename(
+            columns={key: title, "cases": "CASES", **percentiles}
+        )
+        container.dataframe(view, use_container_width=True, hide_index=True, column_config=formats)
+
+    h1, h2 = st.columns([1.0, 3.0])
+    with h1:
+        track = st.selectbox("Track", ["All", *TRACKS], key="firmwide_hist_track")
+        bins = st.slider("Buckets", 5, 50, 20, key="firmwide_hist_bins")
+    hist = settlement_histogram(start, end, measure, bins, track=None if track == "All" else track)
+    with h2:
+        if hist.empty:
+            st.info("No settlements to chart.")
+        else:
+            st.bar_chart(hist.set_index("bucket_lo")["settlements"].rename_axis(label), y_label="Settlements")
+            st.caption("Equal-width buckets up to the 99th percentile; the last bar is everything above it.")
+    st.divider()
+
+
+@perf.fragment
+def person_box(person: str, totals, start, end):
+    """
+    One person's totals for the period (`totals` is their row of summary["people"], or None)
+    and, behind a toggle, their transactions. Opening the toggle reruns only this box.
+    """
+    has_row = totals is not None
+    p_cases = int(totals["cases"]) if has_row else 0
+    p_settle_total = float(totals["settlement_total"]) if has_row else 0.0
+    p_fee_total = float(totals["fee_total"]) if has_row else 0.0
+    p_last_date = date_label(totals["last_date"]) if has_row else None
+
+    st.markdown(f"### {person}")
+   ## st.caption("CLIENT | SETTLEMENT AMOUNT | POLICY LIMITS | FEE EARNED | DATE OF SETTLEMENT | TOD")
+
+    cA, cB, cC = st.columns(3)
+    cA.metric("Total Settlement Amount", currency(p_settle_total))
+    cB.metric("Total Fee Earned", currency(p_fee_total))
+    cC.metric("Cases Settled", f"{p_cases}")
+
+    if p_last_date:
+        st.caption(f"Latest settlement date: {p_last_date}")
+
+    # Rows are only fetched once the box is opened.
+    if p_cases == 0:
+        st.info("No transactions for this person in the selected period.")
+    elif st.toggle(f"Transactions — {person}", key=f"firmwide_txn_{person}"):
+        person_df = person_settlements(person, start, end)
+        view_cols = person_df.rename(columns={
+            "client_name": "CLIENT",
+            "settlement_amount": "SETTLEMENT AMOUNT",
+            "policy_limits": "POLICY LIMITS",
+            "fee_earned": "FEE EARNED",
+            "settlement_date": "DATE OF SETTLEMENT",
+            "tod": "TOD",
+            "track": "TRACK"
+        })[["CLIENT", "SETTLEMENT AMOUNT", "POLICY LIMITS", "FEE EARNED", "DATE OF SETTLEMENT", "TOD", "TRACK"]]
+
+        st.dataframe(
+            view_cols, use_container_width=True, hide_index=True,
+            column_config={
+                "SETTLEMENT AMOUNT": MONEY_COLUMN,
+                "POLICY LIMITS": MONEY_COLUMN,
+                "FEE EARNED": MONEY_COLUMN,
+                "DATE OF SETTLEMENT": DATE_COLUMN,
+            },
+        )
+
+    st.divider()
@@ -0,0 +1,61 @@
+"""
+PAGE 3: GOALS / SETTINGS (YEAR-AWARE)
+"""
+import streamlit as st
+
+import perf
+from db import get_settings, set_settings
+from views.common import safe_float
+
+
+def render():
+    st.title("Goals / Settings")
+    st.caption("Revenue goal is stored per-year (default: 2026). Google reviews are global.")
+    settings_form()
+
+
+@perf.fragment
+def settings_form():
+    year_options = list(range(2024, 2031))
+    default_year_idx = year_options.index(2026) if 2026 in year_options else 0
+
+    c0, c1, c2, c3 = st.columns([1.0, 1.3, 1.3, 1.3])
+
+    with c0:
+        goal_year = st.selectbox("Goal Year", year_options, index=default_year_idx)
+
+    revenue_key = f"revenue_goal_{goal_year}"
+    settings = get_settings([revenue_key, "revenue_goal_2026", "google_reviews_baseline", "google_reviews_current"])
+    fallback_2026 = settings.get("revenue_goal_2026", "0")
+
+    with c1:
+        revenue_goal = st.number_input(
+            f"{goal_year} Revenue Goal (Fees Earned)",
+            min_value=0.0,
+            step=10000.0,
+            value=safe_float(settings.get(revenue_key, fallback_2026), 0.0),
+        )
+
+    with c2:
+        google_base = st.number_input(
+            "Google Reviews Baseline ",
+            min_value=0,
+            step=1,
+            value=int(safe_float(settings.get("google_reviews_baseline", "221"), 221)),
+        )
+
+    with c3:
+        google_current = st.number_input(
+            "Google Reviews Current",
+            min_value=0,
+            step=1,
+            value=int(safe_float(settings.get("google_reviews_current", "221"), 221)),
+        )
+
+    if st.button("Save Settings", use_container_width=True):
+        set_settings({
+            revenue_key: str(float(revenue_goal)),
+            "google_reviews_baseline": str(int(google_base)),
+            "google_reviews_current": str(int(google_current)),
+        })
+        st.success(f"Saved. Revenue goal stored as: {revenue_key}")
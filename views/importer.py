@@ -0,0 +1,82 @@
+"""
+PAGE 6: IMPORT — CSV/EXCEL
+"""
+import streamlit as st
+import pandas as pd
+from sqlalchemy.exc import DBAPIError, OperationalError, TimeoutError as PoolTimeout
+
+import perf
+from db import (
+    DatabaseUnavailable, prepare_settlements, prepare_pre_suit_kpis, bulk_load_settlements, bulk_load_pre_suit_kpis,
+)
+
+
+def render():
+    st.title("Import — CSV/Excel")
+    st.caption(
+        "Headers can be the database column names or the ones shown on the data-entry tables "
+        "(e.g. CM/PARA, CLIENT, SETTLEMENT AMOUNT, DATE OF SETTLEMENT). "
+        "The whole file is loaded in one transaction: either every row lands or none do."
+    )
+    importer()
+
+
+@perf.fragment
+def importer():
+    target = st.radio("Import into", ["Settlements", "Pre-Suit KPIs"], horizontal=True)
+    upload = st.file_uploader("File", type=["csv", "xlsx"])
+
+    if upload is None:
+        return
+
+    try:
+        if upload.name.lower().endswith(".csv"):
+            raw_df = pd.read_csv(upload)
+        else:
+            raw_df = pd.read_excel(upload)
+    except ImportError:
+        st.error("Reading Excel files needs openpyxl (pip install openpyxl).")
+        return
+    except Exception as e:
+        st.error(f"Could not read {upload.name}: {e}")
+        return
+
+    prepare, load = (
+        (prepare_settlements, bulk_load_settlements)
+        if target == "Settlements"
+        else (prepare_pre_suit_kpis, bulk_load_pre_suit_kpis)
+    )
+    try:
+        clean_df, errors_df = prepare(raw_df)
+    except ValueError as e:
+        st.error(str(e))
+        return
+
+    st.write(f"{len(raw_df):,} rows read, {len(clean_df):,} ready to import.")
+    st.dataframe(clean_df.head(20), use_container_width=True, hide_index=True)
+
+    if not errors_df.empty:
+        st.error(f"{len(errors_df):,} problem(s) found. Fix the file and upload it again.")
+        st.dataframe(errors_df, use_container_width=True, hide_index=True)
+    elif st.button(f"Import {len(clean_df):,} rows", use_container_width=True):
+        bar = st.progress(0.0, text="Copying rows...")
+
+        def report(done, total):
+            bar.progress(done / total if total else 1.0, text=f"Copied {done:,} / {total:,} rows")
+
+        try:
+            result = load(raw_df, progress=report)
+        except (DatabaseUnavailable, OperationalError, PoolTimeout):
+            bar.empty()
+            st.error("The database is unreachable right now, so nothing was imported. Try again shortly.")
+            return
+        except DBAPIError as e:
+            # Constraint violations, out-of-range values and the like: the whole load rolled back.
+            bar.empty()
+            st.error(f"The database rejected the file, so nothing was imported: {e.orig}")
+            return
+        bar.progress(1.0, text="Done")
+        st.success(
+            f"Imported {result['rows']:,} rows in {result['seconds']:.2f}s "
+            f"({result['rows_per_sec']:,.0f} rows/sec)."
+        )
@@ -0,0 +1,127 @@
+"""
+PAGE 2: DATA ENTRY — PRE-SUIT KPIs
+"""
+from datetime import date
+
+import streamlit as st
+import pandas as pd
+
+import perf
+from db import pre_suit_kpis, pre_suit_kpis_page, upsert_pre_suit_month
+from frames import changed_rows
+from views.common import PEOPLE, MONTHS, PAGE_SIZES, MONEY_COLUMN, keyset_pager, yyyymm_from_year_month
+
+
+def render():
+    st.title("Data Entry — Pre-Suit KPIs")
+    ##st.caption("# DEMANDS SENT | SETTLEMENTS $ | AVERAGE LIEN RESOLUTION | NO. OF FILES W/OUT 14 DAY CONTACT | NPS SCORE")
+
+    # The grid's form stays outside any fragment: saving reruns the page, so the grid and
+    # the KPI rows below both show the saved values.
+    month_grid()
+    st.divider()
+    kpi_rows()
+
+
+def month_grid():
+    """
+    One editable row per person for the selected month, pre-filled from pre_suit_kpis.
+    Saving sends only the rows that changed, as one upsert.
+    """
+    saved_message = st.session_state.pop("kpi_grid_saved", None)
+    if saved_message:
+        st.success(saved_message)
+
+    today = date.today()
+    year_options = list(range(2024, 2031))
+    default_year = min(max(today.year, year_options[0]), year_options[-1])
+
+    c1, c2, _ = st.columns([1.0, 1.0, 3.0])
+    with c1:
+        year = st.selectbox("Year", year_options, index=year_options.index(default_year), key="kpi_grid_year")
+    with c2:
+        month_label = st.selectbox("Month", [m[1] for m in MONTHS], index=today.month - 1, key="kpi_grid_month")
+    month_num = [m[0] for m in MONTHS if m[1] == month_label][0]
+    month = yyyymm_from_year_month(int(year), int(month_num))
+
+    saved = pre_suit_kpis(month).drop(columns="month").astype({"person_name": str})
+    people = PEOPLE + sorted(set(saved["person_name"]) - set(PEOPLE))
+    # People without a row yet show empty cells; a row is only written once something is entered.
+    original = pd.DataFrame({"person_name": people}).merge(saved, on="person_name", how="left")
+
+    with st.form("pre_suit_grid"):
+        edited = st.data_editor(
+            original,
+            key=f"kpi_grid_{month}_{st.session_state.get('kpi_grid_saves', 0)}",
+            num_rows="fixed",
+            hide_index=True,
+            use_container_width=True,
+            disabled=["person_name"],
+            column_config={
+                "person_name": st.column_config.TextColumn("PERSON"),
+                "demands_sent": st.column_config.NumberColumn("# DEMANDS SENT", min_value=0, step=1),
+                "settlements_amount": st.column_config.NumberColumn(
+                    "SETTLEMENTS $", min_value=0.0, step=1000.0, format="$%.2f"
+                ),
+                "avg_lien_resolution_days": st.column_config.NumberColumn(
+                    "AVERAGE LIEN RESOLUTION (days)", min_value=0.0, step=1.0, format="%.1f"
+                ),
+                "files_without_14_day_contact": st.column_config.NumberColumn(
+                    "NO. OF FILES W/OUT 14 DAY CONTACT", min_value=0, step=1
+                ),
+                "nps_score": st.column_config.NumberColumn(
+                    "NPS SCORE (0-5)", min_value=0.0, max_value=5.0, step=0.5, format="%.1f"
+                ),
+            },
+        )
+        submitted = st.form_submit_button(f"Save {month_label} {year}", use_container_width=True)
+
+    if submitted:
+        changes = changed_rows(original, edited, "person_name")
+        if changes.empty:
+            st.info("Nothing changed.")
+        else:
+            try:
+                written = upsert_pre_suit_month(month, changes)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                # A fresh editor key, so the rerun draws the grid from the saved rows.
+                st.session_state["kpi_grid_saves"] = st.session_state.get("kpi_grid_saves", 0) + 1
+                st.session_state["kpi_grid_saved"] = (
+                    f"Saved {written} KPI row(s) for {month}: {', '.join(changes['person_name'])}."
+                )
+                st.rerun()
+
+
+@perf.fragment
+def kpi_rows():
+    st.subheader("KPI rows")
+    f1, f2 = st.columns(2)
+    with f1:
+        filter_person = st.selectbox("Filter person", ["All"] + PEOPLE, key="kpi_person")
+    with f2:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key="kpi_page_size")
+
+    filter_person = None if filter_person == "All" else filter_person
+    df = keyset_pager(
+        "kpi_rows_pager",
+        lambda n, **cursor: pre_suit_kpis_page(n, person=filter_person, **cursor),
+        ["month", "person_name"],
+        (filter_person,),
+        page_size,
+    )
+    df = df.rename(columns={
+        "person_name": "PERSON",
+        "month": "MONTH",
+        "demands_sent": "# DEMANDS SENT",
+        "settlements_amount": "SETTLEMENTS $",
+        "avg_lien_resolution_days": "AVG LIEN (days)",
+        "files_without_14_day_contact": "FILES W/OUT 14D CONTACT",
+        "nps_score": "NPS",
+    })
+    st.dataframe(df, use_container_width=True, hide_index=True, column_config={
+        "SETTLEMENTS $": MONEY_COLUMN,
+        "AVG LIEN (days)": st.column_config.NumberColumn(format="%.1f"),
+        "NPS": st.column_config.NumberColumn(format="%.1f"),
+    })
@@ -0,0 +1,168 @@
+"""
+PAGE 5: DASHBOARD — PRE SUIT
+"""
+from functools import partial
+
+import streamlit as st
+import pandas as pd
+
+import perf
+from db import fetch_many, pre_suit_months, pre_suit_kpis, pre_suit_summary, pre_suit_settlements
+from frames import person_stats
+from views.common import PEOPLE, DATE_COLUMN, MONEY_COLUMN, currency, date_label
+
+
+def render():
+    st.title("PRE SUIT DASHBOARD 2026")
+    dashboard()
+
+
+@perf.fragment
+def dashboard():
+    # The month list and the selected month's data are independent reads, so fetch them together
+    # (the selection comes from the widget's state on reruns).
+    month_filter = st.session_state.get("pre_suit_month", "All Months")
+    month_filter = None if month_filter == "All Months" else month_filter
+    fetched = fetch_many({
+        "months": pre_suit_months,
+        "kpis": partial(pre_suit_kpis, month_filter),
+        "totals": partial(pre_suit_summary, month_filter),
+    })
+    months, kpi_df, ps_totals = fetched["months"], fetched["kpis"], fetched["totals"]
+    if month_filter is not None and month_filter not in months:
+        # The selected month no longer has any data; fall back to all months.
+        del st.session_state["pre_suit_month"]
+        st.rerun()
+
+    with st.columns([1.2, 2.8])[0]:
+        month_sel = st.selectbox("Month", ["All Months"] + months, index=0, key="pre_suit_month")
+
+    st.divider()
+    summary_table(ps_totals)
+
+    st.divider()
+    st.markdown("## Person Boxes (KPIs + Transactions)")
+
+    with perf.timed():
+        kpi_stats = person_stats(
+            kpi_df,
+            PEOPLE,
+            dem=("demands_sent", "sum"),
+            kpi_settle_amt=("settlements_amount", "sum"),
+            lien=("avg_lien_resolution_days", "mean"),
+            no_contact=("files_without_14_day_contact", "sum"),
+            nps=("nps_score", "mean"),
+        )
+
+    for person in PEOPLE:
+        person_box(
+            person,
+            kpi_stats.loc[person],
+            ps_totals.loc[person] if person in ps_totals.index else None,
+            month_sel,
+            month_filter,
+        )
+
+
+@perf.fragment
+def summary_table(ps_totals: pd.DataFrame):
+    """
+    Per-person pre-suit totals, side by side for the people picked here.
+    """
+    st.markdown("## Summary (Computed from Pre-Suit Settlements)")
+    compare_people = st.multiselect(
+        "Compare people (top summary table)",
+        options=PEOPLE,
+        default=PEOPLE
+    )
+
+    if not compare_people:
+        st.info("Pick at least one person in Compare people.")
+        return
+
+    with perf.timed():
+        summary = ps_totals.rename(columns={
+            "cases": "Cases Settled",
+            "settlement_total": "Total Settlements",
+            "fee_total": "Fees Earned",
+        })[["Cases Settled", "Total Settlements", "Fees Earned"]].reindex(compare_people).fillna(0)
+        summary["Cases Settled"] = summary["Cases Settled"].astype(int)
+    # One row per person, so each column is one kind of number and stays numeric.
+    st.dataframe(summary.rename_axis("Person"), use_container_width=True, column_config={
+        "Total Settlements": MONEY_COLUMN,
+        "Fees Earned": MONEY_COLUMN,
+    })
+
+
+@perf.fragment
+def person_box(person: str, kpi_person: pd.Series, totals, month_sel: str, month_filter: str | None):
+    """
+    One person's KPI row and metrics, and behind a toggle their pre-suit transactions.
+    `totals` is their row of pre_suit_summary (None without settlements).
+    """
+    if kpi_person["n_rows"] == 0:
+        kpi_month_label = month_sel
+        dem = None
+        kpi_settle_amt = None
+        lien = None
+        no_contact = None
+        nps = None
+    else:
+        kpi_month_label = "All Months" if month_sel == "All Months" else month_sel
+        dem = int(kpi_person["dem"])
+        kpi_settle_amt = float(kpi_person["kpi_settle_amt"])
+        lien = float(kpi_person["lien"])
+        no_contact = int(kpi_person["no_contact"])
+        nps = float(kpi_person["nps"])
+
+    txn_count = int(totals["cases"]) if totals is not None else 0
+    last_date = date_label(totals["last_date"]) if totals is not None else None
+
+    st.markdown(f"### {person}")
+
+    # Numbers stay numbers (blank when there's no KPI row) and are formatted in the browser.
+    kpi_row = pd.DataFrame([{
+        "Person": person,
+        "Month": kpi_month_label,
+        "# Demands Sent": dem,
+        "Settlements $ (KPI)": kpi_settle_amt,
+        "Avg Lien (days)": lien,
+        "Files w/out 14D Contact": no_contact,
+        "NPS": nps,
+    }])
+    st.dataframe(kpi_row, use_container_width=True, hide_index=True, column_config={
+        "Settlements $ (KPI)": MONEY_COLUMN,
+        "Avg Lien (days)": st.column_config.NumberColumn(format="%.1f"),
+        "NPS": st.column_config.NumberColumn(format="%.1f"),
+    })
+
+    c1, c2, c3, c4, c5 = st.columns(5)
+    c1.metric("Sum Demands Sent", str(dem) if dem is not None else "—")
+    c2.metric("Sum Settlements $ (KPI)", currency(kpi_settle_amt) if kpi_settle_amt is not None else "—")
+    c3.metric("Avg Lien (days)", f"{lien:,.1f}" if lien is not None else "—")
+    c4.metric("Files w/out 14D contact", str(no_contact) if no_contact is not None else "—")
+    c5.metric("NPS", f"{nps:,.1f}/5" if nps is not None else "—")
+
+    if last_date:
+        st.caption(f"Latest settlement date: {last_date}")
+
+    # Rows are only fetched once the box is opened.
+    if txn_count == 0:
+        st.info("No Pre-Suit settlement transactions for this person in the selected period.")
+    elif st.toggle(f"Pre-Suit Transactions — {person}", key=f"pre_suit_txn_{person}"):
+        ps_person = pre_suit_settlements(month_filter, person)
+        view = ps_person.rename(columns={
+            "client_name": "CLIENT",
+            "settlement_amount": "SETTLEMENT AMOUNT",
+            "fee_earned": "FEE EARNED",
+            "settlement_date": "DATE OF SETTLEMENT",
+            "tod": "TOD",
+        })[["CLIENT", "SETTLEMENT AMOUNT", "FEE EARNED", "DATE OF SETTLEMENT", "TOD"]]
+
+        st.dataframe(view, use_container_width=True, hide_index=True, column_config={
+            "SETTLEMENT AMOUNT": MONEY_COLUMN,
+            "FEE EARNED": MONEY_COLUMN,
+            "DATE OF SETTLEMENT": DATE_COLUMN,
+        })
+
+    st.divider()
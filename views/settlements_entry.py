@@ -0,0 +1,98 @@
+"""
+PAGE 1: DATA ENTRY — SETTLEMENTS
+"""
+from datetime import date
+
+import streamlit as st
+
+import perf
+from db import execute, settlements_page, TRACKS
+from views.common import PEOPLE, PAGE_SIZES, DATE_COLUMN, MONEY_COLUMN, keyset_pager
+
+
+def render():
+    st.title("Data Entry — Settlements")
+    ##st.caption("CM/PARA | CLIENT | SETTLEMENT AMOUNT | POLICY LIMITS | FEE EARNED | DATE OF SETTLEMENT | TOD")
+
+    # The form stays outside any fragment: saving reruns the page, so the new row shows up below.
+    with st.form("settlement_form", clear_on_submit=True):
+        c1, c2, c3 = st.columns(3)
+
+        with c1:
+            person = st.selectbox("CM/PARA", PEOPLE)
+            client = st.text_input("CLIENT")
+            settlement_date = st.date_input("DATE OF SETTLEMENT", value=date.today())
+
+        with c2:
+            settlement_amount = st.number_input("SETTLEMENT AMOUNT", min_value=0.0, step=1000.0)
+            fee_earned = st.number_input("FEE EARNED", min_value=0.0, step=100.0)
+
+        with c3:
+            policy_limits = st.number_input("POLICY LIMITS", min_value=0.0, step=1000.0)
+            tod = st.text_input("TOD (optional)")
+            track = st.selectbox("Track (for % split)", TRACKS)
+
+        submitted = st.form_submit_button("Save", use_container_width=True)
+        if submitted:
+            if not client.strip():
+                st.error("CLIENT is required.")
+            else:
+                execute(
+                    """
+                    INSERT INTO settlements
+                    (person_name, client_name, settlement_amount, policy_limits, fee_earned, settlement_date, tod, track)
+                    VALUES (:person_name, :client_name, :settlement_amount, :policy_limits, :fee_earned, :settlement_date, :tod, :track)
+                    """,
+                    {
+                        "person_name": person,
+                        "client_name": client.strip(),
+                        "settlement_amount": float(settlement_amount),
+                        "policy_limits": float(policy_limits),
+                        "fee_earned": float(fee_earned),
+                        "settlement_date": settlement_date.isoformat(),
+                        "tod": tod.strip() if tod else None,
+                        "track": track,
+                    },
+                )
+                st.success("Saved settlement row.")
+
+    st.divider()
+    recent_entries()
+
+
+@perf.fragment
+def recent_entries():
+    st.subheader("Recent entries")
+    f1, f2, f3 = st.columns(3)
+    with f1:
+        filter_person = st.selectbox("Filter CM/PARA", ["All"] + PEOPLE, key="recent_person")
+    with f2:
+        filter_track = st.selectbox("Filter track", ["All"] + TRACKS, key="recent_track")
+    with f3:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key="recent_page_size")
+
+    filter_person = None if filter_person == "All" else filter_person
+    filter_track = None if filter_track == "All" else filter_track
+    df = keyset_pager(
+        "recent_settlements_pager",
+        lambda n, **cursor: settlements_page(n, person=filter_person, track=filter_track, **cursor),
+        ["settlement_date", "id"],
+        (filter_person, filter_track),
+        page_size,
+    )
+    df = df.rename(columns={
+        "person_name": "CM/PARA",
+        "client_name": "CLIENT",
+        "settlement_amount": "SETTLEMENT AMOUNT",
+        "policy_limits": "POLICY LIMITS",
+        "fee_earned": "FEE EARNED",
+        "settlement_date": "DATE OF SETTLEMENT",
+        "tod": "TOD",
+        "track": "TRACK",
+    }).drop(columns=["id"])
+    st.dataframe(df, use_container_width=True, hide_index=True, column_config={
+        "SETTLEMENT AMOUNT": MONEY_COLUMN,
+        "POLICY LIMITS": MONEY_COLUMN,
+        "FEE EARNED": MONEY_COLUMN,
+        "DATE OF SETTLEMENT": DATE_COLUMN,
+    })
@@ -0,0 +1,151 @@
+"""
+PAGE: DASHBOARD — TRENDS (MULTI-YEAR / YEAR-OVER-YEAR)
+"""
+from datetime import date
+
+import streamlit as st
+import pandas as pd
+
+import perf
+from db import get_settings, settlement_trend
+from views.common import MONTHS, MONEY_COLUMN, PEOPLE, safe_float
+
+# Label -> settlement_trend column (its year-earlier value is "prev_" + column).
+METRICS = {
+    "Fees Earned": "fee_total",
+    "Settlements": "settlement_total",
+    "Cases Settled": "cases",
+}
+
+PERCENT_COLUMN = st.column_config.NumberColumn(format="%.1f%%")
+
+
+def render():
+    st.title("Trends — Year over Year")
+    st.caption(
+        "Monthly totals across several years, computed in the database: the browser only gets "
+        "one point per person per month."
+    )
+    trends()
+
+
+def yoy_pct(current, previous):
+    """
+    Percent change from `previous` to `current` (element-wise for Series); NaN without a base.
+    """
+    previous = pd.Series(previous, dtype="float64")
+    return (pd.Series(current, dtype="float64") - previous) / previous.where(previous != 0) * 100.0
+
+
+@perf.fragment
+def trends():
+    today = date.today()
+    year_options = list(range(2024, 2031))
+
+    c1, c2, c3 = st.columns([1.0, 1.0, 2.0])
+    with c1:
+        first_year = st.selectbox("From", year_options, index=0)
+    with c2:
+        last_year = st.selectbox("To", year_options, index=year_options.index(min(max(today.year, 2024), 2030)))
+    with c3:
+        metric = st.radio("Metric", list(METRICS), horizontal=True)
+
+    if first_year > last_year:
+        st.warning("'From' must not be after 'To'.")
+        return
+    if first_year > today.year:
+        st.info("Those years haven't started yet.")
+        return
+
+    df = settlement_trend(int(first_year), int(last_year))
+    if df.empty:
+        st.info("No settlements in those years.")
+        return
+    df["year"] = df["month_start"].dt.year
+    df["month_num"] = df["month_start"].dt.month
+    firm = df[df["person_name"].isna()]
+    years = sorted(firm["year"].unique())
+
+    ytd_vs_goal(firm, years)
+    monthly_by_year(firm, METRICS[metric], metric)
+    people_yoy(df[df["person_name"].notna()], METRICS[metric], metric)
+
+
+def ytd_vs_goal(firm: pd.DataFrame, years):
+    """
+    Running fees per year against that year's revenue_goal_{year} setting.
+    """
+    st.markdown("### Fees YTD vs Revenue Goal")
+    goals = get_settings([f"revenue_goal_{y}" for y in years])
+
+    rows = []
+    for year in years:
+        months = firm[firm["year"] == year]
+        ytd = float(months["fee_total"].sum())
+        ytd_prev = float(months["prev_fee_total"].sum())  # same months, a year earlier
+        goal = safe_float(goals.get(f"revenue_goal_{year}"), 0.0)
+        rows.append({
+            "YEAR": str(year),
+            "THROUGH": MONTHS[int(months["month_num"].max()) - 1][1] if len(months) else "—",
+            "FEES YTD": ytd,
+            "REVENUE GOAL": goal or None,
+            "% OF GOAL": ytd / goal * 100.0 if goal else None,
+            "SAME PERIOD LAST YEAR": ytd_prev,
+            "YOY %": yoy_pct([ytd], [ytd_prev]).iloc[0],
+        })
+    st.dataframe(
+        pd.DataFrame(rows), use_container_width=True, hide_index=True,
+        column_config={
+            "FEES YTD": MONEY_COLUMN,
+            "REVENUE GOAL": MONEY_COLUMN,
+            "SAME PERIOD LAST YEAR": MONEY_COLUMN,
+            "% OF GOAL": PERCENT_COLUMN,
+            "YOY %": PERCENT_COLUMN,
+        },
+    )
+    cumulative = firm.pivot(index="month_num", columns="year", values="ytd_fee_total")
+    st.line_chart(cumulative.rename(columns=str).rename_axis("Month"), y_label="Fees YTD")
+
+
+def monthly_by_year(firm: pd.DataFrame, column: str, label: str):
+    """
+    One line per year over Jan..Dec, so the same month of different years lines up.
+    """
+    st.markdown(f"### Monthly {label} by Year (Firmwide)")
+    by_year = firm.pivot(index="month_num", columns="year", values=column)
+    st.line_chart(by_year.rename(columns=str).rename_axis("Month"), y_label=label)
+
+
+def people_yoy(people: pd.DataFrame, column: str, label: str):
+    """
+    Per-person yearly totals of the metric with the change from the same months a year earlier.
+    """
+    st.markdown(f"### {label} by Person, Year over Year")
+    options = sorted(people["person_name"].unique())
+    selected = st.multiselect("People", options, default=[p for p in PEOPLE if p in options] or options[:5])
+    if not selected:
+        st.info("Select at least one person.")
+        return
+
+    rows = people[people["person_name"].isin(selected)].astype({"person_name": str})
+    totals = (
+        rows.groupby(["person_name", "year"], observed=True)[[column, "prev_" + column]]
+        .sum()
+        .reset_index()
+    )
+    totals["yoy"] = yoy_pct(totals[column], totals["prev_" + column]).to_numpy()
+    view = totals.rename(columns={
+        "person_name": "PERSON",
+        "year": "YEAR",
+        column: label.upper(),
+        "prev_" + column: "SAME PERIOD LAST YEAR",
+        "yoy": "YOY %",
+    })
+    view["YEAR"] = view["YEAR"].astype(str)
+    formats = {"YOY %": PERCENT_COLUMN}
+    if column != "cases":
+        formats.update({label.upper(): MONEY_COLUMN, "SAME PERIOD LAST YEAR": MONEY_COLUMN})
+    st.dataframe(view, use_container_width=True, hide_index=True, column_config=formats)
+
+    monthly = rows.pivot(index="month_start", columns="person_name", values=column)
+    st.line_chart(monthly.rename_axis("Month"), y_label=label)